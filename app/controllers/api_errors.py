@@ -0,0 +1,178 @@
+from enum import Enum
+from typing import Optional, Tuple
+
+
+class ErrorKind(Enum):
+    """Class of failure of an API operation"""
+
+    NETWORK = "network"
+    TIMEOUT = "timeout"
+    RATE_LIMITED = "rate_limited"
+    SERVER = "server"
+    UNAUTHORIZED = "unauthorized"
+    NOT_FOUND = "not_found"
+    CONFLICT = "conflict"
+    CLIENT = "client"
+    CIRCUIT_OPEN = "circuit_open"
+    CANCELLED = "cancelled"
+    UNKNOWN = "unknown"
+
+
+# Failures which may not happen again when the request is sent later
+RETRYABLE_KINDS = frozenset(
+    {
+        ErrorKind.NETWORK,
+        ErrorKind.TIMEOUT,
+        ErrorKind.RATE_LIMITED,
+        ErrorKind.SERVER,
+        ErrorKind.CIRCUIT_OPEN,
+    }
+)
+
+
+class SaveConflictError(Exception):
+    """Raised when a saved field was changed on the server since it was loaded"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint that keeps failing"""
+
+    def __init__(self, endpoint: str, retryIn: float):
+        super().__init__(
+            f"{endpoint} is unavailable after repeated failures, "
+            f"trying again in {max(retryIn, 0.0):.0f}s"
+        )
+        self.endpoint = endpoint
+        self.retryIn = retryIn
+
+
+def classifyError(error: Exception) -> Tuple[ErrorKind, Optional[int]]:
+    """Classify the failure of a request or an operation
+
+    Args:
+        error (Exception): The error
+
+    Returns:
+        Tuple[ErrorKind, Optional[int]]: The kind of failure and the HTTP status of
+            the response, if there was one
+    """
+    if isinstance(error, ApiError):
+        return error.kind, error.status
+    if isinstance(error, CircuitOpenError):
+        return ErrorKind.CIRCUIT_OPEN, None
+    if isinstance(error, SaveConflictError):
+        return ErrorKind.CONFLICT, None
+    if isinstance(error, LookupError):
+        return ErrorKind.NOT_FOUND, None
+
+    # Imported on first use, the executor imports this module at startup
+    import httpx
+
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status in (401, 403):
+            return ErrorKind.UNAUTHORIZED, status
+        if status == 404:
+            return ErrorKind.NOT_FOUND, status
+        if status == 409:
+            return ErrorKind.CONFLICT, status
+        if status == 429:
+            return ErrorKind.RATE_LIMITED, status
+        if status >= 500:
+            return ErrorKind.SERVER, status
+        return ErrorKind.CLIENT, status
+
+    if isinstance(error, httpx.TimeoutException):
+        return ErrorKind.TIMEOUT, None
+    if isinstance(error, (httpx.TransportError, OSError)):
+        return ErrorKind.NETWORK, None
+    return ErrorKind.UNKNOWN, None
+
+
+def isRetryableError(error: Exception) -> bool:
+    """Check if a request failed in a way that may succeed when it is sent again
+
+    Args:
+        error (Exception): The error of the request
+
+    Returns:
+        bool: True for network errors, timeouts, rate limiting, server errors and
+            endpoints whose circuit is open
+    """
+    return classifyError(error)[0] in RETRYABLE_KINDS
+
+
+def isUnsent(error: Exception) -> bool:
+    """Check if a request failed before it could have reached the server
+
+    Args:
+        error (Exception): The error of the request
+
+    Returns:
+        bool: True if sending the request again cannot apply it twice
+    """
+    import httpx
+
+    return isinstance(
+        error,
+        (CircuitOpenError, httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout),
+    )
+
+
+class ApiError(Exception):
+    """Structured error result of an API operation
+
+    Job callbacks receive it instead of the raw exception. Its string is the message
+    of the original error, so it can be shown to the user as is.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        kind: ErrorKind = ErrorKind.UNKNOWN,
+        operation: Optional[str] = None,
+        status: Optional[int] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        self.kind = kind
+        self.operation = operation
+        self.status = status
+
+    def __str__(self):
+        return self.message
+
+    @property
+    def retryable(self) -> bool:
+        """Whether the operation may succeed when it is run again"""
+        return self.kind in RETRYABLE_KINDS
+
+    @classmethod
+    def fromException(
+        cls, error: Exception, operation: Optional[str] = None
+    ) -> "ApiError":
+        """Describe the error an operation failed with
+
+        Args:
+            error (Exception): The error
+            operation (Optional[str]): The operation that failed
+
+        Returns:
+            ApiError: The structured error
+        """
+        kind, status = classifyError(error)
+        return cls(str(error) or type(error).__name__, kind, operation, status)
+
+    def toDict(self) -> dict:
+        """Get a plain representation of the error, e.g. for logging
+
+        Returns:
+            dict: The message, kind, operation, status and whether it is retryable
+        """
+        return {
+            "message": self.message,
+            "kind": self.kind.value,
+            "operation": self.operation,
+            "status": self.status,
+            "retryable": self.retryable,
+        }
@@ -0,0 +1,503 @@
+import time
+import httpx
+from typing import Dict, Optional
+from nanoko import Nanoko
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.models.image_cache import ImageCache
+from app.models.question_mirror import QuestionMirror
+from app.models.sub_question_snapshot import SubQuestionSnapshot
+from app.models.pixmap_cache import decodePreviewImage
+from app.controllers.cached_bank import CachedBank
+from app.controllers.retry_policy import RetryingBank, RetryPolicy
+from app.controllers.api_errors import SaveConflictError, isRetryableError
+from app.controllers.question_loader import QuestionStreamLoader
+from app.controllers.executor import ApiJob
+
+
+class ApiWorker:
+    """Performs API operations for jobs running on the executor threads
+
+    Every request goes through the retry policy, so transient failures are retried
+    and endpoints that keep failing are short-circuited.
+    """
+
+    BULK_REPORT_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        nanokoClient: Nanoko,
+        imageCache: ImageCache,
+        maxSaveWorkers: int = 4,
+        maxBulkWorkers: int = 8,
+        mirror: Optional[QuestionMirror] = None,
+        retryPolicy: Optional[RetryPolicy] = None,
+    ):
+        self.nanokoClient = nanokoClient
+        self.retryPolicy = retryPolicy or RetryPolicy()
+        self.bank = CachedBank(RetryingBank(nanokoClient.bank, self.retryPolicy))
+        self.imageCache = imageCache
+        self.mirror = mirror
+        self.maxSaveWorkers = maxSaveWorkers
+        self.maxBulkWorkers = maxBulkWorkers
+
+    def run(self, job: ApiJob):
+        """Execute the operation of a job
+
+        Args:
+            job (ApiJob): The job to execute
+
+        Returns:
+            object: The result of the operation
+
+        Raises:
+            Exception: If the operation failed
+        """
+        operation = job.operation
+        params = job.params
+
+        # Login operation
+        if operation == "login":
+            self.retryPolicy.call(
+                "login",
+                lambda: self.nanokoClient.user.login(
+                    username=params.get("username", ""),
+                    password=params.get("password", ""),
+                ),
+            )
+            return None
+
+        # Load the questions mirrored by an earlier session
+        elif operation == "load_mirror":
+            count = 0
+            if self.mirror is not None:
+                for chunk in self.mirror.iterQuestions():
+                    if job.isCancelled():
+                        break
+                    job.reportProgress(chunk)
+                    count += len(chunk)
+            return count
+
+        # Load a single question mirrored by an earlier listing
+        elif operation == "load_mirrored_question":
+            if self.mirror is None:
+                return None
+            return self.mirror.get(params.get("questionId"))
+
+        # Build the full-text index of the mirrored sub-questions
+        elif operation == "index_mirror":
+            if self.mirror is None:
+                return False
+            return self.mirror.indexText()
+
+        # Search the texts of the mirrored sub-questions
+        elif operation == "search_sub_questions":
+            if self.mirror is None:
+                return []
+            return self.mirror.searchSubQuestions(
+                params.get("text", ""), params.get("limit", 1000)
+            )
+
+        # Load questions list, reporting each chunk as it arrives
+        elif operation == "load_questions":
+            # A full listing is a fresh read, drop memoized questions
+            self.bank.invalidate("get_questions")
+            loader = QuestionStreamLoader(
+                self.nanokoClient,
+                firstRangeSize=params.get("firstRangeSize", 40),
+                bank=self.bank,
+                retryPolicy=self.retryPolicy,
+            )
+            sync = self.mirror.beginSync() if self.mirror is not None else None
+            count = 0
+            for chunk in loader.iterChunks(job.isCancelled):
+                # Mirrored first, the GUI thread overlays queued edits on the chunk
+                if sync is not None:
+                    sync.apply(chunk)
+                job.reportProgress(chunk)
+                count += len(chunk)
+            return self._finishListSync(sync, count, job)
+
+        # Load single question
+        elif operation == "load_question":
+            questionId = params.get("questionId")
+
+            questions = self.bank.get_questions(question_id=questionId)
+
+            if not questions:
+                raise LookupError("Question not found")
+            if self.mirror is not None:
+                self.mirror.put(questions[:1])
+            return questions[0]
+
+        # Approve Question
+        elif operation == "question_approved":
+            questionId = params.get("questionId")
+            self.bank.approve_question(question_id=questionId)
+            if self.mirror is not None:
+                self.mirror.setFlag([questionId], "is_audited")
+            return None
+
+        # Delete Question
+        elif operation == "question_deleted":
+            questionId = params.get("questionId")
+            self.bank.delete_question(question_id=questionId)
+            if self.mirror is not None:
+                self.mirror.setFlag([questionId], "is_deleted")
+            return None
+
+        # Approve or delete many questions
+        elif operation == "bulk_question_action":
+            return self._runBulkQuestionAction(job)
+
+        # Load image
+        elif operation == "load_image":
+            imageId = params.get("imageId")
+
+            cached = self.imageCache.get(imageId)
+            if cached is not None:
+                image = cached["thumbnail"] or cached["image"]
+                description = cached["description"]
+            else:
+                image = self.bank.get_image(image_id=imageId)
+                description = self.bank.get_image_description(image_id=imageId)
+                self.imageCache.put(imageId, image, description)
+
+            return {
+                "imageId": imageId,
+                "image": decodePreviewImage(image),
+                "description": description,
+            }
+
+        # Upload image
+        elif operation == "upload_image":
+            filePath = params.get("filePath")
+            imageId = params.get("imageId")
+            subQuestionId = params.get("subQuestionId")
+            description = params.get("description", "Input the image description here")
+
+            with open(filePath, "rb") as f:
+                image = f.read()
+
+            imageHash = self.bank.upload_image(file=image)
+
+            if imageId != -1:
+                self.bank.set_image_hash(image_id=imageId, hash=imageHash)
+
+                cached = self.imageCache.get(imageId)
+                if cached is not None:
+                    self.imageCache.put(
+                        imageId, image, cached["description"], imageHash
+                    )
+                else:
+                    self.imageCache.invalidate(imageId)
+            else:
+                imageId = self.bank.add_image(
+                    hash=imageHash,
+                    description=description,
+                )
+                self.bank.set_sub_question_image(
+                    sub_question_id=subQuestionId, image_id=imageId
+                )
+                self.imageCache.put(imageId, image, description, imageHash)
+
+            return imageId
+
+        # Send an edit waiting in the save queue
+        elif operation == "flush_save":
+            return self._flushSave(
+                params.get("snapshot"), params.get("changes"), params.get("verify")
+            )
+
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _finishListSync(self, sync, count: int, job: ApiJob) -> dict:
+        """Finish reconciling the mirror with a complete listing of the bank
+
+        Args:
+            sync (Optional[MirrorSync]): The sync fed with the listing
+            count (int): The number of listed questions
+            job (ApiJob): The job loading the listing
+
+        Returns:
+            dict: The number of listed questions and of changed questions, and the
+                IDs of the questions the listing no longer contains
+        """
+        if sync is None:
+            return {"count": count, "changed": count, "removed": []}
+        # A cancelled listing is incomplete and cannot tell which questions are gone
+        removed = [] if job.isCancelled() else sync.finish()
+        return {"count": count, "changed": sync.changedCount, "removed": removed}
+
+    def _runBulkQuestionAction(self, job: ApiJob) -> dict:
+        """Approve or delete questions with bounded concurrency
+
+        Outcomes are reported through the job progress in batches, so the list can
+        update its rows while the action runs. Setting the stop event stops the
+        action once the requests in flight have finished.
+
+        Args:
+            job (ApiJob): The job with the action, the question IDs and the stop event
+
+        Returns:
+            dict: The succeeded question IDs, the error message of every failed
+                question and whether the action was stopped
+        """
+        action = job.params.get("action")
+        questionIds = job.params.get("questionIds")
+        stopEvent = job.params.get("stopEvent")
+
+        bank = self.bank
+        perform = {
+            "approve": bank.approve_question,
+            "delete": bank.delete_question,
+        }[action]
+
+        summary = {"succeeded": [], "failed": {}, "cancelled": False}
+        batch = {"succeeded": [], "failed": {}}
+        lastReport = time.monotonic()
+
+        def collect(questionId, future):
+            error = future.exception()
+            if error is None:
+                summary["succeeded"].append(questionId)
+                batch["succeeded"].append(questionId)
+            else:
+                summary["failed"][questionId] = str(error)
+                batch["failed"][questionId] = str(error)
+
+        pool = ThreadPoolExecutor(max_workers=self.maxBulkWorkers)
+        try:
+            futures = {
+                pool.submit(perform, question_id=questionId): questionId
+                for questionId in questionIds
+            }
+            for future in as_completed(futures):
+                collect(futures.pop(future), future)
+
+                if time.monotonic() - lastReport >= self.BULK_REPORT_INTERVAL:
+                    job.reportProgress(batch)
+                    batch = {"succeeded": [], "failed": {}}
+                    lastReport = time.monotonic()
+
+                if stopEvent.is_set():
+                    summary["cancelled"] = True
+                    break
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        # Requests that were in flight when the action stopped still took effect
+        for future, questionId in futures.items():
+            if future.done() and not future.cancelled():
+                collect(questionId, future)
+
+        job.reportProgress(batch)
+        if self.mirror is not None:
+            field = "is_audited" if action == "approve" else "is_deleted"
+            self.mirror.setFlag(summary["succeeded"], field)
+        return summary
+
+    def _flushSave(
+        self, snapshot: SubQuestionSnapshot, changes: dict, verify: bool
+    ) -> dict:
+        """Send a queued edit of a sub-question and classify its outcome
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The new values of the changed fields
+            verify (bool): Whether to check the sub-question was not changed on the
+                server before sending, for edits that waited in the queue
+
+        Returns:
+            dict: The saved fields, the fields to send again, the error message of
+                every field that failed for good, and the conflict message if the
+                edit was rejected because of a concurrent edit
+        """
+        try:
+            if verify:
+                self.bank.invalidate("get_questions", question_id=snapshot.questionId)
+                self._checkSaveConflict(snapshot, changes)
+
+            errors = self._applySubQuestionChanges(snapshot, changes)
+            failed = {field: error for field, error in errors.items() if error}
+
+            if self._isSaveRejected(failed):
+                self._checkSaveConflict(snapshot, failed)
+        except (SaveConflictError, LookupError) as e:
+            return {"saved": [], "retry": {}, "failed": {}, "conflict": str(e)}
+        except Exception as e:
+            # The sub-question could not be read again, send the whole edit again
+            failed = dict.fromkeys(changes, e)
+
+        return self._flushOutcome(snapshot, changes, failed)
+
+    def _flushOutcome(
+        self, snapshot: SubQuestionSnapshot, changes: dict, failed: Dict[str, Exception]
+    ) -> dict:
+        """Build the outcome of a queued edit once its setter calls have completed
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The new values of the changed fields
+            failed (Dict[str, Exception]): The error of every field that failed
+
+        Returns:
+            dict: The outcome, as returned by ``_flushSave``
+        """
+        if "image_description" in changes and "image_description" not in failed:
+            self.imageCache.setDescription(
+                snapshot.imageId, changes["image_description"]
+            )
+        if self.mirror is not None:
+            self.mirror.updateSubQuestion(
+                snapshot.questionId,
+                snapshot.subQuestionId,
+                {
+                    field: value
+                    for field, value in changes.items()
+                    if field not in failed
+                },
+            )
+
+        retry = {
+            field: changes[field]
+            for field, error in failed.items()
+            if isRetryableError(error)
+        }
+        return {
+            "saved": [field for field in changes if field not in failed],
+            "retry": retry,
+            "failed": {
+                field: str(error)
+                for field, error in failed.items()
+                if field not in retry
+            },
+            "error": str(next(iter(failed.values()))) if failed else None,
+            "conflict": None,
+        }
+
+    def _isSaveRejected(self, failed: Dict[str, Exception]) -> bool:
+        """Check if the server rejected a change because of the state it is in
+
+        Args:
+            failed (Dict[str, Exception]): The error of every field that failed
+
+        Returns:
+            bool: True if a change was answered with a 404 or 409 status
+        """
+        return any(
+            isinstance(error, httpx.HTTPStatusError)
+            and error.response.status_code in (404, 409)
+            for error in failed.values()
+        )
+
+    def _applySubQuestionChanges(
+        self, snapshot: SubQuestionSnapshot, changes: dict
+    ) -> Dict[str, Optional[Exception]]:
+        """Send the setter calls of the changed fields of a sub-question concurrently
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The new values of the changed fields
+
+        Returns:
+            Dict[str, Optional[Exception]]: The error of every changed field, None if
+                it was saved
+        """
+        if not changes:
+            return {}
+
+        setters = self._subQuestionSetters(snapshot)
+        with ThreadPoolExecutor(
+            max_workers=min(self.maxSaveWorkers, len(changes))
+        ) as pool:
+            futures = {
+                field: pool.submit(setters[field], value)
+                for field, value in changes.items()
+            }
+            return {field: future.exception() for field, future in futures.items()}
+
+    def _subQuestionSetters(self, snapshot: SubQuestionSnapshot) -> dict:
+        """Get the bank call saving each field of a sub-question
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+
+        Returns:
+            dict: The setter of every field, called with the new value
+        """
+        bank = self.bank
+        subQuestionId = snapshot.subQuestionId
+
+        return {
+            "question_name": lambda name: bank.set_question_name(
+                question_id=snapshot.questionId, name=name
+            ),
+            "image_description": lambda description: bank.set_image_description(
+                image_id=snapshot.imageId, description=description
+            ),
+            "image_id": lambda _: bank.delete_sub_question_image(
+                sub_question_id=subQuestionId
+            ),
+            "description": lambda description: bank.set_sub_question_description(
+                sub_question_id=subQuestionId, description=description
+            ),
+            "answer": lambda answer: bank.set_sub_question_answer(
+                sub_question_id=subQuestionId, answer=answer
+            ),
+            "concept": lambda concept: bank.set_sub_question_concept(
+                sub_question_id=subQuestionId, concept=concept
+            ),
+            "process": lambda process: bank.set_sub_question_process(
+                sub_question_id=subQuestionId, process=process
+            ),
+            "keywords": lambda keywords: bank.set_sub_question_keywords(
+                sub_question_id=subQuestionId, keywords=keywords
+            ),
+            "options": lambda options: bank.set_sub_question_options(
+                sub_question_id=subQuestionId, options=options
+            ),
+        }
+
+    def _checkSaveConflict(self, snapshot: SubQuestionSnapshot, changes: dict):
+        """Re-read a sub-question after a rejected save to detect a concurrent edit
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The changes that were being saved
+
+        Raises:
+            LookupError: If the sub-question no longer exists
+            SaveConflictError: If a changed field was also changed on the server
+        """
+        questions = self.bank.get_questions(question_id=snapshot.questionId)
+        self._raiseSaveConflict(snapshot, questions, changes)
+
+    def _raiseSaveConflict(
+        self, snapshot: SubQuestionSnapshot, questions: list, changes: dict
+    ):
+        """Compare the re-read sub-question with the snapshot of a rejected save
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            questions (list): The question as it was read again
+            changes (dict): The changes that were being saved
+
+        Raises:
+            LookupError: If the sub-question no longer exists
+            SaveConflictError: If a changed field was also changed on the server
+        """
+        if not questions:
+            raise LookupError("Question not found")
+
+        for subQuestion in questions[0].sub_questions:
+            if subQuestion.id == snapshot.subQuestionId:
+                break
+        else:
+            raise LookupError("Sub-question not found")
+
+        conflicts = snapshot.conflicts(questions[0], subQuestion, changes)
+        if conflicts:
+            raise SaveConflictError(
+                f"Changed on the server since it was loaded: {', '.join(conflicts)}"
+            )
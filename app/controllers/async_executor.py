@@ -0,0 +1,171 @@
+import time
+import heapq
+import asyncio
+import threading
+from itertools import count
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.metrics import metrics
+from app.controllers.api_errors import ApiError, ErrorKind
+from app.controllers.executor import ApiJob, BaseApiExecutor
+
+
+class AsyncLoopThread:
+    """Bridge running an asyncio event loop next to the Qt event loop
+
+    The loop runs on one dedicated thread, so any number of concurrent requests only
+    needs that thread, and the GUI thread never blocks on network or disk I/O.
+    Coroutines are scheduled from the GUI thread and report back through queued Qt
+    signals.
+    """
+
+    def __init__(self, name: str = "api-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def callSoon(self, callback: Callable, *args):
+        """Schedule a callback on the loop from any thread
+
+        Args:
+            callback (Callable): The callback to call on the loop
+            *args: The arguments of the callback
+        """
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None):
+        """Run a coroutine on the loop and wait for its result
+
+        Args:
+            coroutine (Awaitable): The coroutine to run
+            timeout (Optional[float]): The maximum time to wait, in seconds
+
+        Returns:
+            object: The result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def stop(self):
+        """Cancel the remaining tasks, stop the loop and wait for its thread"""
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+
+class AsyncApiJob(ApiJob):
+    """A single API operation running as a coroutine on the event loop thread"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.task: Optional[asyncio.Task] = None
+
+    def cancel(self):
+        """Cancel the job
+
+        Unlike a job on the thread pool, a running job is interrupted at its next
+        await, so its requests in flight are abandoned.
+        """
+        super().cancel()
+        self.executor.loopThread.callSoon(self._cancelTask)
+
+    def _cancelTask(self):
+        if self.task is not None:
+            self.task.cancel()
+
+
+class AsyncApiExecutor(BaseApiExecutor):
+    """Runs API jobs as coroutines on a single event loop thread
+
+    Up to ``maxConcurrency`` jobs run at once, and queued jobs start by priority.
+    ``handler`` is a coroutine function taking the job, and ``closer`` an optional
+    coroutine function awaited on the loop when the executor shuts down.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ApiJob], Awaitable],
+        maxConcurrency: int = 64,
+        closer: Optional[Callable[[], Awaitable]] = None,
+        parent=None,
+    ):
+        super().__init__(handler, parent)
+        self.maxConcurrency = maxConcurrency
+        self.closer = closer
+
+        self.loopThread = AsyncLoopThread()
+
+        # Only touched on the loop thread
+        self.queue: List[Tuple[int, int, AsyncApiJob]] = []
+        self.sequence = count()
+        self.runningCount = 0
+
+    def cancel(self, job: ApiJob):
+        """Cancel a job
+
+        Args:
+            job (ApiJob): The job to cancel
+        """
+        job.cancel()
+        self._removeJob(job)
+
+    def shutdown(self):
+        """Cancel every job, close the client and stop the event loop"""
+        for job in list(self.jobs):
+            self.cancel(job)
+        if self.closer is not None and self.loopThread.thread.is_alive():
+            self.loopThread.run(self.closer())
+        self.loopThread.stop()
+
+    def _createJob(self, *args) -> AsyncApiJob:
+        return AsyncApiJob(self, *args)
+
+    def _start(self, job: AsyncApiJob):
+        self.loopThread.callSoon(self._enqueue, job)
+
+    def _enqueue(self, job: AsyncApiJob):
+        heapq.heappush(self.queue, (-int(job.priority), next(self.sequence), job))
+        self._pump()
+
+    def _pump(self):
+        """Start queued jobs by priority while there is room"""
+        while self.queue and self.runningCount < self.maxConcurrency:
+            _, _, job = heapq.heappop(self.queue)
+            if job.isCancelled():
+                continue
+            self.runningCount += 1
+            job.task = self.loopThread.loop.create_task(self._runJob(job))
+
+    async def _runJob(self, job: AsyncApiJob):
+        """Execute the operation of a job on the loop
+
+        Args:
+            job (AsyncApiJob): The job to execute
+        """
+        metrics.record("api.queued", time.perf_counter() - job.submittedAt)
+        try:
+            with metrics.span(f"api.{job.operation}"):
+                result = await self.handler(job)
+        except asyncio.CancelledError:
+            self._jobFinished.emit(
+                job, False, ApiError("Cancelled", ErrorKind.CANCELLED, job.operation)
+            )
+        except Exception as e:
+            self._jobFinished.emit(job, False, ApiError.fromException(e, job.operation))
+        else:
+            self._jobFinished.emit(job, True, result)
+        finally:
+            self.runningCount -= 1
+            self._pump()
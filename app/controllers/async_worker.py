@@ -0,0 +1,365 @@
+import time
+import asyncio
+from typing import Dict, Optional
+from nanoko import AsyncNanoko
+
+from app.models.image_cache import ImageCache
+from app.models.question_mirror import QuestionMirror
+from app.models.sub_question_snapshot import SubQuestionSnapshot
+from app.models.pixmap_cache import decodePreviewImage
+from app.controllers.api_worker import ApiWorker
+from app.controllers.cached_bank import AsyncCachedBank
+from app.controllers.api_errors import SaveConflictError
+from app.controllers.retry_policy import AsyncRetryingBank, RetryPolicy
+from app.controllers.question_loader import AsyncQuestionStreamLoader
+from app.controllers.executor import ApiJob
+
+
+class AsyncApiWorker(ApiWorker):
+    """Performs API operations for jobs running on the event loop thread
+
+    Mirrors ``ApiWorker`` with an async Nanoko client: requests a job fans out run
+    as concurrent coroutines instead of pool threads, and the disk and image
+    decoding work is moved off the loop so it never stalls other requests.
+    """
+
+    def __init__(
+        self,
+        nanokoClient: AsyncNanoko,
+        imageCache: ImageCache,
+        maxSaveWorkers: int = 4,
+        maxBulkWorkers: int = 8,
+        mirror: Optional[QuestionMirror] = None,
+        retryPolicy: Optional[RetryPolicy] = None,
+    ):
+        super().__init__(
+            nanokoClient,
+            imageCache,
+            maxSaveWorkers,
+            maxBulkWorkers,
+            mirror,
+            retryPolicy,
+        )
+        self.bank = AsyncCachedBank(
+            AsyncRetryingBank(nanokoClient.bank, self.retryPolicy)
+        )
+
+    async def run(self, job: ApiJob):
+        """Execute the operation of a job
+
+        Args:
+            job (ApiJob): The job to execute
+
+        Returns:
+            object: The result of the operation
+
+        Raises:
+            Exception: If the operation failed
+        """
+        operation = job.operation
+        params = job.params
+
+        # Login operation
+        if operation == "login":
+            await self.retryPolicy.callAsync(
+                "login",
+                lambda: self.nanokoClient.user.login(
+                    username=params.get("username", ""),
+                    password=params.get("password", ""),
+                ),
+            )
+            return None
+
+        # Load the questions mirrored by an earlier session
+        elif operation == "load_mirror":
+            count = 0
+            if self.mirror is not None:
+                chunks = self.mirror.iterQuestions()
+                while not job.isCancelled():
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    job.reportProgress(chunk)
+                    count += len(chunk)
+            return count
+
+        # Load a single question mirrored by an earlier listing
+        elif operation == "load_mirrored_question":
+            if self.mirror is None:
+                return None
+            return await asyncio.to_thread(self.mirror.get, params.get("questionId"))
+
+        # Build the full-text index of the mirrored sub-questions
+        elif operation == "index_mirror":
+            if self.mirror is None:
+                return False
+            return await asyncio.to_thread(self.mirror.indexText)
+
+        # Search the texts of the mirrored sub-questions
+        elif operation == "search_sub_questions":
+            if self.mirror is None:
+                return []
+            return await asyncio.to_thread(
+                self.mirror.searchSubQuestions,
+                params.get("text", ""),
+                params.get("limit", 1000),
+            )
+
+        # Load questions list, reporting each chunk as it arrives
+        elif operation == "load_questions":
+            self.bank.invalidate("get_questions")
+            loader = AsyncQuestionStreamLoader(
+                self.nanokoClient,
+                firstRangeSize=params.get("firstRangeSize", 40),
+                bank=self.bank,
+                retryPolicy=self.retryPolicy,
+            )
+            sync = None
+            if self.mirror is not None:
+                sync = await asyncio.to_thread(self.mirror.beginSync)
+            count = 0
+            async for chunk in loader.iterChunks(job.isCancelled):
+                # Mirrored first, the GUI thread overlays queued edits on the chunk
+                if sync is not None:
+                    await asyncio.to_thread(sync.apply, chunk)
+                job.reportProgress(chunk)
+                count += len(chunk)
+            return await asyncio.to_thread(self._finishListSync, sync, count, job)
+
+        # Load single question
+        elif operation == "load_question":
+            questionId = params.get("questionId")
+
+            questions = await self.bank.get_questions(question_id=questionId)
+
+            if not questions:
+                raise LookupError("Question not found")
+            if self.mirror is not None:
+                await asyncio.to_thread(self.mirror.put, questions[:1])
+            return questions[0]
+
+        # Approve Question
+        elif operation == "question_approved":
+            questionId = params.get("questionId")
+            await self.bank.approve_question(question_id=questionId)
+            if self.mirror is not None:
+                await asyncio.to_thread(self.mirror.setFlag, [questionId], "is_audited")
+            return None
+
+        # Delete Question
+        elif operation == "question_deleted":
+            questionId = params.get("questionId")
+            await self.bank.delete_question(question_id=questionId)
+            if self.mirror is not None:
+                await asyncio.to_thread(self.mirror.setFlag, [questionId], "is_deleted")
+            return None
+
+        # Approve or delete many questions
+        elif operation == "bulk_question_action":
+            return await self._runBulkQuestionAction(job)
+
+        # Load image
+        elif operation == "load_image":
+            imageId = params.get("imageId")
+
+            cached = await asyncio.to_thread(self.imageCache.get, imageId)
+            if cached is not None:
+                image = cached["thumbnail"] or cached["image"]
+                description = cached["description"]
+            else:
+                image, description = await asyncio.gather(
+                    self.bank.get_image(image_id=imageId),
+                    self.bank.get_image_description(image_id=imageId),
+                )
+                await asyncio.to_thread(
+                    self.imageCache.put, imageId, image, description
+                )
+
+            return {
+                "imageId": imageId,
+                "image": await asyncio.to_thread(decodePreviewImage, image),
+                "description": description,
+            }
+
+        # Upload image
+        elif operation == "upload_image":
+            filePath = params.get("filePath")
+            imageId = params.get("imageId")
+            subQuestionId = params.get("subQuestionId")
+            description = params.get("description", "Input the image description here")
+
+            image = await asyncio.to_thread(self._readFile, filePath)
+
+            imageHash = await self.bank.upload_image(file=image)
+
+            if imageId != -1:
+                await self.bank.set_image_hash(image_id=imageId, hash=imageHash)
+                await asyncio.to_thread(
+                    self._replaceCachedImage, imageId, image, imageHash
+                )
+            else:
+                imageId = await self.bank.add_image(
+                    hash=imageHash,
+                    description=description,
+                )
+                await self.bank.set_sub_question_image(
+                    sub_question_id=subQuestionId, image_id=imageId
+                )
+                await asyncio.to_thread(
+                    self.imageCache.put, imageId, image, description, imageHash
+                )
+
+            return imageId
+
+        # Send an edit waiting in the save queue
+        elif operation == "flush_save":
+            return await self._flushSave(
+                params.get("snapshot"), params.get("changes"), params.get("verify")
+            )
+
+        raise ValueError(f"Unknown operation: {operation}")
+
+    async def close(self):
+        """Close the HTTP client of the Nanoko client"""
+        await self.nanokoClient.client.aclose()
+
+    def _readFile(self, filePath: str) -> bytes:
+        with open(filePath, "rb") as f:
+            return f.read()
+
+    def _replaceCachedImage(self, imageId: int, image: bytes, imageHash: str):
+        """Replace the cached payload of an image whose file was uploaded again
+
+        Args:
+            imageId (int): The id of the image
+            image (bytes): The new image payload
+            imageHash (str): The hash of the new image
+        """
+        cached = self.imageCache.get(imageId)
+        if cached is not None:
+            self.imageCache.put(imageId, image, cached["description"], imageHash)
+        else:
+            self.imageCache.invalidate(imageId)
+
+    async def _runBulkQuestionAction(self, job: ApiJob) -> dict:
+        """Approve or delete questions with bounded concurrency
+
+        Outcomes are reported through the job progress in batches. Setting the stop
+        event stops the action once the requests in flight have finished.
+
+        Args:
+            job (ApiJob): The job with the action, the question IDs and the stop event
+
+        Returns:
+            dict: The succeeded question IDs, the error message of every failed
+                question and whether the action was stopped
+        """
+        action = job.params.get("action")
+        questionIds = job.params.get("questionIds")
+        stopEvent = job.params.get("stopEvent")
+
+        bank = self.bank
+        perform = {
+            "approve": bank.approve_question,
+            "delete": bank.delete_question,
+        }[action]
+
+        summary = {"succeeded": [], "failed": {}, "cancelled": False}
+        batch = {"succeeded": [], "failed": {}}
+        lastReport = time.monotonic()
+        semaphore = asyncio.Semaphore(self.maxBulkWorkers)
+
+        async def apply(questionId):
+            nonlocal batch, lastReport
+            async with semaphore:
+                # Questions still waiting for a slot are skipped once stopped
+                if stopEvent.is_set():
+                    summary["cancelled"] = True
+                    return
+                try:
+                    await perform(question_id=questionId)
+                except Exception as e:
+                    summary["failed"][questionId] = str(e)
+                    batch["failed"][questionId] = str(e)
+                else:
+                    summary["succeeded"].append(questionId)
+                    batch["succeeded"].append(questionId)
+
+            if time.monotonic() - lastReport >= self.BULK_REPORT_INTERVAL:
+                job.reportProgress(batch)
+                batch = {"succeeded": [], "failed": {}}
+                lastReport = time.monotonic()
+
+        await asyncio.gather(*(apply(questionId) for questionId in questionIds))
+
+        job.reportProgress(batch)
+        if self.mirror is not None:
+            field = "is_audited" if action == "approve" else "is_deleted"
+            await asyncio.to_thread(self.mirror.setFlag, summary["succeeded"], field)
+        return summary
+
+    async def _flushSave(
+        self, snapshot: SubQuestionSnapshot, changes: dict, verify: bool
+    ) -> dict:
+        """Send a queued edit of a sub-question and classify its outcome
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The new values of the changed fields
+            verify (bool): Whether to check the sub-question was not changed on the
+                server before sending, for edits that waited in the queue
+
+        Returns:
+            dict: The saved fields, the fields to send again, the error message of
+                every field that failed for good, and the conflict message if the
+                edit was rejected because of a concurrent edit
+        """
+        try:
+            if verify:
+                self.bank.invalidate("get_questions", question_id=snapshot.questionId)
+                questions = await self.bank.get_questions(
+                    question_id=snapshot.questionId
+                )
+                self._raiseSaveConflict(snapshot, questions, changes)
+
+            errors = await self._applySubQuestionChanges(snapshot, changes)
+            failed = {field: error for field, error in errors.items() if error}
+
+            if self._isSaveRejected(failed):
+                questions = await self.bank.get_questions(
+                    question_id=snapshot.questionId
+                )
+                self._raiseSaveConflict(snapshot, questions, failed)
+        except (SaveConflictError, LookupError) as e:
+            return {"saved": [], "retry": {}, "failed": {}, "conflict": str(e)}
+        except Exception as e:
+            # The sub-question could not be read again, send the whole edit again
+            failed = dict.fromkeys(changes, e)
+
+        return await asyncio.to_thread(self._flushOutcome, snapshot, changes, failed)
+
+    async def _applySubQuestionChanges(
+        self, snapshot: SubQuestionSnapshot, changes: dict
+    ) -> Dict[str, Optional[Exception]]:
+        """Send the setter calls of the changed fields of a sub-question concurrently
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (dict): The new values of the changed fields
+
+        Returns:
+            Dict[str, Optional[Exception]]: The error of every changed field, None if
+                it was saved
+        """
+        if not changes:
+            return {}
+
+        setters = self._subQuestionSetters(snapshot)
+        results = await asyncio.gather(
+            *(setters[field](value) for field, value in changes.items()),
+            return_exceptions=True,
+        )
+        return {
+            field: result if isinstance(result, Exception) else None
+            for field, result in zip(changes, results, strict=True)
+        }
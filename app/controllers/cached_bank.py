@@ -0,0 +1,212 @@
+import time
+import asyncio
+import threading
+from pydantic import BaseModel
+from concurrent.futures import Future
+from typing import Dict, Hashable, Optional, Tuple
+
+
+def copyResult(result):
+    """Copy the models of a read result, so callers never share them
+
+    Args:
+        result (object): The result of a read
+
+    Returns:
+        object: The result, with deep copies of its models
+    """
+    if isinstance(result, list):
+        return [copyResult(item) for item in result]
+    if isinstance(result, BaseModel):
+        return result.model_copy(deep=True)
+    return result
+
+
+class CachedBank:
+    """Coalescing and memoizing facade in front of the bank API of a Nanoko client
+
+    Identical reads issued while one is in flight share its result instead of sending
+    another request, and read results are kept for a time to live per method. Every
+    other call is forwarded as a write and invalidates the reads it may affect.
+    Every caller receives its own copy of the models read, as callers edit them in
+    place.
+
+    The facade is safe to use from several threads at once.
+    """
+
+    READ_TTLS = {
+        "get_questions": 30.0,
+        "get_image_description": 300.0,
+        # Image bytes are already kept by the image caches, only coalesce them
+        "get_image": 0.0,
+    }
+    IMAGE_WRITES = {
+        "upload_image",
+        "add_image",
+        "set_image_hash",
+        "set_image_description",
+    }
+
+    def __init__(self, bank, readTtls: Optional[Dict[str, float]] = None):
+        self.bank = bank
+        self.readTtls = {**self.READ_TTLS, **(readTtls or {})}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.inFlight: Dict[Hashable, Future] = {}
+        self.memo: Dict[Hashable, Tuple[float, object]] = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.bank, name)
+        if not callable(method):
+            return method
+        if name in self.readTtls:
+            return lambda **kwargs: self._read(name, method, kwargs)
+        return lambda **kwargs: self._write(name, method, kwargs)
+
+    def invalidate(self, name: Optional[str] = None, **kwargs):
+        """Drop memoized reads
+
+        Args:
+            name (Optional[str]): Only drop reads of this method
+            **kwargs: Only drop reads made with these arguments
+        """
+        with self.lock:
+            self.generation += 1
+            for key in list(self.memo):
+                keyName, keyArgs = key
+                if name is not None and keyName != name:
+                    continue
+                if any(
+                    dict(keyArgs).get(arg) != value for arg, value in kwargs.items()
+                ):
+                    continue
+                del self.memo[key]
+
+    def _read(self, name: str, method, kwargs: dict):
+        """Perform a read, sharing in-flight requests and memoized results
+
+        Args:
+            name (str): The name of the bank method
+            method (Callable): The bank method
+            kwargs (dict): The arguments of the read
+
+        Returns:
+            object: The result of the read
+        """
+        key = (name, tuple(sorted(kwargs.items())))
+
+        with self.lock:
+            memoized = self.memo.get(key)
+            if memoized is not None and memoized[0] > time.monotonic():
+                return copyResult(memoized[1])
+
+            future = self.inFlight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inFlight[key] = Future()
+                generation = self.generation
+
+        if not owner:
+            return copyResult(future.result())
+
+        try:
+            result = method(**kwargs)
+        except BaseException as e:
+            with self.lock:
+                del self.inFlight[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.inFlight[key]
+            # A write made while the read was in flight may have made it stale
+            ttl = self.readTtls[name]
+            if ttl > 0 and generation == self.generation:
+                self.memo[key] = (time.monotonic() + ttl, result)
+        future.set_result(result)
+        return copyResult(result)
+
+    def _write(self, name: str, method, kwargs: dict):
+        """Perform a write and invalidate the reads it affects
+
+        Args:
+            name (str): The name of the bank method
+            method (Callable): The bank method
+            kwargs (dict): The arguments of the write
+
+        Returns:
+            object: The result of the write
+        """
+        try:
+            return method(**kwargs)
+        finally:
+            if "image_id" in kwargs:
+                self.invalidate("get_image", image_id=kwargs["image_id"])
+                self.invalidate("get_image_description", image_id=kwargs["image_id"])
+            if name not in self.IMAGE_WRITES:
+                # Questions embed their sub-questions, so any of them may be affected
+                self.invalidate("get_questions")
+
+
+class AsyncCachedBank(CachedBank):
+    """Coalescing and memoizing facade in front of the bank API of an async client
+
+    Behaves like ``CachedBank``, but its methods are coroutines and in-flight reads
+    are shared as asyncio futures. It must only be used from one event loop.
+    """
+
+    async def _read(self, name: str, method, kwargs: dict):
+        """Perform a read, sharing in-flight requests and memoized results
+
+        Args:
+            name (str): The name of the bank method
+            method (Callable): The bank coroutine method
+            kwargs (dict): The arguments of the read
+
+        Returns:
+            object: The result of the read
+        """
+        key = (name, tuple(sorted(kwargs.items())))
+
+        memoized = self.memo.get(key)
+        if memoized is not None and memoized[0] > time.monotonic():
+            return copyResult(memoized[1])
+
+        future = self.inFlight.get(key)
+        if future is not None:
+            # Shielded so a cancelled waiter does not cancel the shared read
+            return copyResult(await asyncio.shield(future))
+
+        future = self.inFlight[key] = asyncio.ensure_future(method(**kwargs))
+        generation = self.generation
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self.inFlight.get(key) is future:
+                del self.inFlight[key]
+
+        # A write made while the read was in flight may have made it stale
+        ttl = self.readTtls[name]
+        if ttl > 0 and generation == self.generation:
+            self.memo[key] = (time.monotonic() + ttl, result)
+        return copyResult(result)
+
+    async def _write(self, name: str, method, kwargs: dict):
+        """Perform a write and invalidate the reads it affects
+
+        Args:
+            name (str): The name of the bank method
+            method (Callable): The bank coroutine method
+            kwargs (dict): The arguments of the write
+
+        Returns:
+            object: The result of the write
+        """
+        try:
+            return await method(**kwargs)
+        finally:
+            if "image_id" in kwargs:
+                self.invalidate("get_image", image_id=kwargs["image_id"])
+                self.invalidate("get_image_description", image_id=kwargs["image_id"])
+            if name not in self.IMAGE_WRITES:
+                self.invalidate("get_questions")
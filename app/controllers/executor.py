@@ -0,0 +1,291 @@
+import time
+import threading
+from enum import IntEnum
+from abc import ABCMeta, abstractmethod
+from typing import Callable, List, Optional
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from app.metrics import metrics
+from app.controllers.api_errors import ApiError, ErrorKind
+
+
+class JobPriority(IntEnum):
+    """Priority of a job in the executor queue"""
+
+    LOW = 0
+    NORMAL = 5
+    HIGH = 10
+
+
+class ApiJob(QRunnable):
+    """A single API operation scheduled on the executor"""
+
+    def __init__(
+        self,
+        executor: "BaseApiExecutor",
+        operation: str,
+        params: dict,
+        callback: Optional[Callable] = None,
+        priority: JobPriority = JobPriority.NORMAL,
+        group: Optional[str] = None,
+        progress: Optional[Callable] = None,
+    ):
+        super().__init__()
+        self.setAutoDelete(False)
+
+        self.executor = executor
+        self.operation = operation
+        self.params = params
+        self.callback = callback
+        self.progress = progress
+        self.priority = priority
+        self.group = group or operation
+
+        self._cancelled = threading.Event()
+        self.submittedAt = time.perf_counter()
+
+    def cancel(self):
+        """Cancel the job
+
+        A queued job is removed from the pool, a running job finishes its current
+        request but its result is discarded.
+        """
+        self._cancelled.set()
+
+    def isCancelled(self):
+        """Check if the job has been cancelled
+
+        Returns:
+            bool: True if the job has been cancelled, False otherwise
+        """
+        return self._cancelled.is_set()
+
+    def reportProgress(self, value: object):
+        """Report a partial result of the job from the pool thread
+
+        Args:
+            value (object): The partial result, passed to the progress callback
+        """
+        if not self.isCancelled():
+            self.executor._jobProgress.emit(self, value)
+
+    def run(self):
+        """Execute the operation on a pool thread
+
+        A failed operation reports an ``ApiError`` describing the failure.
+        """
+        if self.isCancelled():
+            self.executor._jobFinished.emit(
+                self, False, ApiError("Cancelled", ErrorKind.CANCELLED, self.operation)
+            )
+            return
+
+        metrics.record("api.queued", time.perf_counter() - self.submittedAt)
+        try:
+            with metrics.span(f"api.{self.operation}"):
+                result = self.executor.handler(self)
+        except Exception as e:
+            self.executor._jobFinished.emit(
+                self, False, ApiError.fromException(e, self.operation)
+            )
+        else:
+            self.executor._jobFinished.emit(self, True, result)
+
+
+class QABCMeta(type(QObject), ABCMeta):
+    """Metaclass of abstract QObject classes
+
+    ``abc.ABC`` cannot be mixed into a QObject, the two metaclasses conflict.
+    """
+
+
+class BaseApiExecutor(QObject, metaclass=QABCMeta):
+    """Job bookkeeping shared by the API executors
+
+    Subclasses decide how jobs run; their callbacks are always invoked on the thread
+    owning the executor (the GUI thread). A subclass missing one of the abstract
+    methods fails as soon as it is instantiated.
+    """
+
+    _jobFinished = pyqtSignal(object, bool, object)  # job, success, result/error
+    _jobProgress = pyqtSignal(object, object)  # job, partial result
+
+    def __init__(self, handler: Callable, parent=None):
+        super().__init__(parent)
+        self.handler = handler
+
+        self.jobs: List[ApiJob] = []
+
+        self._jobFinished.connect(self._onJobFinished)
+        self._jobProgress.connect(self._onJobProgress)
+
+    def submit(
+        self,
+        operation: str,
+        callback: Optional[Callable] = None,
+        priority: JobPriority = JobPriority.NORMAL,
+        group: Optional[str] = None,
+        progress: Optional[Callable] = None,
+        **params,
+    ) -> ApiJob:
+        """Submit an operation to the executor
+
+        Args:
+            operation (str): The operation to perform
+            callback (Optional[Callable]): Called with (success, result) on the GUI
+                thread, the result being an ``ApiError`` if the operation failed
+            priority (JobPriority): The priority of the job in the queue
+            group (Optional[str]): The group of the job, defaults to the operation
+            progress (Optional[Callable]): Called with each partial result on the GUI thread
+            **params: Additional parameters for the operation
+
+        Returns:
+            ApiJob: The scheduled job
+        """
+        job = self._createJob(operation, params, callback, priority, group, progress)
+        self.jobs.append(job)
+        self._start(job)
+        return job
+
+    @abstractmethod
+    def cancel(self, job: ApiJob):
+        """Cancel a job
+
+        Args:
+            job (ApiJob): The job to cancel
+        """
+
+    @abstractmethod
+    def shutdown(self):
+        """Cancel every job and wait for the running ones to finish"""
+
+    def cancelGroup(self, group: str):
+        """Cancel all pending and running jobs of a group
+
+        Args:
+            group (str): The group of jobs to cancel
+        """
+        for job in list(self.jobs):
+            if job.group == group:
+                self.cancel(job)
+
+    def pendingJobs(self, group: Optional[str] = None) -> List[ApiJob]:
+        """Get the jobs which are not finished yet
+
+        Args:
+            group (Optional[str]): Only return jobs of this group
+
+        Returns:
+            List[ApiJob]: The pending and running jobs
+        """
+        return [
+            job
+            for job in self.jobs
+            if not job.isCancelled() and (group is None or job.group == group)
+        ]
+
+    def findPendingJob(
+        self, operation: str, group: Optional[str] = None, **params
+    ) -> Optional[ApiJob]:
+        """Find a pending or running job performing an operation
+
+        Args:
+            operation (str): The operation of the job
+            group (Optional[str]): Only consider jobs of this group
+            **params: Parameters the job must have been submitted with
+
+        Returns:
+            Optional[ApiJob]: The first matching job, or None if there is none
+        """
+        for job in self.pendingJobs(group):
+            if job.operation == operation and all(
+                job.params.get(key) == value for key, value in params.items()
+            ):
+                return job
+        return None
+
+    def _createJob(self, *args) -> ApiJob:
+        return ApiJob(self, *args)
+
+    @abstractmethod
+    def _start(self, job: ApiJob):
+        """Start running a submitted job
+
+        Args:
+            job (ApiJob): The job to run
+        """
+
+    def _removeJob(self, job: ApiJob):
+        """Forget a finished or cancelled job
+
+        Args:
+            job (ApiJob): The job to forget
+        """
+        try:
+            self.jobs.remove(job)
+        except ValueError:
+            pass
+
+    @pyqtSlot(object, bool, object)
+    def _onJobFinished(self, job: ApiJob, success: bool, result: object):
+        """Route the result of a job to its callback on the GUI thread
+
+        Args:
+            job (ApiJob): The finished job
+            success (bool): Whether the job was successful
+            result (object): The result of the job or the error message
+        """
+        self._removeJob(job)
+
+        if job.isCancelled() or job.callback is None:
+            return
+
+        job.callback(success, result)
+
+    @pyqtSlot(object, object)
+    def _onJobProgress(self, job: ApiJob, value: object):
+        """Route a partial result of a job to its progress callback on the GUI thread
+
+        Args:
+            job (ApiJob): The running job
+            value (object): The partial result
+        """
+        if job.isCancelled() or job.progress is None:
+            return
+
+        job.progress(value)
+
+
+class ApiExecutor(BaseApiExecutor):
+    """Bounded thread pool running API jobs concurrently
+
+    Jobs are executed by ``handler`` on pool threads, and their callbacks are always
+    invoked on the thread owning the executor (the GUI thread).
+    """
+
+    def __init__(
+        self, handler: Callable[[ApiJob], object], maxThreads: int = 4, parent=None
+    ):
+        super().__init__(handler, parent)
+
+        self.threadPool = QThreadPool(self)
+        self.threadPool.setMaxThreadCount(maxThreads)
+
+    def cancel(self, job: ApiJob):
+        """Cancel a job
+
+        Args:
+            job (ApiJob): The job to cancel
+        """
+        job.cancel()
+        if self.threadPool.tryTake(job):
+            self._removeJob(job)
+
+    def shutdown(self):
+        """Cancel every job and wait for the running ones to finish"""
+        for job in list(self.jobs):
+            self.cancel(job)
+        self.threadPool.waitForDone()
+
+    def _start(self, job: ApiJob):
+        self.threadPool.start(job, int(job.priority))
@@ -1,279 +1,318 @@
-from nanoko import Nanoko
-from nanoko.models.question import Question
-from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
-
+import os
+import time
+import hashlib
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Optional
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import (
+    QEvent,
+    QObject,
+    QSettings,
+    QStandardPaths,
+    QTimer,
+    pyqtSlot,
+)
+
+from app.metrics import metrics
 from app.views.login_window import LoginWindow
-from app.views.question_list_window import QuestionListWindow
-from app.views.sub_question_edit_window import SubQuestionEditWindow
+from app.controllers.executor import JobPriority
+from app.controllers.window_manager import WindowManager
 
+# The API client, the models and the other windows are imported when they are first
+# needed, so the login window is shown without waiting for them
+if TYPE_CHECKING:
+    from nanoko.models.question import Question
+    from app.views.question_list_window import QuestionListWindow
+    from app.views.sub_question_edit_window import SubQuestionEditWindow
 
-class ApiWorker(QThread):
-    """Worker thread for API operations"""
 
-    loginFinished = pyqtSignal(bool, object)  # success, result/error
-    questionsLoaded = pyqtSignal(bool, object)  # success, result/error
-    questionLoaded = pyqtSignal(bool, object)  # success, result/error
-    imageLoaded = pyqtSignal(bool, object)  # success, result/error
-    imageUploaded = pyqtSignal(bool, object)  # success, result/error
-    saveFinished = pyqtSignal(bool, object)  # success, result/error
-    questionApproved = pyqtSignal(bool, object)  # success, result/error
-    questionDeleted = pyqtSignal(bool, object)  # success, result/error
+class MainController(QObject):
+    """Main controller to manage application flow"""
 
-    def __init__(self, nanokoClient: Nanoko):
+    API_THREADS = 4
+    API_FAN_OUT = 8
+    API_TASKS = 16
+    API_BACKENDS = ("thread", "async")
+    DEFAULT_BASE_URL = "http://localhost:25324"
+    # Queued edits older than this are checked against the server before sending
+    SAVE_VERIFY_AGE = 30.0
+
+    def __init__(self):
         super().__init__()
-        self.nanokoClient = nanokoClient
-        self.operation = None
-        self.params = None
 
-    def setup(self, operation, **params):
-        """Setup the worker with operation and parameters
+        self.windows = WindowManager()
+        self.windows.register("login", self.createLoginWindow)
+        self.windows.register("list", self.createQuestionListWindow)
+        self.windows.register("edit", self.createSubQuestionEditWindow)
 
-        Args:
-            operation (str): The operation to perform
-            **params: Additional parameters for the operation
-        """
-        self.operation = operation
-        self.params = params
+        self.receivedQuestionChunks = 0
+        self.refreshedQuestions = None
+        self.bulkStopEvent = None
+        self.bulkProcessedCount = 0
+        self.saveQueueActive = False
+        self.executor = None
 
-    def run(self):
-        """Execute the operation in a separate thread"""
-        if not self.operation:
-            return
+        metrics.configure()
 
-        try:
-            # Login operation
-            if self.operation == "login":
-                self.nanokoClient.user.login(
-                    username=self.params.get("username", ""),
-                    password=self.params.get("password", ""),
-                )
-                self.loginFinished.emit(True, None)
-
-            # Load questions list
-            elif self.operation == "load_questions":
-                questions = self.nanokoClient.bank.get_questions()
-                self.questionsLoaded.emit(True, questions)
-
-            # Load single question
-            elif self.operation == "load_question":
-                questionId = self.params.get("questionId")
-
-                questions = self.nanokoClient.bank.get_questions(question_id=questionId)
-
-                if not questions:
-                    self.questionLoaded.emit(False, "Question not found")
-                else:
-                    self.questionLoaded.emit(True, questions[0])
-
-            # Approve Question
-            elif self.operation == "question_approved":
-                questionId = self.params.get("questionId")
-                self.nanokoClient.bank.approve_question(question_id=questionId)
-                self.questionApproved.emit(True, None)
-
-            # Delete Question
-            elif self.operation == "question_deleted":
-                questionId = self.params.get("questionId")
-                self.nanokoClient.bank.delete_question(question_id=questionId)
-                self.questionDeleted.emit(True, None)
-
-            # Load image
-            elif self.operation == "load_image":
-                imageId = self.params.get("imageId")
-                image = self.nanokoClient.bank.get_image(image_id=imageId)
-                description = self.nanokoClient.bank.get_image_description(
-                    image_id=imageId
-                )
-                self.imageLoaded.emit(
-                    True, {"image": image, "description": description}
-                )
+    def setupBackend(self):
+        """Setup the API client, the local stores and the executor, once
 
-            # Upload image
-            elif self.operation == "upload_image":
-                filePath = self.params.get("filePath")
-                imageId = self.params.get("imageId")
-                subQuestionId = self.params.get("subQuestionId")
-                description = self.params.get(
-                    "description", "Input the image description here"
-                )
+        Importing and creating the client is the slowest part of startup, so it
+        runs right after the login window is shown, or as soon as a login is
+        requested.
+        """
+        if self.executor is not None:
+            return
 
-                imageHash = self.nanokoClient.bank.upload_image(file=filePath)
+        from app.models.question_store import QuestionStore
+        from app.models.pixmap_cache import PixmapCache
+
+        with metrics.span("startup.backend"):
+            self.questionStore = QuestionStore()
+            self.apiBackend = self.readApiBackend()
+            self.setupNanokoClient()
+            self.setupImageCache()
+            self.setupQuestionMirror()
+            self.setupSaveQueue()
+            self.pixmapCache = PixmapCache()
+            self.setupExecutor()
+
+    @property
+    def loginWindow(self):
+        """The login window, None unless it is shown"""
+        return self.windows.visible("login")
+
+    @property
+    def questionListWindow(self):
+        """The question list window, None unless it is shown"""
+        return self.windows.visible("list")
+
+    @property
+    def subQuestionEditWindow(self):
+        """The sub-question edit window, None unless it is shown"""
+        return self.windows.visible("edit")
+
+    def readApiBackend(self) -> str:
+        """Read which backend runs the API operations
+
+        The ``api/backend`` setting selects ``thread`` (the default), running
+        operations on a thread pool, or ``async``, running them as coroutines on a
+        single event loop thread.
+
+        Returns:
+            str: The name of the backend
+        """
+        backend = QSettings().value("api/backend", "thread", type=str)
+        return backend if backend in self.API_BACKENDS else "thread"
 
-                if imageId != -1:
-                    self.nanokoClient.bank.set_image_hash(
-                        image_id=imageId, hash=imageHash
-                    )
-                else:
-                    imageId = self.nanokoClient.bank.add_image(
-                        hash=imageHash,
-                        description=description,
-                    )
-                    self.nanokoClient.bank.set_sub_question_image(
-                        sub_question_id=subQuestionId, image_id=imageId
-                    )
+    def setupNanokoClient(self):
+        """Setup nanoko client for API interaction
 
-                self.imageUploaded.emit(True, imageId)
+        The server is read from the ``api/baseUrl`` setting, the local server by
+        default.
+        """
+        from nanoko import AsyncNanoko, Nanoko
+        from app.controllers.transport import (
+            TransportConfig,
+            createAsyncHttpClient,
+            createHttpClient,
+        )
 
-            # Save sub-question
-            elif self.operation == "save_sub_question":
-                subQuestionData = self.params.get("data")
+        baseUrl = QSettings().value("api/baseUrl", self.DEFAULT_BASE_URL, type=str)
 
-                questionId = subQuestionData.get("question_id")
-                subQuestionId = subQuestionData.get("sub_question_id")
-                questionName = subQuestionData.get("question_name")
+        # Every concurrent job may hold a connection and one job may fan out more
+        concurrentJobs = (
+            self.API_TASKS if self.apiBackend == "async" else self.API_THREADS
+        )
+        self.transportConfig = TransportConfig.fromSettings(
+            maxConnections=concurrentJobs - 1 + self.API_FAN_OUT
+        )
+        if self.apiBackend == "async":
+            self.nanokoClient = AsyncNanoko(
+                base_url=baseUrl,
+                client=createAsyncHttpClient(self.transportConfig),
+            )
+        else:
+            self.nanokoClient = Nanoko(
+                base_url=baseUrl,
+                client=createHttpClient(self.transportConfig),
+            )
 
-                if questionName.strip() != "":
-                    self.nanokoClient.bank.set_question_name(
-                        question_id=questionId, name=questionName
-                    )
+    def setupExecutor(self):
+        """Setup the worker and the executor running API operations
 
-                originalSubQuestions = self.nanokoClient.bank.get_questions(
-                    question_id=questionId
-                )
+        Requests are retried and guarded by circuit breakers as configured by the
+        ``retry/*`` settings.
+        """
+        from app.controllers.retry_policy import RetryConfig, RetryPolicy
+
+        self.retryPolicy = RetryPolicy(RetryConfig.fromSettings())
+        if self.apiBackend == "async":
+            from app.controllers.async_worker import AsyncApiWorker
+            from app.controllers.async_executor import AsyncApiExecutor
+
+            self.apiWorker = AsyncApiWorker(
+                self.nanokoClient,
+                self.imageCache,
+                maxBulkWorkers=self.API_FAN_OUT,
+                mirror=self.questionMirror,
+                retryPolicy=self.retryPolicy,
+            )
+            self.executor = AsyncApiExecutor(
+                self.apiWorker.run,
+                maxConcurrency=self.API_TASKS,
+                closer=self.apiWorker.close,
+                parent=self,
+            )
+        else:
+            from app.controllers.api_worker import ApiWorker
+            from app.controllers.executor import ApiExecutor
+
+            self.apiWorker = ApiWorker(
+                self.nanokoClient,
+                self.imageCache,
+                maxBulkWorkers=self.API_FAN_OUT,
+                mirror=self.questionMirror,
+                retryPolicy=self.retryPolicy,
+            )
+            self.executor = ApiExecutor(
+                self.apiWorker.run, maxThreads=self.API_THREADS, parent=self
+            )
 
-                if not originalSubQuestions:
-                    self.saveFinished.emit(False, "Sub-question not found")
+    def setupImageCache(self):
+        """Setup the on-disk cache of sub-question images"""
+        from app.models.image_cache import ImageCache
 
-                originalSubQuestion = None
+        cacheDirectory = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation
+        )
+        self.imageCache = ImageCache(os.path.join(cacheDirectory, "images"))
 
-                for originalSubQuestion_ in originalSubQuestions[0].sub_questions:
-                    if originalSubQuestion_.id == subQuestionId:
-                        originalSubQuestion = originalSubQuestion_
-                        break
+    def setupQuestionMirror(self):
+        """Setup the local mirror of the question bank, one per server"""
+        from app.models.question_mirror import QuestionMirror
 
-                if originalSubQuestion is None:
-                    self.saveFinished.emit(False, "Sub-question not found")
-                    return
+        self.questionMirror = QuestionMirror(self.serverDataPath("bank"))
 
-                originalImageDescription = self.nanokoClient.bank.get_image_description(
-                    image_id=originalSubQuestion.image_id
-                )
+    def setupSaveQueue(self):
+        """Setup the retry of the queued edits, the queue is opened on login"""
+        self.saveQueue = None
+        self.saveQueueUser = None
+        self.saveRetryTimer = QTimer(self)
+        self.saveRetryTimer.setSingleShot(True)
+        self.saveRetryTimer.timeout.connect(self.flushSaveQueue)
 
-                if (
-                    originalSubQuestion.image_id is not None
-                    and originalImageDescription.strip()
-                    != subQuestionData.get("image_description").strip()
-                ):
-                    self.nanokoClient.bank.set_image_description(
-                        image_id=originalSubQuestion.image_id,
-                        description=subQuestionData.get("image_description"),
-                    )
+    def openSaveQueue(self, username: str):
+        """Open the durable queue of edits of a user, one per server and user
 
-                if (
-                    originalSubQuestion.image_id is not None
-                    and subQuestionData.get("image_id") is None
-                ):
-                    self.nanokoClient.bank.delete_sub_question_image(
-                        sub_question_id=subQuestionId
-                    )
+        Edits of another user who logged in before are kept in their own queue, so
+        they are never sent with the credentials of this one.
 
-                if (
-                    originalSubQuestion.description.strip()
-                    != subQuestionData.get("description").strip()
-                ):
-                    self.nanokoClient.bank.set_sub_question_description(
-                        sub_question_id=subQuestionId,
-                        description=subQuestionData.get("description"),
-                    )
+        Args:
+            username (str): The user who logged in
+        """
+        from app.models.save_queue import SaveQueue
 
-                if (
-                    originalSubQuestion.answer.strip()
-                    != subQuestionData.get("answer").strip()
-                ):
-                    self.nanokoClient.bank.set_sub_question_answer(
-                        sub_question_id=subQuestionId,
-                        answer=subQuestionData.get("answer"),
-                    )
+        if self.saveQueue is not None:
+            if self.saveQueueUser == username:
+                return
+            self.saveQueue.close()
 
-                if originalSubQuestion.concept != subQuestionData.get("concept"):
-                    self.nanokoClient.bank.set_sub_question_concept(
-                        sub_question_id=subQuestionId,
-                        concept=subQuestionData.get("concept"),
-                    )
+        self.saveQueue = SaveQueue(self.serverDataPath("saves", username))
+        self.saveQueueUser = username
 
-                if originalSubQuestion.process != subQuestionData.get("process"):
-                    self.nanokoClient.bank.set_sub_question_process(
-                        sub_question_id=subQuestionId,
-                        process=subQuestionData.get("process"),
-                    )
+    def serverDataPath(self, name: str, username: Optional[str] = None) -> str:
+        """Get the path of a database kept per server in the application data
 
-                if originalSubQuestion.keywords != subQuestionData.get("keywords"):
-                    self.nanokoClient.bank.set_sub_question_keywords(
-                        sub_question_id=subQuestionId,
-                        keywords=subQuestionData.get("keywords"),
-                    )
+        Args:
+            name (str): The name of the database
+            username (Optional[str]): The user the database is kept for, if any
 
-                if (originalSubQuestion.options or []) != (
-                    subQuestionData.get("options")
-                ):
-                    self.nanokoClient.bank.set_sub_question_options(
-                        sub_question_id=subQuestionId,
-                        options=subQuestionData.get("options"),
-                    )
+        Returns:
+            str: The path of the database of the configured server
+        """
+        dataDirectory = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.AppDataLocation
+        )
+        os.makedirs(dataDirectory, exist_ok=True)
+        server = hashlib.sha1(self.nanokoClient.base_url.encode()).hexdigest()[:12]
+        if username is not None:
+            user = hashlib.sha1(username.encode()).hexdigest()[:12]
+            return os.path.join(dataDirectory, f"{name}-{server}-{user}.sqlite3")
+        return os.path.join(dataDirectory, f"{name}-{server}.sqlite3")
 
-                self.saveFinished.emit(True, subQuestionData)
+    def start(self):
+        """Start the application flow
 
-        except Exception as e:
-            if self.operation == "login":
-                self.loginFinished.emit(False, str(e))
-            elif self.operation == "load_questions":
-                self.questionsLoaded.emit(False, str(e))
-            elif self.operation == "load_question":
-                self.questionLoaded.emit(False, str(e))
-            elif self.operation == "load_image":
-                self.imageLoaded.emit(False, str(e))
-            elif self.operation == "upload_image":
-                self.imageUploaded.emit(False, str(e))
-            elif self.operation == "save_sub_question":
-                self.saveFinished.emit(False, str(e))
+        The login window is shown first, the rest is set up once it has painted.
+        """
+        self.windows.show("login").installEventFilter(self)
 
+    def eventFilter(self, watched, event):
+        """Setup the backend once the login window painted its first frame
 
-class MainController(QObject):
-    """Main controller to manage application flow"""
+        Args:
+            watched (QObject): The login window
+            event (QEvent): The event sent to the window
 
-    def __init__(self):
-        super().__init__()
+        Returns:
+            bool: False, the event is always passed on
+        """
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            QTimer.singleShot(0, self.setupBackend)
+        return False
 
-        self.loginWindow = None
-        self.questionListWindow = None
-        self.subQuestionEditWindow = None
-
-        self.setupNanokoClient()
-        self.apiWorker = ApiWorker(self.nanokoClient)
-        self.setupApiWorkerConnections()
-
-    def setupApiWorkerConnections(self):
-        """Setup connections for API worker signals"""
-        self.apiWorker.loginFinished.connect(self.onLoginFinished)
-        self.apiWorker.questionsLoaded.connect(self.onQuestionsLoaded)
-        self.apiWorker.questionLoaded.connect(self.onQuestionLoaded)
-        self.apiWorker.imageLoaded.connect(self.onImageLoaded)
-        self.apiWorker.imageUploaded.connect(self.onImageUploaded)
-        self.apiWorker.saveFinished.connect(self.onSaveFinished)
-        self.apiWorker.questionApproved.connect(self.onQuestionApproved)
-        self.apiWorker.questionDeleted.connect(self.onQuestionDeleted)
+    def shutdown(self):
+        """Cancel pending API operations and wait for the running ones
 
-    def setupNanokoClient(self):
-        """Setup nanoko client for API interaction"""
-        self.nanokoClient = Nanoko(base_url="http://localhost:25324")
+        Queued edits which were not sent yet are kept for the next session.
+        """
+        self.windows.closeAll()
+        if self.executor is None:
+            metrics.stopExport()
+            return
 
-    def start(self):
-        """Start the application flow"""
-        self.showLoginWindow()
+        self.saveRetryTimer.stop()
+        self.executor.shutdown()
+        self.imageCache.close()
+        self.questionMirror.close()
+        if self.saveQueue is not None:
+            self.saveQueue.close()
+        metrics.stopExport()
+        if self.apiBackend == "thread":
+            # The async backend closes its client on the event loop
+            self.nanokoClient.client.close()
 
     def showLoginWindow(self):
         """Show the login window"""
-        if self.questionListWindow:
-            self.questionListWindow.close()
-            self.questionListWindow = None
-
-        if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.close()
-            self.subQuestionEditWindow = None
-
-        self.loginWindow = LoginWindow()
-        self.loginWindow.loginRequested.connect(self.performLogin)
-        self.loginWindow.show()
+        # Stop sending the queued edits before another user can log in
+        self.saveQueueActive = False
+        self.saveRetryTimer.stop()
+        self.executor.cancelGroup("save_queue")
+        if self.saveQueue is not None:
+            self.saveQueue.stopSending()
+        self.executor.cancelGroup("load_questions")
+        self.cancelBulkQuestionAction()
+        self.questionStore.clear()
+
+        # The windows are kept for the next login, without the data of this one
+        listWindow = self.windows.get("list")
+        if listWindow is not None:
+            listWindow.clear()
+
+        self.windows.show("login", "list", "edit").reset()
+
+    def createLoginWindow(self) -> LoginWindow:
+        """Build the login window
+
+        Returns:
+            LoginWindow: The window, connected to the controller
+        """
+        window = LoginWindow()
+        window.loginRequested.connect(self.performLogin)
+        return window
 
     def performLogin(self, username, password):
         """Perform login in a separate thread
@@ -282,48 +321,189 @@ class MainController(QObject):
             username (str): The username to login with
             password (str): The password to login with
         """
-        self.apiWorker.setup("login", username=username, password=password)
-        self.apiWorker.start()
+        self.setupBackend()
+        self.executor.submit(
+            "login",
+            partial(self.onLoginFinished, username),
+            priority=JobPriority.HIGH,
+            username=username,
+            password=password,
+        )
 
-    @pyqtSlot(bool, object)
-    def onLoginFinished(self, success, result):
+    def onLoginFinished(self, username, success, result):
         """Handle login completion
 
         Args:
+            username (str): The user who logged in
             success (bool): Whether the login was successful
             result (object): The result of the login
         """
         if success:
+            self.openSaveQueue(username)
             self.showQuestionListWindow()
+            # Send the edits left over from an earlier session
+            self.saveQueueActive = True
+            self.flushSaveQueue()
         else:
-            self.loginWindow.onLoginFailed(result)
+            self.loginWindow.onLoginFailed(str(result))
 
     def showQuestionListWindow(self):
         """Show the question list window"""
-        if self.loginWindow:
-            self.loginWindow.close()
-            self.loginWindow = None
+        window = self.windows.show("list", "login", "edit")
+
+        # Render the stored list right away and only reload it once it is stale. A
+        # window coming back from the editor still shows the list as it was left.
+        if self.questionStore.hasList():
+            if not window.questions:
+                window.populateQuestionTable(self.questionStore.questions())
+            if self.questionStore.isListStale():
+                self.loadQuestions(background=True)
+        elif not self.executor.pendingJobs("load_questions"):
+            self.loadMirroredQuestions()
+
+    def createQuestionListWindow(self) -> "QuestionListWindow":
+        """Build the question list window
+
+        Returns:
+            QuestionListWindow: The window, connected to the controller
+        """
+        from app.views.question_list_window import QuestionListWindow
+
+        window = QuestionListWindow()
+        window.logoutRequested.connect(self.showLoginWindow)
+        window.editSubQuestionRequested.connect(self.showSubQuestionEditWindow)
+        window.loadQuestionsRequested.connect(self.loadQuestions)
+        window.bulkActionRequested.connect(self.runBulkQuestionAction)
+        window.bulkCancelRequested.connect(self.cancelBulkQuestionAction)
+        window.contentSearchRequested.connect(self.searchSubQuestions)
+        return window
+
+    def loadMirroredQuestions(self):
+        """Show the questions mirrored by an earlier session, then sync them"""
+        if not self.questionListWindow:
+            return
+        if len(self.questionMirror) == 0:
+            self.loadQuestions()
+            return
 
-        if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.close()
-            self.subQuestionEditWindow = None
+        self.executor.cancelGroup("load_questions")
+        self.questionListWindow.showLoadingState()
+        self.receivedQuestionChunks = 0
+        self.refreshedQuestions = None
+        self.executor.submit(
+            "load_mirror",
+            self.onMirroredQuestionsLoaded,
+            priority=JobPriority.HIGH,
+            group="load_questions",
+            progress=self.onQuestionsChunkLoaded,
+        )
+
+    @pyqtSlot(bool, object)
+    def onMirroredQuestionsLoaded(self, success, result):
+        """Handle the mirrored questions loading completion
+
+        Args:
+            success (bool): Whether the mirrored questions were loaded successfully
+            result (object): The number of mirrored questions or the error
+        """
+        if not success or self.receivedQuestionChunks == 0:
+            self.loadQuestions()
+            return
+
+        # Mirrored questions may be outdated, sync them without blocking the list
+        self.questionStore.finishList()
+        self.questionStore.markStale()
+        if self.questionListWindow:
+            self.questionListWindow.finishLoadingQuestions()
+        self.indexMirror()
+        self.loadQuestions(background=True)
+
+    def indexMirror(self):
+        """Build the full-text index of the mirrored sub-questions in the background
+
+        The index is built once per bank, every later write keeps it up to date.
+        """
+        self.executor.submit("index_mirror", None, priority=JobPriority.LOW)
+
+    def searchSubQuestions(self, generation: int, text: str):
+        """Search the texts of the sub-questions for the list window
 
-        self.questionListWindow = QuestionListWindow()
-        self.questionListWindow.logoutRequested.connect(self.showLoginWindow)
-        self.questionListWindow.editSubQuestionRequested.connect(
-            self.showSubQuestionEditWindow
+        Args:
+            generation (int): The generation of the search in the list window
+            text (str): The search text
+        """
+        self.executor.cancelGroup("search")
+        self.executor.submit(
+            "search_sub_questions",
+            partial(self.onSubQuestionsSearched, generation),
+            priority=JobPriority.NORMAL,
+            group="search",
+            text=text,
         )
-        self.questionListWindow.loadQuestionsRequested.connect(self.loadQuestions)
-        self.questionListWindow.show()
 
-        self.loadQuestions()
+    def onSubQuestionsSearched(self, generation, success, result):
+        """Show the questions whose sub-questions match a search
+
+        Args:
+            generation (int): The generation of the search in the list window
+            success (bool): Whether the search succeeded
+            result (object): The IDs of the matching questions or the error
+        """
+        if success and self.questionListWindow:
+            self.questionListWindow.showContentMatches(generation, result)
 
-    def loadQuestions(self):
-        """Load questions in a separate thread"""
+    def loadQuestions(self, background: bool = False):
+        """Load questions in a separate thread
+
+        Args:
+            background (bool): Whether to keep the displayed list until the new one
+                has completely loaded, instead of showing it chunk by chunk
+        """
         if self.questionListWindow:
-            self.questionListWindow.showLoadingState()
-            self.apiWorker.setup("load_questions")
-            self.apiWorker.start()
+            # A repeated refresh joins the list load that is already running
+            running = self.executor.findPendingJob("load_questions")
+            if running and not background and self.refreshedQuestions is None:
+                return
+
+            self.executor.cancelGroup("load_questions")
+            if not background:
+                self.questionListWindow.showLoadingState()
+            self.receivedQuestionChunks = 0
+            self.refreshedQuestions = [] if background else None
+            self.executor.submit(
+                "load_questions",
+                self.onQuestionsLoaded,
+                priority=JobPriority.LOW if background else JobPriority.NORMAL,
+                progress=self.onQuestionsChunkLoaded,
+                # A displayed list does not need its first rows fetched separately
+                firstRangeSize=0 if background else 40,
+            )
+
+    def onQuestionsChunkLoaded(self, chunk):
+        """Handle a chunk of questions arriving while the list is loading
+
+        Args:
+            chunk (List[Question]): The questions of the chunk
+        """
+        from app.models.question_summary import QuestionSummary
+
+        self.saveQueue.overlay(chunk)
+        self.questionStore.refresh(chunk)
+        # Only the summaries are kept, full questions are loaded when opened
+        summaries = [QuestionSummary.fromQuestion(question) for question in chunk]
+        if self.refreshedQuestions is not None:
+            self.refreshedQuestions.extend(summaries)
+            return
+
+        if self.receivedQuestionChunks == 0:
+            self.questionStore.beginList()
+        self.questionStore.extendList(summaries)
+
+        if self.questionListWindow:
+            self.questionListWindow.appendQuestions(
+                summaries, reset=self.receivedQuestionChunks == 0
+            )
+        self.receivedQuestionChunks += 1
 
     @pyqtSlot(bool, object)
     def onQuestionsLoaded(self, success, result):
@@ -333,13 +513,96 @@ class MainController(QObject):
             success (bool): Whether the questions were loaded successfully
             result (object): The result of the questions loading
         """
+        refreshedQuestions = self.refreshedQuestions
+        self.refreshedQuestions = None
+
+        if success:
+            if refreshedQuestions is not None or self.receivedQuestionChunks == 0:
+                self.questionStore.beginList()
+                self.questionStore.extendList(refreshedQuestions or [])
+            self.questionStore.finishList()
+            self.indexMirror()
+
+        if not self.questionListWindow:
+            return
+
+        if refreshedQuestions is not None:
+            # A failed or unchanged background refresh keeps the displayed list
+            if success and (result["changed"] or result["removed"]):
+                self.questionListWindow.populateQuestionTable(
+                    self.questionStore.questions()
+                )
+        elif success:
+            if self.receivedQuestionChunks == 0:
+                self.questionListWindow.populateQuestionTable([])
+            self.questionListWindow.finishLoadingQuestions()
+        else:
+            self.questionListWindow.showError("Failed to load questions", result)
+
+    def runBulkQuestionAction(self, action, questionIds):
+        """Approve or delete many questions in a separate thread
+
+        Args:
+            action (str): "approve" or "delete"
+            questionIds (List[int]): The IDs of the questions
+        """
+        if not self.questionListWindow or not questionIds or self.bulkStopEvent:
+            return
+
+        self.bulkStopEvent = threading.Event()
+        self.bulkProcessedCount = 0
+        self.questionListWindow.showBulkProgress(len(questionIds))
+        self.executor.submit(
+            "bulk_question_action",
+            partial(self.onBulkQuestionActionFinished, action),
+            priority=JobPriority.HIGH,
+            progress=partial(self.onBulkQuestionActionProgress, action),
+            action=action,
+            questionIds=list(questionIds),
+            stopEvent=self.bulkStopEvent,
+        )
+
+    def cancelBulkQuestionAction(self):
+        """Stop the running bulk action once the requests in flight have finished"""
+        if self.bulkStopEvent:
+            self.bulkStopEvent.set()
+
+    def onBulkQuestionActionProgress(self, action, batch):
+        """Update the rows of the questions a bulk action processed
+
+        Args:
+            action (str): "approve" or "delete"
+            batch (dict): The succeeded question IDs and the error message of every
+                failed question since the last report
+        """
+        changed = self.questionStore.setFlag(
+            batch["succeeded"], "is_audited" if action == "approve" else "is_deleted"
+        )
+
+        self.bulkProcessedCount += len(batch["succeeded"]) + len(batch["failed"])
         if self.questionListWindow:
-            if success:
-                self.questionListWindow.finishLoadingState()
-                self.questionListWindow.questions = result
-                self.questionListWindow.populateQuestionTable(result)
-            else:
-                self.questionListWindow.showError("Failed to load questions", result)
+            self.questionListWindow.updateQuestions(changed)
+            self.questionListWindow.updateBulkProgress(self.bulkProcessedCount)
+
+    def onBulkQuestionActionFinished(self, action, success, result):
+        """Handle bulk action completion
+
+        Args:
+            action (str): "approve" or "delete"
+            success (bool): Whether the action ran to completion
+            result (object): The summary of the action or the error
+        """
+        self.bulkStopEvent = None
+
+        if not self.questionListWindow:
+            return
+
+        title = "Approve questions" if action == "approve" else "Delete questions"
+        if success:
+            self.questionListWindow.finishBulkAction(title, result)
+        else:
+            self.questionListWindow.hideBulkProgress()
+            self.questionListWindow.showError(title, result)
 
     def showSubQuestionEditWindow(self, questionId, subQuestionIndex):
         """Show the sub-question edit window
@@ -348,28 +611,28 @@ class MainController(QObject):
             questionId (int): The ID of the question to edit
             subQuestionIndex (int): The index of the sub-question to edit
         """
-        if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.close()
-            self.subQuestionEditWindow = None
+        self.windows.window("edit").openQuestion(questionId, subQuestionIndex)
+        self.windows.show("edit")
+        self.updateSyncStatus()
+        self.loadQuestionData(questionId)
 
-        self.subQuestionEditWindow = SubQuestionEditWindow(questionId, subQuestionIndex)
+    def createSubQuestionEditWindow(self) -> "SubQuestionEditWindow":
+        """Build the sub-question edit window
 
-        self.subQuestionEditWindow.backToQuestionsRequested.connect(
-            self.showQuestionListWindow
-        )
-        self.subQuestionEditWindow.loadDataRequested.connect(self.loadQuestionData)
-        self.subQuestionEditWindow.saveRequested.connect(self.saveSubQuestion)
-        self.subQuestionEditWindow.loadImageRequested.connect(self.loadImage)
-        self.subQuestionEditWindow.uploadImageRequested.connect(self.uploadImage)
-        self.subQuestionEditWindow.questionApprovedRequested.connect(
-            self.questionApproved
-        )
-        self.subQuestionEditWindow.questionDeletedRequested.connect(
-            self.questionDeleted
-        )
-
-        self.subQuestionEditWindow.show()
-        self.loadQuestionData(questionId)
+        Returns:
+            SubQuestionEditWindow: The window, connected to the controller
+        """
+        from app.views.sub_question_edit_window import SubQuestionEditWindow
+
+        window = SubQuestionEditWindow(None, 0)
+        window.backToQuestionsRequested.connect(self.showQuestionListWindow)
+        window.loadDataRequested.connect(self.loadQuestionData)
+        window.saveRequested.connect(self.saveSubQuestion)
+        window.loadImageRequested.connect(self.loadImage)
+        window.uploadImageRequested.connect(self.uploadImage)
+        window.questionApprovedRequested.connect(self.questionApproved)
+        window.questionDeletedRequested.connect(self.questionDeleted)
+        return window
 
     def loadQuestionData(self, questionId):
         """Load question data in a separate thread
@@ -378,41 +641,232 @@ class MainController(QObject):
             questionId (int): The ID of the question to load
         """
         if self.subQuestionEditWindow:
+            self.executor.cancelGroup("load_question")
+            self.executor.cancelGroup("load_image")
+
+            # Render the stored question right away and only refresh it once stale
+            question = self.questionStore.get(questionId)
+            if question is not None:
+                self.displayQuestion(question)
+                if self.questionStore.isStale(questionId):
+                    self.executor.submit(
+                        "load_question",
+                        self.onQuestionRefreshed,
+                        priority=JobPriority.LOW,
+                        group="load_question",
+                        questionId=questionId,
+                    )
+                return
+
             self.subQuestionEditWindow.showLoadingState()
-            self.apiWorker.setup("load_question", questionId=questionId)
-            self.apiWorker.start()
+
+            # A listed question is read from the mirror instead of the server
+            if self.questionStore.summary(questionId) is not None:
+                self.executor.cancelGroup("prefetch")
+                self.executor.submit(
+                    "load_mirrored_question",
+                    partial(self.onMirroredQuestionLoaded, questionId),
+                    priority=JobPriority.HIGH,
+                    group="load_question",
+                    questionId=questionId,
+                )
+                return
+
+            # Take over a prefetch of this question instead of requesting it again
+            job = self.executor.findPendingJob(
+                "load_question", "prefetch", questionId=questionId
+            )
+            if job is not None:
+                job.group = "load_question"
+                job.callback = self.onQuestionLoaded
+            self.executor.cancelGroup("prefetch")
+            if job is not None:
+                return
+
+            self.executor.submit(
+                "load_question", self.onQuestionLoaded, questionId=questionId
+            )
 
     @pyqtSlot(bool, object)
-    def onQuestionLoaded(self, success, result: Question):
+    def onQuestionLoaded(self, success, result: "Question"):
         """Handle question loading completion
 
         Args:
             success (bool): Whether the question was loaded successfully
             result (Question): The result of the question loading
         """
+        if success:
+            self.saveQueue.overlay([result])
+            self.questionStore.put(result)
+
         if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.finishLoadingState()
             if success:
-                self.subQuestionEditWindow.setQuestionData(result)
+                self.displayQuestion(result)
             else:
+                self.subQuestionEditWindow.finishLoadingState()
                 self.subQuestionEditWindow.showError("Failed to load question", result)
 
+    def onMirroredQuestionLoaded(self, questionId, success, result):
+        """Handle loading completion of a question from the mirror
+
+        Args:
+            questionId (int): The ID of the question
+            success (bool): Whether the mirror was read successfully
+            result (object): The mirrored question, None if it is not mirrored, or
+                the error
+        """
+        if not success or result is None:
+            self.executor.submit(
+                "load_question", self.onQuestionLoaded, questionId=questionId
+            )
+            return
+
+        # The mirrored question is as old as the listing it was mirrored from
+        self.saveQueue.overlay([result])
+        self.questionStore.put(result, self.questionStore.listFetchedAt)
+        self.loadQuestionData(questionId)
+
     @pyqtSlot(bool, object)
-    def onImageLoaded(self, success, result):
+    def onQuestionRefreshed(self, success, result: "Question"):
+        """Handle background refresh completion of a stale question
+
+        Args:
+            success (bool): Whether the question was loaded successfully
+            result (Question): The refreshed question or the error
+        """
+        # A failed refresh keeps the stored question displayed
+        if not success:
+            return
+
+        self.saveQueue.overlay([result])
+        self.questionStore.put(result)
+        self.refreshListedQuestion(result)
+
+        window = self.subQuestionEditWindow
+        if window and window.question is not None and window.question.id == result.id:
+            if window.question != result:
+                window.setQuestionData(result)
+
+    def displayQuestion(self, question: "Question"):
+        """Show a question in the edit window and prefetch around it
+
+        Args:
+            question (Question): The question to show
+        """
+        if self.subQuestionEditWindow:
+            self.subQuestionEditWindow.finishLoadingState()
+            self.subQuestionEditWindow.setQuestionData(question)
+            self.prefetchAround(question)
+
+    def prefetchAround(self, question: "Question"):
+        """Prefetch the neighbouring questions and the images of a question
+
+        Reviewers usually go through questions in order, so the previous and next
+        questions are loaded in the background, as well as the images of every
+        sub-question of the displayed question. Prefetches of a previous question
+        are cancelled.
+
+        Args:
+            question (Question): The displayed question
+        """
+        self.executor.cancelGroup("prefetch")
+
+        for questionId in (question.id - 1, question.id + 1):
+            if questionId < 1 or not self.questionStore.isStale(questionId):
+                continue
+            # Listed questions which were not opened yet are read from the mirror
+            mirrored = (
+                self.questionStore.get(questionId) is None
+                and self.questionStore.summary(questionId) is not None
+            )
+            self.executor.submit(
+                "load_mirrored_question" if mirrored else "load_question",
+                partial(self.onQuestionPrefetched, mirrored=mirrored),
+                priority=JobPriority.LOW,
+                group="prefetch",
+                questionId=questionId,
+            )
+
+        self.prefetchImages(question.sub_questions)
+
+    def prefetchImages(self, subQuestions):
+        """Prefetch the images of sub-questions into the pixmap cache
+
+        Args:
+            subQuestions (List[SubQuestion]): The sub-questions whose images to prefetch
+        """
+        for subQuestion in subQuestions:
+            imageId = subQuestion.image_id
+            if (
+                imageId is None
+                or imageId in self.pixmapCache
+                or self.executor.findPendingJob("load_image", imageId=imageId)
+            ):
+                continue
+            self.executor.submit(
+                "load_image",
+                self.onImagePrefetched,
+                priority=JobPriority.LOW,
+                group="prefetch",
+                imageId=imageId,
+            )
+
+    def onQuestionPrefetched(self, success, result, mirrored=False):
+        """Handle prefetch completion of a neighbouring question
+
+        Args:
+            success (bool): Whether the question was loaded successfully
+            result (object): The prefetched question, None if it is not mirrored, or
+                the error
+            mirrored (bool): Whether the question was read from the mirror
+        """
+        if success and result is not None:
+            self.saveQueue.overlay([result])
+            self.questionStore.put(
+                result, self.questionStore.listFetchedAt if mirrored else None
+            )
+            if result.sub_questions:
+                self.prefetchImages(result.sub_questions[:1])
+
+    def onImagePrefetched(self, success, result):
+        """Handle prefetch completion of an image
+
+        Args:
+            success (bool): Whether the image was loaded successfully
+            result (object): The prefetched image or the error
+        """
+        if success:
+            pixmap = QPixmap.fromImage(result["image"])
+            self.pixmapCache.put(result["imageId"], pixmap, result["description"])
+
+    def onImageLoaded(self, imageId, success, result):
         """Handle image loading completion
 
         Args:
+            imageId (int): The ID of the requested image
             success (bool): Whether the image was loaded successfully
             result (object): The result of the image loading
         """
-        if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.finishLoadingState()
-            if success:
-                self.subQuestionEditWindow.setImage(
-                    result["image"], result["description"]
-                )
-            else:
-                self.subQuestionEditWindow.showError("Failed to load image", result)
+        window = self.subQuestionEditWindow
+        pixmap = None
+        if success:
+            pixmap = QPixmap.fromImage(result["image"])
+            self.pixmapCache.put(imageId, pixmap, result["description"])
+        if not window:
+            return
+
+        # The form may have moved on to another sub-question meanwhile
+        subQuestion = window.subQuestion
+        if subQuestion is None or subQuestion.image_id != imageId:
+            if not self.executor.pendingJobs("load_image"):
+                window.finishLoadingState()
+            return
+
+        window.finishLoadingState()
+        if success:
+            window.setImage(pixmap, result["description"])
+        else:
+            window.showError("Failed to load image", result)
 
     @pyqtSlot(bool, object)
     def onImageUploaded(self, success, result):
@@ -425,6 +879,7 @@ class MainController(QObject):
         if self.subQuestionEditWindow:
             self.subQuestionEditWindow.finishLoadingState()
             if success:
+                self.pixmapCache.invalidate(result)
                 self.subQuestionEditWindow.subQuestion.image_id = result
                 self.subQuestionEditWindow.onImageUploaded()
             else:
@@ -443,6 +898,7 @@ class MainController(QObject):
 
             if success:
                 self.subQuestionEditWindow.onQuestionApproved()
+                self.refreshListedQuestion(self.subQuestionEditWindow.question)
             else:
                 self.subQuestionEditWindow.showError(
                     "Failed to approve question", result
@@ -461,21 +917,151 @@ class MainController(QObject):
 
             if success:
                 self.subQuestionEditWindow.onQuestionDeleted()
+                self.refreshListedQuestion(self.subQuestionEditWindow.question)
             else:
                 self.subQuestionEditWindow.showError(
                     "Failed to delete question", result
                 )
 
+    def refreshListedQuestion(self, question: "Question"):
+        """Refresh a changed question in the question list, if it is open
+
+        Args:
+            question (Question): The changed question
+        """
+        if question is None:
+            return
+        summary = self.questionStore.resummarize(question)
+        if self.questionListWindow and summary is not None:
+            self.questionListWindow.updateQuestion(summary)
+
     def saveSubQuestion(self, data):
-        """Save sub-question data in a separate thread
+        """Queue sub-question data for saving and show it as saved right away
+
+        The edit is sent by the save queue in the background, so the form is never
+        blocked on the server.
 
         Args:
             data (object): The data to save
         """
-        if self.subQuestionEditWindow:
-            self.subQuestionEditWindow.showSavingState()
-            self.apiWorker.setup("save_sub_question", data=data)
-            self.apiWorker.start()
+        if not self.subQuestionEditWindow:
+            return
+
+        snapshot = data["snapshot"]
+        changes = data["changes"]
+        if changes:
+            self.saveQueue.enqueue(snapshot, changes)
+            if "image_description" in changes:
+                self.pixmapCache.setDescription(
+                    snapshot.imageId, changes["image_description"]
+                )
+
+        # The displayed question is the stored one, so this updates the store too
+        self.subQuestionEditWindow.onSaveSuccess({"data": data, "saved": list(changes)})
+        self.refreshListedQuestion(self.subQuestionEditWindow.question)
+        self.flushSaveQueue()
+
+    def flushSaveQueue(self):
+        """Send the queued edits that are due, one at a time per sub-question"""
+        self.saveRetryTimer.stop()
+        if not self.saveQueueActive:
+            return
+
+        now = time.time()
+        for entry in self.saveQueue.due(now):
+            self.saveQueue.markSending(entry)
+            self.executor.submit(
+                "flush_save",
+                partial(self.onSaveFlushed, self.saveQueue, entry),
+                group="save_queue",
+                snapshot=entry.snapshot,
+                changes=dict(entry.changes),
+                # An edit that waited may have been overtaken by another reviewer
+                verify=entry.attempts > 0
+                or now - entry.createdAt > self.SAVE_VERIFY_AGE,
+            )
+
+        nextAttemptAt = self.saveQueue.nextAttemptAt()
+        if nextAttemptAt is not None:
+            self.saveRetryTimer.start(max(0, int((nextAttemptAt - now) * 1000)))
+        self.updateSyncStatus()
+
+    def onSaveFlushed(self, queue, entry, success, result):
+        """Handle the completion of sending a queued edit
+
+        Args:
+            queue (SaveQueue): The queue the edit was sent from
+            entry (PendingSave): The sent edit
+            success (bool): Whether the edit could be sent
+            result (object): The outcome of the edit or the ApiError
+        """
+        if queue is not self.saveQueue:
+            # Another user logged in meanwhile, the edit is sent again on their login
+            return
+
+        snapshot = entry.snapshot
+        if not success:
+            self.saveQueue.retry(entry, entry.changes, str(result))
+        elif result["conflict"]:
+            # Later edits of the sub-question were made on top of the rejected one
+            self.saveQueue.discard(snapshot.subQuestionId)
+            self.revertQuestion(snapshot.questionId)
+            self.showSaveError(
+                "Save conflict", f"{snapshot.questionName}: {result['conflict']}"
+            )
+        else:
+            if result["retry"]:
+                self.saveQueue.retry(entry, result["retry"], result["error"])
+            else:
+                self.saveQueue.complete(entry)
+            if result["failed"]:
+                self.revertQuestion(snapshot.questionId)
+                failures = "\n".join(
+                    f"{field}: {error}" for field, error in result["failed"].items()
+                )
+                self.showSaveError("Some fields were not saved", failures)
+
+        self.flushSaveQueue()
+
+    def revertQuestion(self, questionId):
+        """Drop the unsaved state of a question by loading it from the server again
+
+        Args:
+            questionId (int): The ID of the question
+        """
+        self.questionStore.invalidate(questionId)
+        self.executor.submit(
+            "load_question",
+            self.onQuestionRefreshed,
+            priority=JobPriority.LOW,
+            group="save_queue",
+            questionId=questionId,
+        )
+
+    def showSaveError(self, title, message):
+        """Show an error of a queued edit in the open window
+
+        Args:
+            title (str): Title of the error message
+            message (str): Message of the error
+        """
+        window = self.subQuestionEditWindow or self.questionListWindow
+        if window:
+            window.showError(title, message)
+
+    def updateSyncStatus(self):
+        """Show how many edits are waiting to be sent in the edit window"""
+        if not self.subQuestionEditWindow:
+            return
+
+        count = len(self.saveQueue)
+        if count == 0:
+            text = ""
+        elif any(entry.attempts for entry in self.saveQueue.entries.values()):
+            text = f"{count} unsynced edit{'s' if count > 1 else ''}, retrying"
+        else:
+            text = f"Syncing {count} edit{'s' if count > 1 else ''}"
+        self.subQuestionEditWindow.setSyncStatus(text)
 
     def loadImage(self, imageId):
         """Load image in a separate thread
@@ -484,9 +1070,27 @@ class MainController(QObject):
             imageId (int): The ID of the image to load
         """
         if self.subQuestionEditWindow:
+            self.executor.cancelGroup("load_image")
+
+            cached = self.pixmapCache.get(imageId)
+            if cached is not None:
+                self.subQuestionEditWindow.setImage(*cached)
+                return
+
             self.subQuestionEditWindow.showLoadingState()
-            self.apiWorker.setup("load_image", imageId=imageId)
-            self.apiWorker.start()
+
+            # Take over a prefetch of this image instead of requesting it again
+            job = self.executor.findPendingJob(
+                "load_image", "prefetch", imageId=imageId
+            )
+            if job is not None:
+                job.group = "load_image"
+                job.callback = partial(self.onImageLoaded, imageId)
+                return
+
+            self.executor.submit(
+                "load_image", partial(self.onImageLoaded, imageId), imageId=imageId
+            )
 
     def uploadImage(self, filePath, imageId, subQuestionId, description):
         """Upload image in a separate thread
@@ -499,14 +1103,15 @@ class MainController(QObject):
         """
         if self.subQuestionEditWindow:
             self.subQuestionEditWindow.showUploadingState()
-            self.apiWorker.setup(
+            self.executor.submit(
                 "upload_image",
+                self.onImageUploaded,
+                priority=JobPriority.HIGH,
                 filePath=filePath,
                 imageId=imageId,
                 subQuestionId=subQuestionId,
                 description=description,
             )
-            self.apiWorker.start()
 
     def questionApproved(self, questionId):
         """Handle question approved completion
@@ -516,8 +1121,12 @@ class MainController(QObject):
         """
         if self.subQuestionEditWindow:
             self.subQuestionEditWindow.showLoadingState()
-            self.apiWorker.setup("question_approved", questionId=questionId)
-            self.apiWorker.start()
+            self.executor.submit(
+                "question_approved",
+                self.onQuestionApproved,
+                priority=JobPriority.HIGH,
+                questionId=questionId,
+            )
 
     def questionDeleted(self, questionId):
         """Handle question deleted completion
@@ -527,19 +1136,9 @@ class MainController(QObject):
         """
         if self.subQuestionEditWindow:
             self.subQuestionEditWindow.showLoadingState()
-            self.apiWorker.setup("question_deleted", questionId=questionId)
-            self.apiWorker.start()
-
-    @pyqtSlot(bool, object)
-    def onSaveFinished(self, success, result):
-        """Handle save completion
-
-        Args:
-            success (bool): Whether the save was successful
-            result (object): The result of the save
-        """
-        if self.subQuestionEditWindow:
-            if success:
-                self.subQuestionEditWindow.onSaveSuccess(result)
-            else:
-                self.subQuestionEditWindow.onSaveError(result)
+            self.executor.submit(
+                "question_deleted",
+                self.onQuestionDeleted,
+                priority=JobPriority.HIGH,
+                questionId=questionId,
+            )
@@ -0,0 +1,331 @@
+import json
+import httpx
+import asyncio
+from nanoko import AsyncNanoko, Nanoko
+from nanoko.models.question import Question
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Set
+
+from app.metrics import metrics
+from app.controllers.retry_policy import RetryPolicy
+from app.controllers.api_errors import ErrorKind, classifyError
+
+
+def isMissingQuestion(error: Exception) -> bool:
+    """Check if fetching a question by ID failed because it does not exist
+
+    Args:
+        error (Exception): The error of the request
+
+    Returns:
+        bool: True if the question was not found
+    """
+    return classifyError(error)[0] == ErrorKind.NOT_FOUND
+
+
+class QuestionArrayParser:
+    """Incremental parser for a JSON array of questions
+
+    Text can be fed in arbitrary pieces, every complete element of the array is
+    returned as soon as its closing brace has been received.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+
+    def feed(self, text: str) -> List[dict]:
+        """Feed a piece of the response body
+
+        Args:
+            text (str): The next piece of the response body
+
+        Returns:
+            List[dict]: The elements completed by this piece
+        """
+        self.buffer += text
+        items = []
+        pos = 0
+
+        while not self.finished:
+            while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(self.buffer):
+                break
+
+            if not self.started:
+                if self.buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array of questions")
+                self.started = True
+                pos += 1
+                continue
+
+            if self.buffer[pos] == "]":
+                self.finished = True
+                pos += 1
+                break
+
+            try:
+                item, pos = self.decoder.raw_decode(self.buffer, pos)
+            except json.JSONDecodeError:
+                break  # The element is not complete yet
+            items.append(item)
+
+        self.buffer = self.buffer[pos:]
+        return items
+
+    def close(self):
+        """Check the whole array was received once the response body has ended
+
+        Raises:
+            ValueError: If the body ended before the closing bracket, or with data
+                which is not part of the array
+        """
+        if not self.finished:
+            if self.buffer.strip():
+                raise ValueError("Malformed question in the listing")
+            raise ValueError("The listing ended before the end of the array")
+        if self.buffer.strip():
+            raise ValueError("Unexpected data after the listing")
+
+
+class QuestionStreamLoader:
+    """Load the question bank in chunks while it is being downloaded
+
+    The bank endpoint has no paging parameters, so the loader first fetches the
+    lowest ID range question by question to fill the first screen, then streams the
+    full listing and yields the remaining questions chunk by chunk as they are parsed.
+    The first range assumes IDs are dense and start at 1, IDs missing from it are
+    skipped and a sparse bank only fills the first screen later, from the listing.
+    A listing which ends early or is malformed raises instead of looking shorter.
+
+    With a retry policy, opening the listing is retried like any other request. A
+    listing interrupted after its first bytes is not retried, as its questions have
+    already been yielded.
+    """
+
+    def __init__(
+        self,
+        nanokoClient: Nanoko,
+        chunkSize: int = 500,
+        firstRangeSize: int = 40,
+        maxWorkers: int = 8,
+        bank=None,
+        retryPolicy: Optional[RetryPolicy] = None,
+    ):
+        self.nanokoClient = nanokoClient
+        self.bank = bank or nanokoClient.bank
+        self.retryPolicy = retryPolicy
+        self.chunkSize = chunkSize
+        self.firstRangeSize = firstRangeSize
+        self.maxWorkers = maxWorkers
+
+    def iterChunks(
+        self, isCancelled: Optional[Callable[[], bool]] = None
+    ) -> Iterator[List[Question]]:
+        """Iterate over the question bank in chunks
+
+        Args:
+            isCancelled (Optional[Callable[[], bool]]): Stops the iteration when it returns True
+
+        Yields:
+            List[Question]: The next chunk of questions
+        """
+        isCancelled = isCancelled or (lambda: False)
+        seen: Set[int] = set()
+
+        firstChunk = self._fetchIdRange(1, self.firstRangeSize)
+        if firstChunk:
+            seen.update(question.id for question in firstChunk)
+            yield firstChunk
+
+        chunk: List[Question] = []
+        parser = QuestionArrayParser()
+
+        response = self._openListing()
+        try:
+            for text in response.iter_text():
+                if isCancelled():
+                    return
+
+                with metrics.span("parse.questions"):
+                    items = [
+                        Question.model_validate(item)
+                        for item in parser.feed(text)
+                        if item.get("id") not in seen
+                    ]
+
+                for question in items:
+                    chunk.append(question)
+
+                    if len(chunk) >= self.chunkSize:
+                        yield chunk
+                        chunk = []
+            parser.close()
+        finally:
+            response.close()
+
+        if chunk:
+            yield chunk
+
+    def _openListing(self) -> httpx.Response:
+        """Send the request of the full listing
+
+        Returns:
+            httpx.Response: The streamed response, which must be closed
+        """
+        client = self.nanokoClient.client
+        request = client.build_request(
+            "GET", f"{self.nanokoClient.base_url}/api/v1/bank/question/get"
+        )
+
+        def send():
+            response = client.send(request, stream=True)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError:
+                response.close()
+                raise
+            return response
+
+        if self.retryPolicy is None:
+            return send()
+        return self.retryPolicy.call("get_questions", send)
+
+    def _fetchIdRange(self, firstId: int, count: int) -> List[Question]:
+        """Fetch a range of questions by ID concurrently
+
+        Args:
+            firstId (int): The first ID of the range
+            count (int): The number of IDs in the range
+
+        Returns:
+            List[Question]: The questions found in the range, ordered by ID
+        """
+        if count <= 0:
+            return []
+
+        def fetch(questionId):
+            try:
+                return self.bank.get_questions(question_id=questionId)
+            except Exception as e:
+                if isMissingQuestion(e):
+                    return []
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as pool:
+            results = pool.map(fetch, range(firstId, firstId + count))
+            return [question for questions in results for question in questions]
+
+
+class AsyncQuestionStreamLoader(QuestionStreamLoader):
+    """Load the question bank in chunks with an async Nanoko client
+
+    Works like ``QuestionStreamLoader``, the first ID range is fetched with
+    concurrent requests on the event loop instead of a thread pool.
+    """
+
+    nanokoClient: AsyncNanoko
+
+    async def iterChunks(
+        self, isCancelled: Optional[Callable[[], bool]] = None
+    ) -> AsyncIterator[List[Question]]:
+        """Iterate over the question bank in chunks
+
+        Args:
+            isCancelled (Optional[Callable[[], bool]]): Stops the iteration when it returns True
+
+        Yields:
+            List[Question]: The next chunk of questions
+        """
+        isCancelled = isCancelled or (lambda: False)
+        seen: Set[int] = set()
+
+        firstChunk = await self._fetchIdRange(1, self.firstRangeSize)
+        if firstChunk:
+            seen.update(question.id for question in firstChunk)
+            yield firstChunk
+
+        chunk: List[Question] = []
+        parser = QuestionArrayParser()
+
+        response = await self._openListing()
+        try:
+            async for text in response.aiter_text():
+                if isCancelled():
+                    return
+
+                with metrics.span("parse.questions"):
+                    items = [
+                        Question.model_validate(item)
+                        for item in parser.feed(text)
+                        if item.get("id") not in seen
+                    ]
+
+                for question in items:
+                    chunk.append(question)
+
+                    if len(chunk) >= self.chunkSize:
+                        yield chunk
+                        chunk = []
+            parser.close()
+        finally:
+            await response.aclose()
+
+        if chunk:
+            yield chunk
+
+    async def _openListing(self) -> httpx.Response:
+        """Send the request of the full listing
+
+        Returns:
+            httpx.Response: The streamed response, which must be closed
+        """
+        client = self.nanokoClient.client
+        request = client.build_request(
+            "GET", f"{self.nanokoClient.base_url}/api/v1/bank/question/get"
+        )
+
+        async def send():
+            response = await client.send(request, stream=True)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError:
+                await response.aclose()
+                raise
+            return response
+
+        if self.retryPolicy is None:
+            return await send()
+        return await self.retryPolicy.callAsync("get_questions", send)
+
+    async def _fetchIdRange(self, firstId: int, count: int) -> List[Question]:
+        """Fetch a range of questions by ID concurrently
+
+        Args:
+            firstId (int): The first ID of the range
+            count (int): The number of IDs in the range
+
+        Returns:
+            List[Question]: The questions found in the range, ordered by ID
+        """
+        if count <= 0:
+            return []
+
+        semaphore = asyncio.Semaphore(self.maxWorkers)
+
+        async def fetch(questionId):
+            async with semaphore:
+                try:
+                    return await self.bank.get_questions(question_id=questionId)
+                except Exception as e:
+                    if isMissingQuestion(e):
+                        return []
+                    raise
+
+        results = await asyncio.gather(
+            *(fetch(questionId) for questionId in range(firstId, firstId + count))
+        )
+        return [question for questions in results for question in questions]
@@ -0,0 +1,312 @@
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass, fields
+from typing import Awaitable, Callable, Dict, Optional
+from PyQt6.QtCore import QSettings
+
+from app.metrics import metrics
+from app.controllers.api_errors import CircuitOpenError, isRetryableError, isUnsent
+
+
+@dataclass(frozen=True)
+class RetryConfig:
+    """Settings of the retry policy applied to every API request
+
+    Values can be overridden with QSettings keys under ``retry/``, named like the
+    fields (e.g. ``retry/maxAttempts``).
+    """
+
+    maxAttempts: int = 3
+    baseDelay: float = 0.2
+    maxDelay: float = 2.0
+    failureThreshold: int = 5
+    resetTimeout: float = 30.0
+
+    @classmethod
+    def fromSettings(cls, settings: Optional[QSettings] = None) -> "RetryConfig":
+        """Read the retry settings
+
+        Args:
+            settings (Optional[QSettings]): The settings to read, the application
+                settings by default
+
+        Returns:
+            RetryConfig: The retry settings
+        """
+        settings = settings or QSettings()
+        values = {}
+        for field in fields(cls):
+            key = f"retry/{field.name}"
+            if settings.contains(key):
+                values[field.name] = settings.value(key, type=type(field.default))
+        return cls(**values)
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint that keeps failing
+
+    The circuit opens after ``failureThreshold`` consecutive transient failures, and
+    requests then fail right away with ``CircuitOpenError``. Once ``resetTimeout``
+    has passed, a single trial request is let through: the circuit closes again if
+    it succeeds and stays open for another period if it fails. A trial which is
+    cancelled before it ends lets the next request through instead, as does a trial
+    still unresolved after another ``resetTimeout``.
+
+    The breaker is safe to use from several threads at once.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, endpoint: str, failureThreshold: int, resetTimeout: float):
+        self.endpoint = endpoint
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.openedAt = 0.0
+        self.trialStartedAt = 0.0
+
+    def before(self) -> bool:
+        """Check a request may be sent
+
+        Returns:
+            bool: True if the request is the trial of a half-open circuit, which
+                must be resolved by a record or released
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial
+                request already in flight
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                retryIn = self.openedAt + self.resetTimeout - now
+            else:
+                # A trial that never resolved does not keep the endpoint closed
+                retryIn = self.trialStartedAt + self.resetTimeout - now
+            if retryIn <= 0:
+                self.state = self.HALF_OPEN
+                self.trialStartedAt = now
+                return True
+            raise CircuitOpenError(self.endpoint, retryIn)
+
+    def releaseTrial(self):
+        """Let the next request through after a trial was cancelled unresolved"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.openedAt = time.monotonic() - self.resetTimeout
+
+    def recordSuccess(self):
+        """Record a request the endpoint answered, closing the circuit"""
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def recordFailure(self):
+        """Record a transient failure of a request, opening the circuit if needed"""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failureThreshold:
+                if self.state != self.OPEN:
+                    metrics.count("api.circuitOpened")
+                self.state = self.OPEN
+                self.openedAt = time.monotonic()
+
+
+class RetryPolicy:
+    """Retries transient failures of API requests and guards every endpoint
+
+    A request failing with a network error, a timeout, rate limiting or a server
+    error is sent again after an exponential backoff with full jitter, honouring a
+    ``Retry-After`` header, up to ``maxAttempts`` times. Requests that are not
+    idempotent are only sent again when they cannot have reached the server. Every
+    endpoint has its own circuit breaker.
+    """
+
+    def __init__(self, config: Optional[RetryConfig] = None):
+        self.config = config or RetryConfig()
+        self.lock = threading.Lock()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Get the circuit breaker of an endpoint
+
+        Args:
+            endpoint (str): The name of the endpoint
+
+        Returns:
+            CircuitBreaker: The breaker, created on first use
+        """
+        with self.lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.config.failureThreshold, self.config.resetTimeout
+                )
+            return breaker
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Get the delay before sending a failed request again
+
+        Args:
+            attempt (int): The number of the attempt that failed, from 1
+            error (Exception): The error of the attempt
+
+        Returns:
+            float: The delay in seconds
+        """
+        response = getattr(error, "response", None)
+        retryAfter = None
+        if response is not None:
+            retryAfter = response.headers.get("Retry-After")
+        if retryAfter and retryAfter.isdigit():
+            return min(float(retryAfter), self.config.maxDelay)
+
+        ceiling = min(self.config.maxDelay, self.config.baseDelay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def call(self, endpoint: str, request: Callable[[], object], idempotent=True):
+        """Send a request with retries
+
+        Args:
+            endpoint (str): The name of the endpoint, selecting its circuit breaker
+            request (Callable[[], object]): Sends the request and returns its result
+            idempotent (bool): Whether sending the request twice has the same effect
+                as sending it once
+
+        Returns:
+            object: The result of the request
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open
+            Exception: The error of the last attempt
+        """
+        breaker = self.breaker(endpoint)
+        attempt = 1
+        while True:
+            trial = breaker.before()
+            try:
+                result = request()
+            except Exception as e:
+                if not self._shouldRetry(breaker, e, attempt, idempotent):
+                    raise
+                time.sleep(self.delay(attempt, e))
+                attempt += 1
+            except BaseException:
+                if trial:
+                    breaker.releaseTrial()
+                raise
+            else:
+                breaker.recordSuccess()
+                return result
+
+    async def callAsync(
+        self, endpoint: str, request: Callable[[], Awaitable], idempotent=True
+    ):
+        """Send a request with retries from a coroutine
+
+        Args:
+            endpoint (str): The name of the endpoint, selecting its circuit breaker
+            request (Callable[[], Awaitable]): Sends the request and returns its result
+            idempotent (bool): Whether sending the request twice has the same effect
+                as sending it once
+
+        Returns:
+            object: The result of the request
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open
+            Exception: The error of the last attempt
+        """
+        breaker = self.breaker(endpoint)
+        attempt = 1
+        while True:
+            trial = breaker.before()
+            try:
+                result = await request()
+            except Exception as e:
+                if not self._shouldRetry(breaker, e, attempt, idempotent):
+                    raise
+                await asyncio.sleep(self.delay(attempt, e))
+                attempt += 1
+            except BaseException:
+                # A cancelled trial must not leave the circuit half-open
+                if trial:
+                    breaker.releaseTrial()
+                raise
+            else:
+                breaker.recordSuccess()
+                return result
+
+    def _shouldRetry(
+        self, breaker: CircuitBreaker, error: Exception, attempt: int, idempotent: bool
+    ) -> bool:
+        """Record a failed attempt and decide whether to send the request again
+
+        Args:
+            breaker (CircuitBreaker): The breaker of the endpoint
+            error (Exception): The error of the attempt
+            attempt (int): The number of the attempt, from 1
+            idempotent (bool): Whether the request is idempotent
+
+        Returns:
+            bool: True if the request should be sent again
+        """
+        if not isRetryableError(error):
+            # The endpoint answered, the request itself was refused
+            breaker.recordSuccess()
+            return False
+
+        breaker.recordFailure()
+        if attempt >= self.config.maxAttempts:
+            return False
+        if not idempotent and not isUnsent(error):
+            return False
+
+        metrics.count("api.retries")
+        return True
+
+
+class RetryingBank:
+    """Facade applying a retry policy to every call of the bank API of a Nanoko client
+
+    Each bank method is an endpoint with its own circuit breaker.
+    """
+
+    # Calls creating a new record on every request
+    NON_IDEMPOTENT = {"add_image"}
+
+    def __init__(self, bank, policy: RetryPolicy):
+        self.bank = bank
+        self.policy = policy
+
+    def __getattr__(self, name):
+        method = getattr(self.bank, name)
+        if not callable(method):
+            return method
+        idempotent = name not in self.NON_IDEMPOTENT
+        return lambda **kwargs: self.policy.call(
+            name, lambda: method(**kwargs), idempotent
+        )
+
+
+class AsyncRetryingBank(RetryingBank):
+    """Facade applying a retry policy to every call of the bank API of an async client"""
+
+    def __getattr__(self, name):
+        method = getattr(self.bank, name)
+        if not callable(method):
+            return method
+        idempotent = name not in self.NON_IDEMPOTENT
+        return lambda **kwargs: self.policy.callAsync(
+            name, lambda: method(**kwargs), idempotent
+        )
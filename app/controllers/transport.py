@@ -0,0 +1,139 @@
+import httpx
+import importlib.util
+from typing import Optional
+from dataclasses import dataclass, fields
+from PyQt6.QtCore import QSettings
+
+from app.metrics import metrics
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Settings of the HTTP transport shared by every API call
+
+    Values can be overridden with QSettings keys under ``transport/``, named like the
+    fields (e.g. ``transport/readTimeout``).
+    """
+
+    maxConnections: int = 16
+    keepAliveExpiry: float = 30.0
+    connectTimeout: float = 5.0
+    readTimeout: float = 30.0
+    writeTimeout: float = 30.0
+    poolTimeout: float = 10.0
+    compression: bool = True
+    http2: bool = True
+
+    @classmethod
+    def fromSettings(
+        cls, settings: Optional[QSettings] = None, **defaults
+    ) -> "TransportConfig":
+        """Read the transport settings
+
+        Args:
+            settings (Optional[QSettings]): The settings to read, the application
+                settings by default
+            **defaults: Values to use for the fields missing from the settings
+
+        Returns:
+            TransportConfig: The transport settings
+        """
+        settings = settings or QSettings()
+        values = dict(defaults)
+        for field in fields(cls):
+            key = f"transport/{field.name}"
+            if settings.contains(key):
+                values[field.name] = settings.value(key, type=type(field.default))
+        return cls(**values)
+
+
+def isHttp2Available() -> bool:
+    """Check if the optional HTTP/2 support of httpx is installed
+
+    Returns:
+        bool: True if the h2 package is installed, False otherwise
+    """
+    return importlib.util.find_spec("h2") is not None
+
+
+def acceptedEncodings(compression: bool = True) -> str:
+    """Get the response encodings the client can decode
+
+    Args:
+        compression (bool): Whether to accept compressed responses
+
+    Returns:
+        str: The value of the Accept-Encoding header
+    """
+    if not compression:
+        return "identity"
+
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+def clientOptions(config: TransportConfig) -> dict:
+    """Get the options shared by the sync and async HTTP clients
+
+    Args:
+        config (TransportConfig): The transport settings
+
+    Returns:
+        dict: The keyword arguments of the httpx client
+    """
+    return dict(
+        http2=config.http2 and isHttp2Available(),
+        limits=httpx.Limits(
+            max_connections=config.maxConnections,
+            max_keepalive_connections=config.maxConnections,
+            keepalive_expiry=config.keepAliveExpiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=config.connectTimeout,
+            read=config.readTimeout,
+            write=config.writeTimeout,
+            pool=config.poolTimeout,
+        ),
+        headers={"Accept-Encoding": acceptedEncodings(config.compression)},
+    )
+
+
+def createHttpClient(config: TransportConfig) -> httpx.Client:
+    """Create the pooled keep-alive HTTP client used by the Nanoko client
+
+    HTTP/2 is only negotiated over TLS, and only used when the optional h2 package
+    is installed; otherwise the client falls back to pooled HTTP/1.1 connections.
+
+    Args:
+        config (TransportConfig): The transport settings
+
+    Returns:
+        httpx.Client: The HTTP client
+    """
+
+    def countRequest(request: httpx.Request):
+        metrics.count("http.requests")
+
+    return httpx.Client(
+        **clientOptions(config), event_hooks={"request": [countRequest]}
+    )
+
+
+def createAsyncHttpClient(config: TransportConfig) -> httpx.AsyncClient:
+    """Create the pooled keep-alive HTTP client used by the async Nanoko client
+
+    Args:
+        config (TransportConfig): The transport settings
+
+    Returns:
+        httpx.AsyncClient: The HTTP client
+    """
+
+    async def countRequest(request: httpx.Request):
+        metrics.count("http.requests")
+
+    return httpx.AsyncClient(
+        **clientOptions(config), event_hooks={"request": [countRequest]}
+    )
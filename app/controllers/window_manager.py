@@ -0,0 +1,106 @@
+from typing import Callable, Dict, Optional
+from PyQt6.QtWidgets import QWidget
+
+from app.metrics import metrics
+
+
+class WindowManager:
+    """Creates every window of the application once and switches between them
+
+    Windows are registered with a factory which builds them and connects their
+    signals. A window is built the first time it is needed, then only hidden and
+    shown again, so navigating back and forth does not rebuild its layouts and
+    effects, and it keeps its scroll position, selection and search.
+    """
+
+    def __init__(self):
+        self.factories: Dict[str, Callable[[], QWidget]] = {}
+        self.windows: Dict[str, QWidget] = {}
+
+    def register(self, name: str, factory: Callable[[], QWidget]):
+        """Register how to build a window
+
+        Args:
+            name (str): The name of the window
+            factory (Callable[[], QWidget]): Builds the window and connects it
+        """
+        self.factories[name] = factory
+
+    def window(self, name: str) -> QWidget:
+        """Get a window, building it on first use
+
+        Args:
+            name (str): The name of the window
+
+        Returns:
+            QWidget: The window
+        """
+        window = self.windows.get(name)
+        if window is None:
+            with metrics.span(f"ui.window.create.{name}"):
+                window = self.windows[name] = self.factories[name]()
+        return window
+
+    def get(self, name: str) -> Optional[QWidget]:
+        """Get a window if it was built
+
+        Args:
+            name (str): The name of the window
+
+        Returns:
+            Optional[QWidget]: The window, None if it was not needed yet
+        """
+        return self.windows.get(name)
+
+    def visible(self, name: str) -> Optional[QWidget]:
+        """Get a window if it is shown
+
+        Args:
+            name (str): The name of the window
+
+        Returns:
+            Optional[QWidget]: The window, None if it was not built or is hidden
+        """
+        window = self.windows.get(name)
+        if window is not None and window.isVisible():
+            return window
+        return None
+
+    def show(self, name: str, *hidden: str) -> QWidget:
+        """Show a window on top of the others, hiding some of them
+
+        The window is shown before the others are hidden, so the application never
+        runs out of visible windows in between.
+
+        Args:
+            name (str): The name of the window to show
+            *hidden (str): The names of the windows to hide
+
+        Returns:
+            QWidget: The shown window
+        """
+        window = self.window(name)
+        window.show()
+        window.raise_()
+        window.activateWindow()
+
+        for other in hidden:
+            self.hide(other)
+        return window
+
+    def hide(self, name: str):
+        """Hide a window, keeping it for later
+
+        Args:
+            name (str): The name of the window
+        """
+        window = self.windows.get(name)
+        if window is not None:
+            window.hide()
+
+    def closeAll(self):
+        """Close and release every window"""
+        for window in self.windows.values():
+            window.close()
+            window.deleteLater()
+        self.windows.clear()
@@ -0,0 +1,257 @@
+import json
+import time
+import threading
+from functools import wraps
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+from PyQt6.QtCore import QSettings
+
+
+class Histogram:
+    """Latency samples of one span, keeping the most recent ones for percentiles"""
+
+    def __init__(self, maxSamples: int = 2048):
+        self.samples = deque(maxlen=maxSamples)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        """Add a sample
+
+        Args:
+            seconds (float): The duration of the span
+        """
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, percent: float) -> float:
+        """Get a percentile of the recent samples
+
+        Args:
+            percent (float): The percentile, between 0 and 100
+
+        Returns:
+            float: The duration at the percentile, in seconds
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = round(percent / 100 * (len(ordered) - 1))
+        return ordered[index]
+
+
+class Span:
+    """Times a block of code and records it in the metrics when it exits"""
+
+    __slots__ = ("metrics", "name", "attributes", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, attributes: dict):
+        self.metrics = metrics
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        duration = time.perf_counter() - self.start
+        if excType is not None:
+            self.attributes["error"] = excType.__name__
+        self.metrics.record(self.name, duration, **self.attributes)
+        return False
+
+
+class Metrics:
+    """Collects spans and counters of the hot paths of the client
+
+    Collection is off by default; while it is off, ``span`` returns a shared no-op
+    context and ``count`` returns immediately, so instrumented code pays a single
+    attribute check. Every recorded span and counter can also be appended to a
+    JSON lines file for offline analysis.
+
+    The collector is safe to use from several threads at once.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.requested = False
+        self.holds = 0
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.exportFile = None
+        self._nullSpan = nullcontext()
+
+    def configure(self, settings: Optional[QSettings] = None):
+        """Apply the ``metrics/enabled`` and ``metrics/exportPath`` settings
+
+        Args:
+            settings (Optional[QSettings]): The settings to read, the application
+                settings by default
+        """
+        settings = settings or QSettings()
+        exportPath = settings.value("metrics/exportPath", "", type=str)
+        if exportPath:
+            self.startExport(exportPath)
+        self.setEnabled(settings.value("metrics/enabled", False, type=bool))
+
+    def setEnabled(self, enabled: bool):
+        """Turn the collection on or off
+
+        The collection stays on while it is held, see ``hold``.
+
+        Args:
+            enabled (bool): Whether to collect spans and counters
+        """
+        with self.lock:
+            self.requested = enabled
+            self.enabled = enabled or self.holds > 0
+
+    def hold(self):
+        """Keep the collection on until the hold is released
+
+        Every holder, like the metrics panel of a window, takes its own hold, so
+        one of them releasing it does not turn the collection off for the others.
+        """
+        with self.lock:
+            self.holds += 1
+            self.enabled = True
+
+    def release(self):
+        """Release a hold taken with ``hold``
+
+        The collection falls back to its setting once no hold is left.
+        """
+        with self.lock:
+            self.holds = max(0, self.holds - 1)
+            self.enabled = self.requested or self.holds > 0
+
+    def span(self, name: str, **attributes):
+        """Time a block of code
+
+        Args:
+            name (str): The name of the span
+            **attributes: Extra fields written with the span when exporting
+
+        Returns:
+            ContextManager: The span
+        """
+        if not self.enabled:
+            return self._nullSpan
+        return Span(self, name, attributes)
+
+    def timed(self, name: str) -> Callable:
+        """Decorate a function to time every call as a span
+
+        Args:
+            name (str): The name of the span
+
+        Returns:
+            Callable: The decorator
+        """
+
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, {}):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record(self, name: str, seconds: float, **attributes):
+        """Record the duration of a span
+
+        Args:
+            name (str): The name of the span
+            seconds (float): The duration of the span
+            **attributes: Extra fields written with the span when exporting
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+            self._export(
+                {"type": "span", "name": name, "ms": seconds * 1000, **attributes}
+            )
+
+    def count(self, name: str, value: int = 1):
+        """Increment a counter
+
+        Args:
+            name (str): The name of the counter
+            value (int): The increment
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self._export({"type": "count", "name": name, "value": value})
+
+    def summary(self) -> List[dict]:
+        """Summarize the recorded spans
+
+        Returns:
+            List[dict]: The name, count, p50 and p95 in milliseconds of every span,
+                ordered by name
+        """
+        with self.lock:
+            return [
+                {
+                    "name": name,
+                    "count": histogram.count,
+                    "p50": histogram.percentile(50) * 1000,
+                    "p95": histogram.percentile(95) * 1000,
+                }
+                for name, histogram in sorted(self.histograms.items())
+            ]
+
+    def counterValues(self) -> Dict[str, int]:
+        """Get the values of the counters
+
+        Returns:
+            Dict[str, int]: The value of every counter
+        """
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self):
+        """Drop the recorded spans and counters"""
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def startExport(self, path: str):
+        """Append every recorded span and counter to a JSON lines file
+
+        Args:
+            path (str): The path of the file
+        """
+        self.stopExport()
+        with self.lock:
+            self.exportFile = open(path, "a", encoding="utf-8", buffering=1)
+
+    def stopExport(self):
+        """Stop exporting and close the export file"""
+        with self.lock:
+            if self.exportFile is not None:
+                self.exportFile.close()
+                self.exportFile = None
+
+    def _export(self, event: dict):
+        if self.exportFile is not None:
+            event["ts"] = time.time()
+            event["thread"] = threading.current_thread().name
+            self.exportFile.write(json.dumps(event) + "\n")
+
+
+metrics = Metrics()
@@ -0,0 +1,3 @@
+"""
+Models module for the audition GUI client
+"""
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+from PyQt6.QtGui import QImage
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice
+
+
+class ImageCache:
+    """Persistent, content-addressed cache of sub-question images
+
+    Image bytes are stored once per SHA-256 digest, so images shared by several
+    image ids are only kept once. Every image id maps to a digest, the server hash
+    when it is known, its description and a downscaled thumbnail. Entries are
+    validated against their digest when reused and the least recently used ones are
+    evicted once the cache grows past ``maxBytes``.
+
+    Reading an image only updates its last use in memory, the index is written with
+    the next change of the cache or when it is closed.
+    """
+
+    INDEX_FILE = "index.json"
+    THUMBNAIL_SIZE = (600, 400)
+
+    def __init__(self, directory: str, maxBytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.lock = threading.RLock()
+
+        self.blobDirectory = os.path.join(directory, "blobs")
+        self.thumbnailDirectory = os.path.join(directory, "thumbnails")
+        os.makedirs(self.blobDirectory, exist_ok=True)
+        os.makedirs(self.thumbnailDirectory, exist_ok=True)
+
+        self.entries: Dict[str, dict] = self._loadIndex()
+        self.unsavedUses = False
+
+    def get(self, imageId: int) -> Optional[dict]:
+        """Get a cached image
+
+        Args:
+            imageId (int): The id of the image
+
+        Returns:
+            Optional[dict]: The image bytes, thumbnail bytes (or None) and description,
+                or None if the image is not cached or its cached bytes are corrupted
+        """
+        with self.lock:
+            entry = self.entries.get(str(imageId))
+            if entry is None:
+                return None
+
+            image = self._readFile(self._blobPath(entry["digest"]))
+            if image is None or hashlib.sha256(image).hexdigest() != entry["digest"]:
+                self.invalidate(imageId)
+                return None
+
+            thumbnail = None
+            if entry.get("thumbnail"):
+                thumbnail = self._readFile(self._thumbnailPath(entry["digest"]))
+
+            entry["lastUsed"] = time.time()
+            self.unsavedUses = True
+
+            return {
+                "image": image,
+                "thumbnail": thumbnail,
+                "description": entry["description"],
+                "hash": entry.get("hash"),
+            }
+
+    def put(
+        self,
+        imageId: int,
+        image: bytes,
+        description: str,
+        imageHash: Optional[str] = None,
+    ):
+        """Store an image in the cache
+
+        Args:
+            imageId (int): The id of the image
+            image (bytes): The image bytes
+            description (str): The description of the image
+            imageHash (Optional[str]): The hash of the image on the server, if known
+        """
+        digest = hashlib.sha256(image).hexdigest()
+        thumbnail = self._makeThumbnail(image)
+
+        with self.lock:
+            blobPath = self._blobPath(digest)
+            if not os.path.exists(blobPath):
+                self._writeFile(blobPath, image)
+            if thumbnail is not None:
+                self._writeFile(self._thumbnailPath(digest), thumbnail)
+
+            self.entries[str(imageId)] = {
+                "digest": digest,
+                "hash": imageHash,
+                "description": description,
+                "size": len(image) + len(thumbnail or b""),
+                "thumbnail": thumbnail is not None,
+                "lastUsed": time.time(),
+            }
+            self._evict()
+            self._saveIndex()
+
+    def setDescription(self, imageId: int, description: str):
+        """Update the cached description of an image
+
+        Args:
+            imageId (int): The id of the image
+            description (str): The new description of the image
+        """
+        with self.lock:
+            entry = self.entries.get(str(imageId))
+            if entry is not None:
+                entry["description"] = description
+                self._saveIndex()
+
+    def invalidate(self, imageId: int):
+        """Remove an image from the cache
+
+        Args:
+            imageId (int): The id of the image
+        """
+        with self.lock:
+            entry = self.entries.pop(str(imageId), None)
+            if entry is not None:
+                self._releaseDigest(entry["digest"])
+                self._saveIndex()
+
+    def clear(self):
+        """Remove every image from the cache"""
+        with self.lock:
+            for imageId in list(self.entries):
+                self.invalidate(int(imageId))
+
+    def close(self):
+        """Write the last uses of the images read since the last change to disk"""
+        with self.lock:
+            if self.unsavedUses:
+                self._saveIndex()
+
+    def _evict(self):
+        """Evict the least recently used images until the cache fits in maxBytes"""
+        digestSizes = {}
+        for entry in self.entries.values():
+            digestSizes[entry["digest"]] = entry["size"]
+        total = sum(digestSizes.values())
+
+        for imageId, entry in sorted(
+            self.entries.items(), key=lambda item: item[1]["lastUsed"]
+        ):
+            if total <= self.maxBytes:
+                break
+            del self.entries[imageId]
+            if self._releaseDigest(entry["digest"]):
+                total -= entry["size"]
+
+    def _releaseDigest(self, digest: str) -> bool:
+        """Delete the files of a digest no image id refers to anymore
+
+        Args:
+            digest (str): The digest of the image bytes
+
+        Returns:
+            bool: True if the files were deleted, False if the digest is still used
+        """
+        if any(entry["digest"] == digest for entry in self.entries.values()):
+            return False
+
+        for path in (self._blobPath(digest), self._thumbnailPath(digest)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+    def _makeThumbnail(self, image: bytes) -> Optional[bytes]:
+        """Downscale an image to the size of the image preview
+
+        Args:
+            image (bytes): The image bytes
+
+        Returns:
+            Optional[bytes]: The PNG bytes of the thumbnail, or None if the image is
+                already small enough or cannot be decoded
+        """
+        qimage = QImage.fromData(image)
+        width, height = self.THUMBNAIL_SIZE
+        if qimage.isNull() or (qimage.width() <= width and qimage.height() <= height):
+            return None
+
+        qimage = qimage.scaled(
+            width,
+            height,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        qimage.save(buffer, "PNG")
+        buffer.close()
+        return bytes(data)
+
+    def _loadIndex(self) -> Dict[str, dict]:
+        """Load the index of cached images from disk
+
+        Returns:
+            Dict[str, dict]: The cache entries by image id
+        """
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _saveIndex(self):
+        """Atomically write the index of cached images to disk"""
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        self._writeFile(path, json.dumps(self.entries).encode())
+        self.unsavedUses = False
+
+    def _blobPath(self, digest: str) -> str:
+        return os.path.join(self.blobDirectory, digest)
+
+    def _thumbnailPath(self, digest: str) -> str:
+        return os.path.join(self.thumbnailDirectory, f"{digest}.png")
+
+    def _readFile(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _writeFile(self, path: str, data: bytes):
+        temporaryPath = f"{path}.tmp"
+        with open(temporaryPath, "wb") as f:
+            f.write(data)
+        os.replace(temporaryPath, path)
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QImage, QPixmap
+
+from app.metrics import metrics
+
+
+PREVIEW_SIZE = QSize(600, 400)
+
+
+@metrics.timed("image.decode")
+def decodePreviewImage(image: bytes, maxSize: QSize = PREVIEW_SIZE) -> QImage:
+    """Decode image bytes and downscale them to fit the image preview
+
+    QImage can be used outside of the GUI thread, so this is meant to run on a worker.
+
+    Args:
+        image (bytes): The encoded image
+        maxSize (QSize): The maximum size of the decoded image
+
+    Returns:
+        QImage: The decoded image, null if the bytes could not be decoded
+    """
+    qimage = QImage.fromData(image)
+    if qimage.isNull():
+        return qimage
+
+    if qimage.width() > maxSize.width() or qimage.height() > maxSize.height():
+        qimage = qimage.scaled(
+            maxSize,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+    return qimage
+
+
+class PixmapCache:
+    """Memory-bounded LRU of decoded image previews keyed by image id"""
+
+    def __init__(self, maxBytes: int = 64 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self.entries: "OrderedDict[int, Tuple[QPixmap, str]]" = OrderedDict()
+
+    def __contains__(self, imageId: int):
+        return imageId in self.entries
+
+    def get(self, imageId: int) -> Optional[Tuple[QPixmap, str]]:
+        """Get a decoded image preview and mark it as recently used
+
+        Args:
+            imageId (int): The id of the image
+
+        Returns:
+            Optional[Tuple[QPixmap, str]]: The pixmap and description of the image,
+                or None if it is not cached
+        """
+        entry = self.entries.get(imageId)
+        if entry is not None:
+            self.entries.move_to_end(imageId)
+        return entry
+
+    def put(self, imageId: int, pixmap: QPixmap, description: str):
+        """Store a decoded image preview
+
+        Args:
+            imageId (int): The id of the image
+            pixmap (QPixmap): The decoded preview
+            description (str): The description of the image
+        """
+        self.invalidate(imageId)
+
+        self.entries[imageId] = (pixmap, description)
+        self.totalBytes += self._pixmapBytes(pixmap)
+
+        while self.totalBytes > self.maxBytes and len(self.entries) > 1:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.totalBytes -= self._pixmapBytes(evicted)
+
+    def setDescription(self, imageId: int, description: str):
+        """Update the cached description of an image
+
+        Args:
+            imageId (int): The id of the image
+            description (str): The new description of the image
+        """
+        entry = self.entries.get(imageId)
+        if entry is not None:
+            self.entries[imageId] = (entry[0], description)
+
+    def invalidate(self, imageId: int):
+        """Remove an image from the cache
+
+        Args:
+            imageId (int): The id of the image
+        """
+        entry = self.entries.pop(imageId, None)
+        if entry is not None:
+            self.totalBytes -= self._pixmapBytes(entry[0])
+
+    def _pixmapBytes(self, pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
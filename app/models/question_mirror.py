@@ -0,0 +1,585 @@
+import sqlite3
+import hashlib
+import threading
+from pydantic import TypeAdapter
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from nanoko.models.question import ConceptType, ProcessType, Question
+
+
+QUESTION_LIST = TypeAdapter(List[Question])
+
+
+# Joins the keywords and options of a sub-question, which never contain it
+LIST_SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    is_audited INTEGER,
+    is_deleted INTEGER,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sub_questions (
+    id INTEGER PRIMARY KEY,
+    question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    concept INTEGER NOT NULL,
+    process INTEGER NOT NULL,
+    keywords TEXT,
+    options TEXT,
+    image_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS sub_questions_question ON sub_questions (question_id);
+CREATE INDEX IF NOT EXISTS sub_questions_image ON sub_questions (image_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS sub_question_text USING fts5 (
+    description, answer, keywords, concept, process,
+    content = 'sub_questions', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+# Keep the full-text index in step with the sub-questions once it has been built
+TEXT_INDEX_TRIGGERS = [
+    """
+    CREATE TRIGGER sub_question_text_insert AFTER INSERT ON sub_questions BEGIN
+        INSERT INTO sub_question_text
+            (rowid, description, answer, keywords, concept, process)
+        VALUES
+            (new.id, new.description, new.answer, new.keywords, new.concept,
+            new.process);
+    END
+    """,
+    """
+    CREATE TRIGGER sub_question_text_delete AFTER DELETE ON sub_questions BEGIN
+        INSERT INTO sub_question_text
+            (sub_question_text, rowid, description, answer, keywords, concept,
+            process)
+        VALUES
+            ('delete', old.id, old.description, old.answer, old.keywords,
+            old.concept, old.process);
+    END
+    """,
+    """
+    CREATE TRIGGER sub_question_text_update AFTER UPDATE ON sub_questions BEGIN
+        INSERT INTO sub_question_text
+            (sub_question_text, rowid, description, answer, keywords, concept,
+            process)
+        VALUES
+            ('delete', old.id, old.description, old.answer, old.keywords,
+            old.concept, old.process);
+        INSERT INTO sub_question_text
+            (rowid, description, answer, keywords, concept, process)
+        VALUES
+            (new.id, new.description, new.answer, new.keywords, new.concept,
+            new.process);
+    END
+    """,
+]
+
+# The fields a search word can be qualified with, like "keyword:fraction"
+SEARCH_FIELDS = {
+    "description": "description",
+    "answer": "answer",
+    "keyword": "keywords",
+    "keywords": "keywords",
+    "concept": "concept",
+    "process": "process",
+}
+TEXT_FIELDS = "{description answer keywords}"
+
+
+def joinList(values: Optional[List[str]]) -> Optional[str]:
+    """Encode a list of strings for a column
+
+    Args:
+        values (Optional[List[str]]): The strings
+
+    Returns:
+        Optional[str]: The encoded strings, None if there is no list
+    """
+    return None if values is None else LIST_SEPARATOR.join(values)
+
+
+def splitList(value: Optional[str]) -> Optional[List[str]]:
+    """Decode a list of strings from a column
+
+    Args:
+        value (Optional[str]): The encoded strings
+
+    Returns:
+        Optional[List[str]]: The strings, None if there is no list
+    """
+    if value is None:
+        return None
+    return value.split(LIST_SEPARATOR) if value else []
+
+
+def buildTextQuery(text: str) -> Optional[str]:
+    """Translate a search text into a query of the full-text index
+
+    Every word must match. A word matches the start of a word of the description,
+    the answer or the keywords of a sub-question, or only of one field when it is
+    qualified like ``keyword:fraction``. ``concept:`` and ``process:`` match the
+    types whose name contains the word, like ``concept:measure``.
+
+    Args:
+        text (str): The search text
+
+    Returns:
+        Optional[str]: The query, None if no sub-question can match
+    """
+    terms = []
+    for word in text.split():
+        field, _, value = word.partition(":")
+        column = SEARCH_FIELDS.get(field.lower()) if value else None
+        if column is None:
+            value = word
+
+        if column in ("concept", "process"):
+            types = ConceptType if column == "concept" else ProcessType
+            values = [
+                f'"{member.value}"'
+                for name, member in types.__members__.items()
+                if value.lower() in name.lower()
+            ]
+            if not values:
+                return None
+            terms.append(f"{column} : ({' OR '.join(values)})")
+        elif any(character.isalnum() for character in value):
+            phrase = value.replace('"', '""')
+            terms.append(f'{column or TEXT_FIELDS} : "{phrase}"*')
+
+    return " AND ".join(terms) if terms else None
+
+
+def questionDigest(question: Question) -> str:
+    """Get a digest of the content of a question
+
+    Args:
+        question (Question): The question
+
+    Returns:
+        str: The digest, equal for questions with equal content
+    """
+    return hashlib.blake2b(
+        question.model_dump_json().encode(), digest_size=16
+    ).hexdigest()
+
+
+class QuestionMirror:
+    """Persistent SQLite mirror of the question bank
+
+    Questions and their sub-questions are kept across sessions, so the question list
+    can be shown before the bank has been downloaded again. Every question is stored
+    with a digest of its content, and a sync only writes the questions whose digest
+    changed and removes the ones the server no longer lists.
+
+    The texts of the sub-questions are also indexed in an SQLite full-text index,
+    built once in the background and then kept up to date by every write.
+
+    The mirror is safe to use from several threads at once.
+    """
+
+    RANKED_MATCHES = 5000
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        # Sub-questions replaced by a moved one must leave the full-text index too
+        self.connection.execute("PRAGMA recursive_triggers=ON")
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        with self.lock:
+            row = self.connection.execute("SELECT COUNT(*) FROM questions").fetchone()
+        return row[0]
+
+    def iterQuestions(
+        self, chunkSize: int = 1000, firstChunkSize: int = 100
+    ) -> Iterator[List[Question]]:
+        """Read every mirrored question in chunks
+
+        Args:
+            chunkSize (int): The number of questions per chunk
+            firstChunkSize (int): The number of questions in the first chunk, kept
+                small so the first rows can be shown sooner
+
+        Yields:
+            List[Question]: The next chunk of questions, ordered by ID
+        """
+        lastId = -1
+        limit = firstChunkSize
+        while True:
+            with self.lock:
+                questionRows = self.connection.execute(
+                    "SELECT id, name, source, is_audited, is_deleted FROM questions "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (lastId, limit),
+                ).fetchall()
+                if not questionRows:
+                    return
+                subQuestionRows = self.connection.execute(
+                    "SELECT question_id, id, description, answer, concept, process, "
+                    "keywords, options, image_id FROM sub_questions "
+                    "WHERE question_id BETWEEN ? AND ? ORDER BY question_id, position",
+                    (questionRows[0][0], questionRows[-1][0]),
+                ).fetchall()
+            lastId = questionRows[-1][0]
+            limit = chunkSize
+
+            yield self._buildQuestions(questionRows, subQuestionRows)
+
+    def get(self, questionId: int) -> Optional[Question]:
+        """Read a mirrored question
+
+        Args:
+            questionId (int): The ID of the question
+
+        Returns:
+            Optional[Question]: The question, or None if it is not mirrored
+        """
+        with self.lock:
+            questionRows = self.connection.execute(
+                "SELECT id, name, source, is_audited, is_deleted FROM questions "
+                "WHERE id = ?",
+                (questionId,),
+            ).fetchall()
+            if not questionRows:
+                return None
+            subQuestionRows = self.connection.execute(
+                "SELECT question_id, id, description, answer, concept, process, "
+                "keywords, options, image_id FROM sub_questions "
+                "WHERE question_id = ? ORDER BY position",
+                (questionId,),
+            ).fetchall()
+        return self._buildQuestions(questionRows, subQuestionRows)[0]
+
+    def questions(self) -> List[Question]:
+        """Read every mirrored question
+
+        Returns:
+            List[Question]: The questions, ordered by ID
+        """
+        return [question for chunk in self.iterQuestions() for question in chunk]
+
+    def put(self, questions: Iterable[Question]) -> int:
+        """Store questions fetched from the server
+
+        Args:
+            questions (Iterable[Question]): The fetched questions
+
+        Returns:
+            int: The number of questions whose content changed
+        """
+        return self.beginSync().apply(questions)
+
+    def setFlag(self, questionIds: Iterable[int], field: str):
+        """Set the audited or deleted flag of questions
+
+        Args:
+            questionIds (Iterable[int]): The IDs of the questions
+            field (str): "is_audited" or "is_deleted"
+        """
+        if field not in ("is_audited", "is_deleted"):
+            raise ValueError(f"Unknown flag: {field}")
+
+        # The digest no longer matches the content, so the next sync rewrites them
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"UPDATE questions SET {field} = 1, digest = '' WHERE id = ?",
+                ((questionId,) for questionId in questionIds),
+            )
+
+    def updateSubQuestion(self, questionId: int, subQuestionId: int, fields: dict):
+        """Apply the saved fields of an edited sub-question
+
+        Args:
+            questionId (int): The ID of the question of the sub-question
+            subQuestionId (int): The ID of the sub-question
+            fields (dict): The new values of the saved fields, as queued by the
+                edit window
+        """
+        columns = {}
+        for field, value in fields.items():
+            if field in ("description", "answer"):
+                columns[field] = value
+            elif field in ("concept", "process"):
+                columns[field] = value.value
+            elif field in ("keywords", "options"):
+                columns[field] = joinList(value)
+            elif field == "image_id":
+                # Only removing the image of a sub-question is queued
+                columns[field] = None
+
+        # The digest no longer matches the content, so the next sync rewrites them
+        with self.lock, self.connection:
+            if "question_name" in fields:
+                self.connection.execute(
+                    "UPDATE questions SET name = ?, digest = '' WHERE id = ?",
+                    (fields["question_name"], questionId),
+                )
+            if columns:
+                assignments = ", ".join(f"{column} = ?" for column in columns)
+                self.connection.execute(
+                    f"UPDATE sub_questions SET {assignments} WHERE id = ?",
+                    (*columns.values(), subQuestionId),
+                )
+                self.connection.execute(
+                    "UPDATE questions SET digest = '' WHERE id = ?", (questionId,)
+                )
+
+    def indexText(self) -> bool:
+        """Build the full-text index of the sub-questions, unless it is built
+
+        Returns:
+            bool: True if the index was built now
+        """
+        with self.lock, self.connection:
+            built = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                "AND name = 'sub_question_text_insert'"
+            ).fetchone()
+            if built:
+                return False
+
+            # Writes made before the triggers exist are picked up by the rebuild
+            self.connection.execute(
+                "INSERT INTO sub_question_text (sub_question_text) VALUES ('rebuild')"
+            )
+            for trigger in TEXT_INDEX_TRIGGERS:
+                self.connection.execute(trigger)
+            return True
+
+    def searchSubQuestions(self, text: str, limit: int = 1000) -> List[int]:
+        """Find the questions whose sub-questions match a search text
+
+        Args:
+            text (str): The search text, see ``buildTextQuery``
+            limit (int): The maximum number of questions
+
+        Returns:
+            List[int]: The IDs of the matching questions, best match first, or in
+                index order when too many sub-questions match to rank them
+        """
+        query = buildTextQuery(text)
+        if query is None:
+            return []
+
+        with self.lock:
+            count = self.connection.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM sub_question_text "
+                "WHERE sub_question_text MATCH ? LIMIT ?)",
+                (query, self.RANKED_MATCHES + 1),
+            ).fetchone()[0]
+
+            # Ranking every match of a very common word costs more than it tells
+            if count > self.RANKED_MATCHES:
+                rows = self.connection.execute(
+                    "SELECT DISTINCT sub_questions.question_id FROM sub_question_text "
+                    "JOIN sub_questions ON sub_questions.id = sub_question_text.rowid "
+                    "WHERE sub_question_text MATCH ? LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+                return [row[0] for row in rows]
+
+            # A question ranks as its best matching sub-question, keywords weigh most
+            rows = self.connection.execute(
+                "SELECT sub_questions.question_id FROM ("
+                "SELECT rowid, bm25(sub_question_text, 2.0, 1.0, 4.0, 1.0, 1.0) "
+                "AS score FROM sub_question_text WHERE sub_question_text MATCH ? "
+                "ORDER BY score LIMIT ?) AS matches "
+                "JOIN sub_questions ON sub_questions.id = matches.rowid "
+                "GROUP BY sub_questions.question_id ORDER BY MIN(matches.score) "
+                "LIMIT ?",
+                (query, self.RANKED_MATCHES, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self):
+        """Remove every mirrored question"""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM questions")
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.connection.close()
+
+    def beginSync(self) -> "MirrorSync":
+        """Start reconciling the mirror with a listing of the bank
+
+        Returns:
+            MirrorSync: The sync, fed with the questions of the listing
+        """
+        with self.lock:
+            digests = dict(self.connection.execute("SELECT id, digest FROM questions"))
+        return MirrorSync(self, digests)
+
+    def _buildQuestions(
+        self, questionRows: List[tuple], subQuestionRows: List[tuple]
+    ) -> List[Question]:
+        """Build questions from their rows
+
+        Args:
+            questionRows (List[tuple]): The rows of the questions
+            subQuestionRows (List[tuple]): The rows of their sub-questions, ordered
+                by position
+
+        Returns:
+            List[Question]: The questions, in the order of their rows
+        """
+        subQuestions: Dict[int, List[dict]] = {}
+        for row in subQuestionRows:
+            subQuestions.setdefault(row[0], []).append(
+                {
+                    "id": row[1],
+                    "description": row[2],
+                    "answer": row[3],
+                    "concept": row[4],
+                    "process": row[5],
+                    "keywords": splitList(row[6]),
+                    "options": splitList(row[7]),
+                    "image_id": row[8],
+                }
+            )
+
+        return QUESTION_LIST.validate_python(
+            [
+                {
+                    "id": row[0],
+                    "name": row[1],
+                    "source": row[2],
+                    "is_audited": None if row[3] is None else bool(row[3]),
+                    "is_deleted": None if row[4] is None else bool(row[4]),
+                    "sub_questions": subQuestions.get(row[0], []),
+                }
+                for row in questionRows
+            ]
+        )
+
+    def _write(self, questions: List[Question], digests: List[str]):
+        """Replace the stored rows of questions
+
+        Args:
+            questions (List[Question]): The questions to write
+            digests (List[str]): The digest of every question
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM sub_questions WHERE question_id = ?",
+                ((question.id,) for question in questions),
+            )
+            self.connection.executemany(
+                "INSERT INTO questions "
+                "(id, name, source, is_audited, is_deleted, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "name = excluded.name, source = excluded.source, "
+                "is_audited = excluded.is_audited, is_deleted = excluded.is_deleted, "
+                "digest = excluded.digest",
+                (
+                    (
+                        question.id,
+                        question.name,
+                        question.source,
+                        question.is_audited,
+                        question.is_deleted,
+                        digest,
+                    )
+                    for question, digest in zip(questions, digests, strict=True)
+                ),
+            )
+            # A sub-question moved from another question replaces its old row
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sub_questions "
+                "(id, question_id, position, description, answer, concept, process, "
+                "keywords, options, image_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        subQuestion.id,
+                        question.id,
+                        position,
+                        subQuestion.description,
+                        subQuestion.answer,
+                        subQuestion.concept.value,
+                        subQuestion.process.value,
+                        joinList(subQuestion.keywords),
+                        joinList(subQuestion.options),
+                        subQuestion.image_id,
+                    )
+                    for question in questions
+                    for position, subQuestion in enumerate(question.sub_questions)
+                ),
+            )
+
+    def _remove(self, questionIds: Iterable[int]):
+        """Remove questions and their sub-questions
+
+        Args:
+            questionIds (Iterable[int]): The IDs of the questions
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM questions WHERE id = ?",
+                ((questionId,) for questionId in questionIds),
+            )
+
+
+class MirrorSync:
+    """Reconciles a mirror with a listing of the bank received in chunks
+
+    Only the questions whose content changed are written. Questions missing from
+    the listing are removed when the sync finishes, so an interrupted sync never
+    removes anything.
+    """
+
+    def __init__(self, mirror: QuestionMirror, digests: Dict[int, str]):
+        self.mirror = mirror
+        self.digests = digests
+        self.seen: Set[int] = set()
+        self.changedCount = 0
+
+    def apply(self, questions: Iterable[Question]) -> int:
+        """Write the changed questions of a chunk of the listing
+
+        Args:
+            questions (Iterable[Question]): The questions of the chunk
+
+        Returns:
+            int: The number of questions whose content changed
+        """
+        changed = []
+        changedDigests = []
+        for question in questions:
+            self.seen.add(question.id)
+            digest = questionDigest(question)
+            if self.digests.get(question.id) != digest:
+                self.digests[question.id] = digest
+                changed.append(question)
+                changedDigests.append(digest)
+
+        if changed:
+            self.mirror._write(changed, changedDigests)
+        self.changedCount += len(changed)
+        return len(changed)
+
+    def finish(self) -> List[int]:
+        """Remove the questions the listing did not contain
+
+        Returns:
+            List[int]: The IDs of the removed questions
+        """
+        removed = [
+            questionId for questionId in self.digests if questionId not in self.seen
+        ]
+        if removed:
+            self.mirror._remove(removed)
+        return removed
@@ -0,0 +1,200 @@
+import time
+from typing import Dict, Iterable, List, Optional
+from nanoko.models.question import Question
+
+from app.models.question_summary import QuestionSummary
+
+
+class QuestionStore:
+    """Client-side store of the questions shared by every window
+
+    The store keeps a summary of every listed question, in the order of the question
+    list, and the last known version of every question that was loaded in full
+    together with the time it was fetched. Windows render from the store right away
+    and the controller refreshes an entry in the background once it is older than
+    ``maxAge`` or was invalidated.
+
+    The store is only meant to be used from the GUI thread.
+    """
+
+    def __init__(self, maxAge: float = 300.0):
+        self.maxAge = maxAge
+        self.clear()
+
+    def clear(self):
+        """Remove every question from the store"""
+        self.entries: Dict[int, Question] = {}
+        self.fetchedAt: Dict[int, float] = {}
+        self.summaries: Dict[int, QuestionSummary] = {}
+        self.listedIds: List[int] = []
+        self.listFetchedAt: Optional[float] = None
+
+    def __contains__(self, questionId: int):
+        return questionId in self.entries
+
+    def get(self, questionId: int) -> Optional[Question]:
+        """Get the last known version of a question
+
+        Args:
+            questionId (int): The ID of the question
+
+        Returns:
+            Optional[Question]: The question, or None if it is not in the store
+        """
+        return self.entries.get(questionId)
+
+    def put(self, question: Question, fetchedAt: Optional[float] = None):
+        """Store a question fetched from the server
+
+        Args:
+            question (Question): The fetched question
+            fetchedAt (Optional[float]): When the question was fetched, in
+                ``time.monotonic()`` seconds. Defaults to now
+        """
+        self.entries[question.id] = question
+        self.fetchedAt[question.id] = (
+            time.monotonic() if fetchedAt is None else fetchedAt
+        )
+        self.resummarize(question)
+
+    def resummarize(self, question: Question) -> Optional[QuestionSummary]:
+        """Update the summary of a listed question after it changed
+
+        Args:
+            question (Question): The changed question
+
+        Returns:
+            Optional[QuestionSummary]: The new summary, or None if it is not listed
+        """
+        if question.id not in self.summaries:
+            return None
+        summary = self.summaries[question.id] = QuestionSummary.fromQuestion(question)
+        return summary
+
+    def summary(self, questionId: int) -> Optional[QuestionSummary]:
+        """Get the summary of a listed question
+
+        Args:
+            questionId (int): The ID of the question
+
+        Returns:
+            Optional[QuestionSummary]: The summary, or None if it is not listed
+        """
+        return self.summaries.get(questionId)
+
+    def setFlag(self, questionIds: Iterable[int], field: str) -> List[QuestionSummary]:
+        """Set the audited or deleted flag of questions
+
+        Args:
+            questionIds (Iterable[int]): The IDs of the questions
+            field (str): "is_audited" or "is_deleted"
+
+        Returns:
+            List[QuestionSummary]: The summaries of the listed questions
+        """
+        changed = []
+        for questionId in questionIds:
+            question = self.entries.get(questionId)
+            if question is not None:
+                setattr(question, field, True)
+            summary = self.summaries.get(questionId)
+            if summary is not None:
+                setattr(summary, field, True)
+                changed.append(summary)
+        return changed
+
+    def isStale(self, questionId: int) -> bool:
+        """Check if a question should be fetched again
+
+        Args:
+            questionId (int): The ID of the question
+
+        Returns:
+            bool: True if the question is missing, invalidated or older than maxAge
+        """
+        fetchedAt = self.fetchedAt.get(questionId)
+        return fetchedAt is None or time.monotonic() - fetchedAt > self.maxAge
+
+    def invalidate(self, questionId: int):
+        """Mark a question as stale, keeping it available until it is refreshed
+
+        Args:
+            questionId (int): The ID of the question
+        """
+        self.fetchedAt.pop(questionId, None)
+
+    def questions(self) -> List[QuestionSummary]:
+        """Get the summaries of the questions of the question list
+
+        Returns:
+            List[QuestionSummary]: A copy of the question list, in server order
+        """
+        return [self.summaries[questionId] for questionId in self.listedIds]
+
+    def hasList(self) -> bool:
+        """Check if the whole question list has been loaded
+
+        Returns:
+            bool: True if a question list finished loading, False otherwise
+        """
+        return self.listFetchedAt is not None
+
+    def isListStale(self) -> bool:
+        """Check if the question list should be loaded again
+
+        Returns:
+            bool: True if the list is missing, invalidated or older than maxAge
+        """
+        return (
+            self.listFetchedAt is None
+            or time.monotonic() - self.listFetchedAt > self.maxAge
+        )
+
+    def invalidateList(self):
+        """Mark the question list as stale, keeping it available until it is reloaded"""
+        if self.listFetchedAt is not None:
+            self.listFetchedAt = float("-inf")
+
+    def markStale(self):
+        """Mark the question list and every question as stale
+
+        Used for questions restored from an earlier session, which stay available
+        until they are loaded again.
+        """
+        self.fetchedAt.clear()
+        self.invalidateList()
+
+    def beginList(self):
+        """Start loading a new question list"""
+        self.summaries = {}
+        self.listedIds = []
+        self.listFetchedAt = None
+
+    def extendList(self, summaries: Iterable[QuestionSummary]):
+        """Append a chunk of loaded questions to the question list
+
+        Args:
+            summaries (Iterable[QuestionSummary]): The summaries of the questions
+        """
+        for summary in summaries:
+            self.summaries[summary.id] = summary
+            self.listedIds.append(summary.id)
+
+    def refresh(self, questions: Iterable[Question]):
+        """Replace the loaded questions with newer versions from a listing
+
+        Questions which were not loaded in full are left out, they are loaded again
+        when they are opened.
+
+        Args:
+            questions (Iterable[Question]): The listed questions
+        """
+        now = time.monotonic()
+        for question in questions:
+            if question.id in self.entries:
+                self.entries[question.id] = question
+                self.fetchedAt[question.id] = now
+
+    def finishList(self):
+        """Mark the question list as completely loaded"""
+        self.listFetchedAt = time.monotonic()
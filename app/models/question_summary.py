@@ -0,0 +1,41 @@
+import sys
+from dataclasses import dataclass
+from nanoko.models.question import Question
+
+
+@dataclass(slots=True)
+class QuestionSummary:
+    """The fields of a question shown in the question list
+
+    The list keeps a summary of every question of the bank instead of the question
+    itself, so the texts of the sub-questions are not held in memory. Full questions
+    are loaded when they are opened. The list models only accept summaries, full
+    questions are summarized with ``fromQuestion`` first.
+    """
+
+    id: int
+    name: str
+    source: str
+    is_audited: bool
+    is_deleted: bool
+    sub_question_count: int
+
+    @classmethod
+    def fromQuestion(cls, question: Question) -> "QuestionSummary":
+        """Summarize a question
+
+        Args:
+            question (Question): The question
+
+        Returns:
+            QuestionSummary: The summary of the question
+        """
+        return cls(
+            question.id,
+            question.name,
+            # Many questions share a source, they share its string too
+            sys.intern(question.source),
+            bool(question.is_audited),
+            bool(question.is_deleted),
+            len(question.sub_questions),
+        )
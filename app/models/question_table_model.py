@@ -0,0 +1,155 @@
+from array import array
+from typing import Iterable, List, Optional, Sequence
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from app.models.question_summary import QuestionSummary
+
+
+class QuestionTableModel(QAbstractTableModel):
+    """Table model exposing a list of questions to a view
+
+    Rows are only materialized when the view asks for them, so the cost of a frame
+    does not depend on the number of questions in the model. The model displays a
+    view of a list of questions it shares with its owner: an array of the positions
+    of the displayed questions in that list, so filtering and sorting never copy the
+    questions.
+    """
+
+    QuestionRole = Qt.ItemDataRole.UserRole
+    StatusRole = Qt.ItemDataRole.UserRole + 1
+
+    ID_COLUMN = 0
+    NAME_COLUMN = 1
+    SOURCE_COLUMN = 2
+    AUDITED_COLUMN = 3
+    DELETED_COLUMN = 4
+    SUB_QUESTIONS_COLUMN = 5
+
+    HEADERS = ["ID", "Name", "Source", "Audited", "Deleted", "Sub-Questions"]
+    SORT_FIELDS = [
+        "id",
+        "name",
+        "source",
+        "is_audited",
+        "is_deleted",
+        "sub_question_count",
+    ]
+    STATUS_COLUMNS = (AUDITED_COLUMN, DELETED_COLUMN)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.questions: List[QuestionSummary] = []
+        self.rows = array("I")
+
+    def setQuestions(
+        self, questions: List[QuestionSummary], rows: Optional[array] = None
+    ):
+        """Replace the questions of the model
+
+        Args:
+            questions (List[QuestionSummary]): The list of questions, kept by
+                reference
+            rows (Optional[array]): The positions of the displayed questions in the
+                list, in display order. Defaults to every question
+        """
+        self.beginResetModel()
+        self.questions = questions
+        self.rows = array("I", range(len(questions))) if rows is None else rows
+        self.endResetModel()
+
+    def setRows(self, rows: array):
+        """Display another view of the questions
+
+        Args:
+            rows (array): The positions of the displayed questions in the list, in
+                display order
+        """
+        self.setQuestions(self.questions, rows)
+
+    def appendRows(self, rows: Sequence[int]):
+        """Display more questions of the list after the last row
+
+        Args:
+            rows (Sequence[int]): The positions of the questions in the list
+        """
+        if not rows:
+            return
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def updateRows(self, positions: Iterable[int]):
+        """Redraw the rows of questions which changed in the list in one pass
+
+        Args:
+            positions (Iterable[int]): The positions of the changed questions in the
+                list
+        """
+        changed = set(positions)
+        for row, position in enumerate(self.rows):
+            if position in changed:
+                self.dataChanged.emit(
+                    self.index(row, 0), self.index(row, self.columnCount() - 1)
+                )
+
+    def questionAt(self, row: int) -> Optional[QuestionSummary]:
+        """Get the question displayed at a row
+
+        Args:
+            row (int): The row of the question
+
+        Returns:
+            Optional[QuestionSummary]: The question, or None if the row is out of range
+        """
+        if 0 <= row < len(self.rows):
+            return self.questions[self.rows[row]]
+        return None
+
+    def rowCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        question = self.questions[self.rows[index.row()]]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.ID_COLUMN:
+                return str(question.id)
+            elif column == self.NAME_COLUMN:
+                return question.name
+            elif column == self.SOURCE_COLUMN:
+                return question.source
+            elif column == self.SUB_QUESTIONS_COLUMN:
+                subCount = question.sub_question_count
+                return f"{subCount} sub-questions" if subCount > 1 else "1 sub-question"
+
+        elif role == self.StatusRole:
+            if column == self.AUDITED_COLUMN:
+                return bool(question.is_audited)
+            elif column == self.DELETED_COLUMN:
+                return bool(question.is_deleted)
+
+        elif role == self.QuestionRole:
+            return question
+
+        return None
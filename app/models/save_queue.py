@@ -0,0 +1,337 @@
+import json
+import time
+import random
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+from nanoko.models.question import ConceptType, ProcessType, Question
+
+from app.models.sub_question_snapshot import SubQuestionSnapshot
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_saves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    sub_question_id INTEGER NOT NULL,
+    snapshot TEXT NOT NULL,
+    changes TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+"""
+
+SUB_QUESTION_FIELDS = (
+    "description",
+    "answer",
+    "concept",
+    "process",
+    "keywords",
+    "options",
+)
+
+
+def encodeChanges(changes: Dict[str, object]) -> str:
+    """Encode the changed fields of a sub-question as JSON
+
+    Args:
+        changes (Dict[str, object]): The new values of the changed fields
+
+    Returns:
+        str: The encoded changes
+    """
+    return json.dumps(
+        {
+            field: value.value if field in ("concept", "process") else value
+            for field, value in changes.items()
+        }
+    )
+
+
+def decodeChanges(value: str) -> Dict[str, object]:
+    """Decode the changed fields of a sub-question
+
+    Args:
+        value (str): The changes as returned by ``encodeChanges``
+
+    Returns:
+        Dict[str, object]: The new values of the changed fields
+    """
+    changes = json.loads(value)
+    if "concept" in changes:
+        changes["concept"] = ConceptType(changes["concept"])
+    if "process" in changes:
+        changes["process"] = ProcessType(changes["process"])
+    return changes
+
+
+def applyChanges(question: Question, subQuestionId: int, changes: Dict[str, object]):
+    """Apply the changed fields of a sub-question to a question in place
+
+    Args:
+        question (Question): The question of the sub-question
+        subQuestionId (int): The ID of the changed sub-question
+        changes (Dict[str, object]): The new values of the changed fields
+    """
+    if "question_name" in changes:
+        question.name = changes["question_name"]
+
+    for subQuestion in question.sub_questions:
+        if subQuestion.id != subQuestionId:
+            continue
+        for field in SUB_QUESTION_FIELDS:
+            if field in changes:
+                setattr(subQuestion, field, changes[field])
+        if "image_id" in changes:
+            subQuestion.image_id = None
+
+
+@dataclass
+class PendingSave:
+    """An edit of a sub-question waiting to be sent to the server"""
+
+    id: int
+    snapshot: SubQuestionSnapshot
+    changes: Dict[str, object]
+    createdAt: float
+    attempts: int = 0
+    nextAttemptAt: float = 0.0
+    error: Optional[str] = None
+
+
+class SaveQueue:
+    """Durable queue of sub-question edits waiting to be sent to the server
+
+    Edits are written to SQLite as soon as they are saved, so they survive failed
+    requests and restarts. Edits of one sub-question are sent in the order they were
+    saved: only the oldest one is handed out at a time, and an edit saved while an
+    older one is still waiting is merged into it. A failed edit is retried after an
+    exponential backoff with jitter.
+
+    The queue must only be used from the GUI thread.
+    """
+
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 60.0
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        # Ordered by ID, which is the order the edits were saved in
+        self.entries: Dict[int, PendingSave] = {}
+        self.sending: Set[int] = set()
+        for row in self.connection.execute(
+            "SELECT id, snapshot, changes, created_at, attempts, next_attempt_at, "
+            "error FROM pending_saves ORDER BY id"
+        ):
+            self.entries[row[0]] = PendingSave(
+                id=row[0],
+                snapshot=SubQuestionSnapshot.fromDict(json.loads(row[1])),
+                changes=decodeChanges(row[2]),
+                createdAt=row[3],
+                attempts=row[4],
+                nextAttemptAt=row[5],
+                error=row[6],
+            )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def enqueue(
+        self, snapshot: SubQuestionSnapshot, changes: Dict[str, object]
+    ) -> PendingSave:
+        """Record an edit of a sub-question
+
+        Args:
+            snapshot (SubQuestionSnapshot): The sub-question as it was loaded
+            changes (Dict[str, object]): The new values of the changed fields
+
+        Returns:
+            PendingSave: The queued edit, which may be an older edit it was merged into
+        """
+        latest = self._latest(snapshot.subQuestionId)
+        with self.connection:
+            if latest is not None and latest.id not in self.sending:
+                latest.changes.update(changes)
+                self.connection.execute(
+                    "UPDATE pending_saves SET changes = ? WHERE id = ?",
+                    (encodeChanges(latest.changes), latest.id),
+                )
+                return latest
+
+            createdAt = time.time()
+            cursor = self.connection.execute(
+                "INSERT INTO pending_saves "
+                "(question_id, sub_question_id, snapshot, changes, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    snapshot.questionId,
+                    snapshot.subQuestionId,
+                    json.dumps(snapshot.toDict()),
+                    encodeChanges(changes),
+                    createdAt,
+                ),
+            )
+
+        entry = PendingSave(cursor.lastrowid, snapshot, dict(changes), createdAt)
+        self.entries[entry.id] = entry
+        return entry
+
+    def due(self, now: Optional[float] = None) -> List[PendingSave]:
+        """Get the edits to send now, the oldest one of every sub-question
+
+        Args:
+            now (Optional[float]): The current time, ``time.time()`` by default
+
+        Returns:
+            List[PendingSave]: The edits which are not being sent and whose retry
+                delay has passed
+        """
+        now = time.time() if now is None else now
+        return [
+            entry
+            for entry in self._heads()
+            if entry.id not in self.sending and entry.nextAttemptAt <= now
+        ]
+
+    def nextAttemptAt(self) -> Optional[float]:
+        """Get when the next edit waiting for a retry is due
+
+        Returns:
+            Optional[float]: The time of the earliest retry, None if no edit waits
+        """
+        times = [
+            entry.nextAttemptAt
+            for entry in self._heads()
+            if entry.id not in self.sending
+        ]
+        return min(times) if times else None
+
+    def markSending(self, entry: PendingSave):
+        """Mark an edit as being sent, so no other edit is merged into it
+
+        Args:
+            entry (PendingSave): The edit
+        """
+        self.sending.add(entry.id)
+
+    def stopSending(self):
+        """Forget the edits being sent, after their requests were cancelled
+
+        The edits stay queued and are handed out again by the next flush.
+        """
+        self.sending.clear()
+
+    def complete(self, entry: PendingSave):
+        """Remove an edit that was sent
+
+        Args:
+            entry (PendingSave): The edit
+        """
+        self.sending.discard(entry.id)
+        self.entries.pop(entry.id, None)
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM pending_saves WHERE id = ?", (entry.id,)
+            )
+
+    def retry(self, entry: PendingSave, changes: Dict[str, object], error: str):
+        """Keep the unsent fields of an edit and schedule it again after a backoff
+
+        Args:
+            entry (PendingSave): The edit
+            changes (Dict[str, object]): The fields that still have to be sent
+            error (str): The error the edit failed with
+        """
+        self.sending.discard(entry.id)
+        entry.changes = dict(changes)
+        entry.attempts += 1
+        entry.nextAttemptAt = time.time() + self.retryDelay(entry.attempts)
+        entry.error = error
+        with self.connection:
+            self.connection.execute(
+                "UPDATE pending_saves SET changes = ?, attempts = ?, "
+                "next_attempt_at = ?, error = ? WHERE id = ?",
+                (
+                    encodeChanges(entry.changes),
+                    entry.attempts,
+                    entry.nextAttemptAt,
+                    error,
+                    entry.id,
+                ),
+            )
+
+    def retryDelay(self, attempts: int) -> float:
+        """Get the delay before retrying an edit
+
+        Args:
+            attempts (int): The number of failed attempts
+
+        Returns:
+            float: The delay in seconds, doubling with every attempt up to a maximum
+                and randomized so retries of many edits do not arrive together
+        """
+        delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def discard(self, subQuestionId: int) -> List[PendingSave]:
+        """Drop every edit of a sub-question, once one of them was rejected
+
+        Later edits were made on top of the rejected one, so they are dropped too.
+
+        Args:
+            subQuestionId (int): The ID of the sub-question
+
+        Returns:
+            List[PendingSave]: The dropped edits
+        """
+        discarded = [
+            entry
+            for entry in self.entries.values()
+            if entry.snapshot.subQuestionId == subQuestionId
+        ]
+        for entry in discarded:
+            self.complete(entry)
+        return discarded
+
+    def overlay(self, questions: Iterable[Question]):
+        """Apply the waiting edits to questions read from the server or the mirror
+
+        Args:
+            questions (Iterable[Question]): The questions, changed in place
+        """
+        if not self.entries:
+            return
+
+        byQuestion: Dict[int, List[PendingSave]] = {}
+        for entry in self.entries.values():
+            byQuestion.setdefault(entry.snapshot.questionId, []).append(entry)
+
+        for question in questions:
+            for entry in byQuestion.get(question.id, ()):
+                applyChanges(question, entry.snapshot.subQuestionId, entry.changes)
+
+    def close(self):
+        """Close the database"""
+        self.connection.close()
+
+    def _heads(self) -> List[PendingSave]:
+        """Get the oldest edit of every sub-question"""
+        heads: Dict[int, PendingSave] = {}
+        for entry in self.entries.values():
+            heads.setdefault(entry.snapshot.subQuestionId, entry)
+        return list(heads.values())
+
+    def _latest(self, subQuestionId: int) -> Optional[PendingSave]:
+        """Get the newest edit of a sub-question"""
+        for entry in reversed(self.entries.values()):
+            if entry.snapshot.subQuestionId == subQuestionId:
+                return entry
+        return None
@@ -0,0 +1,543 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from app.models.question_summary import QuestionSummary
+
+
+def sortKey(value):
+    """Get the key sorting a field value, ignoring the case of texts
+
+    Args:
+        value (object): The value of the field
+
+    Returns:
+        object: The key of the value
+    """
+    return value.lower() if isinstance(value, str) else value
+
+
+class QuestionSearchIndex:
+    """Trigram inverted index over the questions of the list window
+
+    Every question is indexed by the trigrams of its lowercased name, source and ID.
+    A query looks up the posting list of its rarest trigram and only verifies those
+    candidates, so it does not scan the whole list. Queries shorter than a trigram
+    scan the prebuilt lowercase texts once; their matches are then kept as posting
+    lists too, updated as questions are added and changed, for the most recent
+    ones. Indexing every character and pair upfront would triple the time to
+    index the list.
+
+    Searches return views, arrays of the slots of the matching questions in display
+    order, instead of lists of questions. The most recent views are cached per query
+    and sort order, so going back to an earlier search or sort does not evaluate it
+    again. They also serve as the history of the typed search: a query which
+    extends a cached one, like "alge" after "alg", only verifies the matches of
+    that query, and deleting characters finds the earlier query in the cache.
+
+    The index is safe to query from a worker thread while the GUI thread updates it.
+    A search takes what it scans under the lock and scans outside of it, so the
+    GUI thread never waits for a search; a view computed while the questions
+    changed is returned but not cached.
+    """
+
+    GRAM_SIZE = 3
+    FIELD_SEPARATOR = "\x00"
+    VIEW_CACHE_SIZE = 32
+    SHORT_POSTINGS_SIZE = 16
+    SCAN_CHUNK_SIZE = 4096
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        """Remove every question from the index"""
+        with self.lock:
+            self.questions: List[QuestionSummary] = []
+            self.texts: List[str] = []
+            self.slots: Dict[int, int] = {}
+            self.postings: Dict[str, array] = {}
+            self.shortPostings: "OrderedDict[str, array]" = OrderedDict()
+            self.audited: Set[int] = set()
+            self.deleted: Set[int] = set()
+            self.views: "OrderedDict[tuple, array]" = OrderedDict()
+            self.orders: Dict[str, array] = {}
+            self.ranks: Dict[str, array] = {}
+            self.version += 1
+
+    def __len__(self):
+        return len(self.questions)
+
+    def rebuild(self, questions: Iterable[QuestionSummary]):
+        """Replace the indexed questions
+
+        Args:
+            questions (Iterable[QuestionSummary]): The questions to index
+        """
+        with self.lock:
+            self.clear()
+            self.add(questions)
+
+    def add(self, questions: Iterable[QuestionSummary]) -> range:
+        """Append questions to the index
+
+        Args:
+            questions (Iterable[QuestionSummary]): The questions to append
+
+        Returns:
+            range: The slots of the appended questions
+        """
+        with self.lock:
+            self._invalidateViews()
+            first = len(self.questions)
+            for question in questions:
+                slot = len(self.questions)
+                self.questions.append(question)
+                self.texts.append("")
+                self.slots[question.id] = slot
+                self._indexSlot(slot, question)
+            return range(first, len(self.questions))
+
+    def update(self, question: QuestionSummary) -> Optional[int]:
+        """Re-index a question after it changed
+
+        Args:
+            question (QuestionSummary): The changed question
+
+        Returns:
+            Optional[int]: The slot of the question, or None if it is not indexed
+        """
+        with self.lock:
+            slot = self.slots.get(question.id)
+            if slot is None:
+                return None
+            self._invalidateViews()
+            self.questions[slot] = question
+            self._indexSlot(slot, question)
+            return slot
+
+    def search(
+        self,
+        text: str,
+        audited: Optional[bool] = None,
+        deleted: Optional[bool] = None,
+    ) -> List[QuestionSummary]:
+        """Find the questions matching a search text
+
+        A question matches if the text is contained in its name or source (ignoring
+        case) or in its ID, or if the text is part of "yes"/"no" for audited and
+        not audited questions.
+
+        Args:
+            text (str): The search text
+            audited (Optional[bool]): Only keep questions with this audited state
+            deleted (Optional[bool]): Only keep questions with this deleted state
+
+        Returns:
+            List[QuestionSummary]: The matching questions, in index order
+        """
+        slots = self.view(text, audited, deleted)
+        with self.lock:
+            return [self.questions[slot] for slot in slots]
+
+    def view(
+        self,
+        text: str,
+        audited: Optional[bool] = None,
+        deleted: Optional[bool] = None,
+        sortField: Optional[str] = None,
+        descending: bool = False,
+        isCancelled: Optional[Callable[[], bool]] = None,
+    ) -> Optional[array]:
+        """Get the slots of the questions matching a search, in display order
+
+        The view is shared with the cache and must not be modified while it is
+        cached. The cache is dropped whenever questions are added or changed.
+
+        Args:
+            text (str): The search text
+            audited (Optional[bool]): Only keep questions with this audited state
+            deleted (Optional[bool]): Only keep questions with this deleted state
+            sortField (Optional[str]): The field of the questions to sort by, None
+                to keep the index order
+            descending (bool): Whether to sort in descending order
+            isCancelled (Optional[Callable[[], bool]]): Checked while scanning, to
+                give up on a search which was superseded
+
+        Returns:
+            Optional[array]: The slots of the matching questions, or None if the
+                search was cancelled
+        """
+        key = (text, audited, deleted, sortField, descending)
+        with self.lock:
+            slots = self.views.get(key)
+            if slots is not None:
+                self.views.move_to_end(key)
+                return slots
+            version = self.version
+
+        if sortField is not None:
+            slots = self.view(text, audited, deleted, isCancelled=isCancelled)
+            if slots is None:
+                return None
+            slots = self.sortSlots(slots, sortField, descending)
+        elif audited is not None or deleted is not None:
+            slots = self.view(text, isCancelled=isCancelled)
+            if slots is None:
+                return None
+            with self.lock:
+                facets = [
+                    (set(facet), state)
+                    for facet, state in (
+                        (self.audited, audited),
+                        (self.deleted, deleted),
+                    )
+                    if state is not None
+                ]
+            for facet, state in facets:
+                slots = array("I", (s for s in slots if (s in facet) == state))
+        else:
+            slots = self.searchSlots(text, isCancelled)
+            if slots is None:
+                return None
+
+        with self.lock:
+            # A view of questions which changed meanwhile is not kept
+            if self.version == version:
+                self.views[key] = slots
+                if len(self.views) > self.VIEW_CACHE_SIZE:
+                    self.views.popitem(last=False)
+        return slots
+
+    def cachedView(
+        self, text: str, sortField: Optional[str] = None, descending: bool = False
+    ) -> Optional[array]:
+        """Get the slots of a search only if its view is cached
+
+        Args:
+            text (str): The search text
+            sortField (Optional[str]): The field of the questions to sort by, None
+                to keep the index order
+            descending (bool): Whether to sort in descending order
+
+        Returns:
+            Optional[array]: The cached slots of the matching questions, or None if
+                the view must be computed
+        """
+        key = (text, None, None, sortField, descending)
+        with self.lock:
+            slots = self.views.get(key)
+            if slots is not None:
+                self.views.move_to_end(key)
+            return slots
+
+    def searchSlots(
+        self, text: str, isCancelled: Optional[Callable[[], bool]] = None
+    ) -> Optional[array]:
+        """Find the slots of the questions matching a search text
+
+        A text which extends a cached query, like "alge" after "alg", only verifies
+        the matches of that query. A text shorter than a trigram is looked up in the
+        short postings, and added to them once it was scanned.
+
+        Args:
+            text (str): The search text
+            isCancelled (Optional[Callable[[], bool]]): Checked while scanning, to
+                give up on a search which was superseded
+
+        Returns:
+            Optional[array]: The sorted slots of the matching questions, or None if
+                the search was cancelled
+        """
+        with self.lock:
+            count = len(self.questions)
+            if not text:
+                return array("I", range(count))
+
+            needle = text.lower()
+            isShort = len(needle) < self.GRAM_SIZE
+            version = self.version
+            # Postings grow while questions are added, the scan reads a copy
+            exact = self.shortPostings.get(needle) if isShort else None
+            if exact is not None:
+                self.shortPostings.move_to_end(needle)
+                exact = array("I", exact)
+            else:
+                # The matches of an extended query are a superset of these, refining
+                # them keeps them sorted; only a cold query goes to the postings
+                candidates = self._refinedView(text)
+                if candidates is None and isShort:
+                    candidates = range(count)
+                elif candidates is None:
+                    candidates = array("I", self._candidates(needle))
+            # Appends leave the first texts in place, so the scan reads them without
+            # the lock; a text replaced meanwhile only keeps the view from the cache
+            texts = self.texts
+            audited = self.audited
+            # The audited slots are only iterated for "yes", under the lock
+            yesMatches = set(audited) if text in "yes" else ()
+
+        if exact is not None:
+            matches = exact
+        else:
+            matches = self._verify(candidates, needle, texts, isCancelled)
+            if matches is None:
+                return None
+            if isShort:
+                self._keepShortPosting(needle, matches, version)
+
+        # Like matches(), a question also matches if the text is part of its flag
+        if not (yesMatches or text in "no"):
+            return matches
+        matches = set(matches)
+
+        matches.update(yesMatches)
+        if text in "no":
+            matches.update(slot for slot in range(count) if slot not in audited)
+
+        return array("I", sorted(matches))
+
+    def matches(self, slot: int, text: str) -> bool:
+        """Check if an indexed question matches a search text
+
+        Args:
+            slot (int): The slot of the question
+            text (str): The search text
+
+        Returns:
+            bool: True if the question matches, False otherwise
+        """
+        with self.lock:
+            if not text or text.lower() in self.texts[slot]:
+                return True
+            isAudited = slot in self.audited
+            return text in ("yes" if isAudited else "no")
+
+    def _refinedView(self, text: str) -> Optional[array]:
+        """Find the fewest cached matches of a query a search text extends
+
+        Args:
+            text (str): The search text
+
+        Returns:
+            Optional[array]: The sorted slots matching the query, None if no cached
+                query is extended by the text
+        """
+        fewest = None
+        for key, slots in self.views.items():
+            query, audited, deleted, sortField, _ = key
+            if (
+                query
+                and query in text
+                and audited is None
+                and deleted is None
+                and sortField is None
+                and (fewest is None or len(slots) < len(fewest))
+            ):
+                fewest = slots
+        return fewest
+
+    def _verify(
+        self,
+        candidates: Sequence[int],
+        needle: str,
+        texts: List[str],
+        isCancelled: Optional[Callable[[], bool]],
+    ) -> Optional[array]:
+        """Keep the candidate slots whose text contains a needle
+
+        Candidates are verified in chunks, checking in between whether the search
+        was cancelled.
+
+        Args:
+            candidates (Sequence[int]): The slots to verify
+            needle (str): The lowercased search text
+            texts (List[str]): The lowercase texts of the questions
+            isCancelled (Optional[Callable[[], bool]]): Whether to give up
+
+        Returns:
+            Optional[array]: The matching slots in candidate order, or None if the
+                search was cancelled
+        """
+        matches = array("I")
+        for start in range(0, len(candidates), self.SCAN_CHUNK_SIZE):
+            if isCancelled is not None and isCancelled():
+                return None
+            matches.extend(
+                slot
+                for slot in candidates[start : start + self.SCAN_CHUNK_SIZE]
+                if needle in texts[slot]
+            )
+        return matches
+
+    def _keepShortPosting(self, needle: str, slots: array, version: int):
+        """Keep the scanned matches of a short needle as its posting list
+
+        Args:
+            needle (str): The lowercased search text, shorter than a trigram
+            slots (array): The sorted slots whose text contains the needle
+            version (int): The version of the index the slots were scanned at
+        """
+        with self.lock:
+            # Slots scanned while questions changed may be missing some of them
+            if self.version != version or needle in self.shortPostings:
+                return
+            self.shortPostings[needle] = array("I", slots)
+            if len(self.shortPostings) > self.SHORT_POSTINGS_SIZE:
+                self.shortPostings.popitem(last=False)
+
+    def sortSlots(self, slots: array, field: str, descending: bool) -> array:
+        """Sort slots by a field of their questions
+
+        The order of every question for the field is computed once and reused by
+        every view sorted by it until the questions change.
+
+        Args:
+            slots (array): The slots to sort
+            field (str): The field of the questions to sort by
+            descending (bool): Whether to sort in descending order
+
+        Returns:
+            array: The sorted slots
+        """
+        with self.lock:
+            order = self.orders.get(field)
+            ranks = self.ranks.get(field)
+            if order is None:
+                version = self.version
+                questions = self.questions[:]
+
+        if order is None:
+            keys = [sortKey(getattr(question, field)) for question in questions]
+            order = array("I", sorted(range(len(keys)), key=keys.__getitem__))
+            # Equal keys share a rank, so they keep the index order either way
+            ranks = array("I", [0]) * len(order)
+            rank = 0
+            for position, slot in enumerate(order):
+                if keys[slot] != keys[order[rank]]:
+                    rank = position
+                ranks[slot] = rank
+
+            with self.lock:
+                if self.version == version:
+                    self.orders[field] = order
+                    self.ranks[field] = ranks
+
+        # Slots of an index which was cleared meanwhile, their search is dropped
+        if slots and max(slots) >= len(ranks):
+            return slots
+
+        # An ascending view of every question is the order itself
+        if len(slots) == len(order) and not descending:
+            return order
+        return array("I", sorted(slots, key=ranks.__getitem__, reverse=descending))
+
+    def _invalidateViews(self):
+        """Drop the cached views and orders once the questions change"""
+        self.version += 1
+        self.views.clear()
+        self.orders.clear()
+        self.ranks.clear()
+
+    def _candidates(self, needle: str) -> Iterable[int]:
+        """Get the slots that may contain a needle
+
+        Args:
+            needle (str): The lowercased search text
+
+        Returns:
+            Iterable[int]: The slots listed under the rarest trigram of the needle
+        """
+        rarest = None
+        for gram in self._grams(needle):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return ()
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+        return rarest
+
+    def _indexSlot(self, slot: int, question: QuestionSummary):
+        """Index the texts and facets of a question
+
+        Args:
+            slot (int): The slot of the question
+            question (QuestionSummary): The question to index
+        """
+        sep = self.FIELD_SEPARATOR
+        text = (
+            f"{question.name.lower()}{sep}{question.source.lower()}{sep}{question.id}"
+        )
+        previous = self.texts[slot]
+        self.texts[slot] = text
+
+        if not previous:
+            # A new question has the last slot, it goes to the end of every posting
+            for gram in self._grams(text):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                posting.append(slot)
+            for needle, posting in self.shortPostings.items():
+                if needle in text:
+                    posting.append(slot)
+        elif text != previous:
+            # Only the grams which changed are moved, keeping the postings sorted
+            grams = self._grams(text)
+            previousGrams = self._grams(previous)
+            for gram in previousGrams - grams:
+                self._removePosting(self.postings[gram], slot)
+            for gram in grams - previousGrams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                self._insertPosting(posting, slot)
+            for needle, posting in self.shortPostings.items():
+                if needle in previous and needle not in text:
+                    self._removePosting(posting, slot)
+                elif needle in text and needle not in previous:
+                    self._insertPosting(posting, slot)
+
+        if question.is_audited:
+            self.audited.add(slot)
+        else:
+            self.audited.discard(slot)
+
+        if question.is_deleted:
+            self.deleted.add(slot)
+        else:
+            self.deleted.discard(slot)
+
+    def _insertPosting(self, posting: array, slot: int):
+        """Insert a slot into a sorted posting list
+
+        Args:
+            posting (array): The posting list
+            slot (int): The slot to insert
+        """
+        posting.insert(bisect_left(posting, slot), slot)
+
+    def _removePosting(self, posting: array, slot: int):
+        """Remove a slot from a sorted posting list
+
+        Args:
+            posting (array): The posting list
+            slot (int): The slot to remove
+        """
+        del posting[bisect_left(posting, slot)]
+
+    def _grams(self, text: str) -> Set[str]:
+        """Split a text into its distinct trigrams
+
+        Args:
+            text (str): The text to split
+
+        Returns:
+            Set[str]: The trigrams of the text
+        """
+        size = self.GRAM_SIZE
+        return {text[i : i + size] for i in range(len(text) - size + 1)}
@@ -0,0 +1,169 @@
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+from nanoko.models.question import ConceptType, ProcessType, Question, SubQuestion
+
+
+@dataclass(frozen=True)
+class SubQuestionSnapshot:
+    """Immutable copy of a sub-question as it was loaded into the edit window
+
+    Saving diffs the form against the snapshot, so only the changed fields are sent
+    and the server does not have to be read again before a save.
+    """
+
+    questionId: int
+    subQuestionId: int
+    questionName: str
+    description: str
+    answer: str
+    concept: ConceptType
+    process: ProcessType
+    keywords: Tuple[str, ...]
+    options: Tuple[str, ...]
+    imageId: Optional[int]
+    imageDescription: Optional[str] = None
+
+    @classmethod
+    def capture(
+        cls,
+        question: Question,
+        subQuestion: SubQuestion,
+        imageDescription: Optional[str] = None,
+    ) -> "SubQuestionSnapshot":
+        """Take a snapshot of a sub-question
+
+        Args:
+            question (Question): The question of the sub-question
+            subQuestion (SubQuestion): The sub-question
+            imageDescription (Optional[str]): The description of the image of the
+                sub-question, if it is known
+
+        Returns:
+            SubQuestionSnapshot: The snapshot of the sub-question
+        """
+        return cls(
+            questionId=question.id,
+            subQuestionId=subQuestion.id,
+            questionName=question.name,
+            description=subQuestion.description,
+            answer=subQuestion.answer,
+            concept=subQuestion.concept,
+            process=subQuestion.process,
+            keywords=tuple(subQuestion.keywords or ()),
+            options=tuple(subQuestion.options or ()),
+            imageId=subQuestion.image_id,
+            imageDescription=imageDescription,
+        )
+
+    @classmethod
+    def fromDict(cls, data: dict) -> "SubQuestionSnapshot":
+        """Restore a snapshot from its plain representation
+
+        Args:
+            data (dict): The snapshot as returned by ``toDict``
+
+        Returns:
+            SubQuestionSnapshot: The snapshot
+        """
+        return cls(
+            **{
+                **data,
+                "concept": ConceptType(data["concept"]),
+                "process": ProcessType(data["process"]),
+                "keywords": tuple(data["keywords"]),
+                "options": tuple(data["options"]),
+            }
+        )
+
+    def toDict(self) -> dict:
+        """Get a plain representation of the snapshot, which can be stored as JSON
+
+        Returns:
+            dict: The fields of the snapshot, with enums replaced by their values
+        """
+        data = asdict(self)
+        data["concept"] = self.concept.value
+        data["process"] = self.process.value
+        return data
+
+    def withImage(
+        self, imageId: Optional[int], imageDescription: Optional[str] = None
+    ) -> "SubQuestionSnapshot":
+        """Copy the snapshot with another image
+
+        Args:
+            imageId (Optional[int]): The id of the image of the sub-question
+            imageDescription (Optional[str]): The description of the image, if known
+
+        Returns:
+            SubQuestionSnapshot: The snapshot with the image
+        """
+        return replace(self, imageId=imageId, imageDescription=imageDescription)
+
+    def diff(self, formData: dict) -> Dict[str, object]:
+        """Get the fields of the edit form that differ from the snapshot
+
+        Args:
+            formData (dict): The form data of the sub-question
+
+        Returns:
+            Dict[str, object]: The new values of the changed fields, keyed like the
+                form data
+        """
+        changes = {}
+
+        questionName = formData["question_name"]
+        if questionName.strip() and questionName.strip() != self.questionName.strip():
+            changes["question_name"] = questionName
+
+        if self.imageId is not None:
+            imageDescription = formData["image_description"]
+            if formData["image_id"] is None:
+                changes["image_id"] = None
+            elif (
+                self.imageDescription is not None
+                and imageDescription is not None
+                and imageDescription.strip() != self.imageDescription.strip()
+            ):
+                changes["image_description"] = imageDescription
+
+        for field in ("description", "answer"):
+            if formData[field].strip() != getattr(self, field).strip():
+                changes[field] = formData[field]
+
+        for field in ("concept", "process"):
+            if formData[field] != getattr(self, field):
+                changes[field] = formData[field]
+
+        for field in ("keywords", "options"):
+            if tuple(formData[field] or ()) != getattr(self, field):
+                changes[field] = formData[field]
+
+        return changes
+
+    def conflicts(
+        self, question: Question, subQuestion: SubQuestion, fields: Iterable[str]
+    ) -> List[str]:
+        """Find the fields that were changed on the server since the snapshot
+
+        Args:
+            question (Question): The current question on the server
+            subQuestion (SubQuestion): The current sub-question on the server
+            fields (Iterable[str]): The fields to check, keyed like the form data
+
+        Returns:
+            List[str]: The fields whose server value differs from the snapshot
+        """
+        current = SubQuestionSnapshot.capture(question, subQuestion)
+        attributes = {
+            "question_name": "questionName",
+            "image_id": "imageId",
+            "image_description": "imageId",
+        }
+
+        return [
+            field
+            for field in fields
+            if getattr(current, attributes.get(field, field))
+            != getattr(self, attributes.get(field, field))
+        ]
@@ -1,7 +1,6 @@
 import sys
-import keyring
 from PyQt6.QtGui import QColor, QIcon
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, QRunnable, QThreadPool, pyqtSignal
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout
 from qfluentwidgets import (
     InfoBar,
@@ -27,11 +26,28 @@ else:
     from qframelesswindow import FramelessWindow as Window
 
 
+class KeyringTask(QRunnable):
+    """Runs a call to the keyring off the GUI thread
+
+    Keyring backends may be slow to load and may block on the system keychain.
+    """
+
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+
+    def run(self):
+        self.function(*self.args)
+
+
 class LoginWindow(Window):
     """Login window for the application"""
 
     loginSucceeded = pyqtSignal()
     loginRequested = pyqtSignal(str, str)  # username, password
+    credentialsLoaded = pyqtSignal(str, str)  # username, password
+    credentialsSaveFailed = pyqtSignal()
 
     KEYRING_SERVICE = "nanoko-audition"
     KEYRING_USERNAME_KEY = "remembered_username"
@@ -41,7 +57,13 @@ class LoginWindow(Window):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
         self._setupUi()
-        self._loadSavedCredentials()
+
+        # One thread, so the keyring calls run in the order they were made
+        self.keyringPool = QThreadPool(self)
+        self.keyringPool.setMaxThreadCount(1)
+        self.credentialsLoaded.connect(self._onCredentialsLoaded)
+        self.credentialsSaveFailed.connect(self._onCredentialsSaveFailed)
+        self.keyringPool.start(KeyringTask(self._loadSavedCredentials))
 
         setThemeColor("#000000")
 
@@ -139,8 +161,10 @@ class LoginWindow(Window):
         self.stateTooltip = None
 
     def _loadSavedCredentials(self):
-        """Load saved credentials if they exist"""
+        """Load saved credentials if they exist, on the keyring thread"""
         try:
+            import keyring
+
             remember_enabled = keyring.get_password(
                 self.KEYRING_SERVICE, self.KEYRING_REMEMBER_KEY
             )
@@ -153,20 +177,34 @@ class LoginWindow(Window):
                 )
 
                 if username and password:
-                    self.usernameEdit.setText(username)
-                    self.passwordEdit.setText(password)
-                    self.rememberCheckbox.setChecked(True)
+                    self.credentialsLoaded.emit(username, password)
         except Exception:
             pass
 
+    def _onCredentialsLoaded(self, username, password):
+        """Fill in the saved credentials, unless the user started typing
+
+        Args:
+            username (str): The saved username
+            password (str): The saved password
+        """
+        if self.usernameEdit.text() or self.passwordEdit.text():
+            return
+
+        self.usernameEdit.setText(username)
+        self.passwordEdit.setText(password)
+        self.rememberCheckbox.setChecked(True)
+
     def _saveCredentials(self, username, password):
-        """Save credentials to keyring
+        """Save credentials to keyring, on the keyring thread
 
         Args:
             username (str): The username to save
             password (str): The password to save
         """
         try:
+            import keyring
+
             keyring.set_password(
                 self.KEYRING_SERVICE, self.KEYRING_USERNAME_KEY, username
             )
@@ -177,17 +215,23 @@ class LoginWindow(Window):
                 self.KEYRING_SERVICE, self.KEYRING_REMEMBER_KEY, "true"
             )
         except Exception:
-            InfoBar.warning(
-                title="Warning",
-                content="Could not save credentials",
-                parent=self,
-                position=InfoBarPosition.TOP,
-                duration=3000,
-            )
+            self.credentialsSaveFailed.emit()
+
+    def _onCredentialsSaveFailed(self):
+        """Warn that the credentials could not be saved"""
+        InfoBar.warning(
+            title="Warning",
+            content="Could not save credentials",
+            parent=self,
+            position=InfoBarPosition.TOP,
+            duration=3000,
+        )
 
     def _clearSavedCredentials(self):
-        """Clear saved credentials from keyring"""
+        """Clear saved credentials from keyring, on the keyring thread"""
         try:
+            import keyring
+
             keyring.delete_password(self.KEYRING_SERVICE, self.KEYRING_USERNAME_KEY)
             keyring.delete_password(self.KEYRING_SERVICE, self.KEYRING_PASSWORD_KEY)
             keyring.delete_password(self.KEYRING_SERVICE, self.KEYRING_REMEMBER_KEY)
@@ -211,9 +255,10 @@ class LoginWindow(Window):
             return
 
         if rememberPassword:
-            self._saveCredentials(username, password)
+            task = KeyringTask(self._saveCredentials, username, password)
         else:
-            self._clearSavedCredentials()
+            task = KeyringTask(self._clearSavedCredentials)
+        self.keyringPool.start(task)
 
         self._setFormEnabled(False)
 
@@ -245,6 +290,16 @@ class LoginWindow(Window):
         )
         self._setFormEnabled(True)
 
+    def reset(self):
+        """Prepare the window for a new login after a logout"""
+        if self.stateTooltip:
+            self.stateTooltip.close()
+            self.stateTooltip = None
+
+        if not self.rememberCheckbox.isChecked():
+            self.passwordEdit.clear()
+        self._setFormEnabled(True)
+
     def _setFormEnabled(self, enabled):
         """Enable or disable form elements
 
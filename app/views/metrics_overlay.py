@@ -0,0 +1,93 @@
+from PyQt6.QtGui import QFont, QKeySequence, QShortcut
+from PyQt6.QtCore import Qt, QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QFrame, QLabel, QVBoxLayout, QWidget
+
+from app.metrics import metrics
+
+
+class MetricsOverlay(QFrame):
+    """Panel floating over a window with the latencies and request counts
+
+    Toggled with Ctrl+Shift+M. The metrics collection is held on while the panel is
+    shown, the panels of other windows keep their own hold.
+    """
+
+    REFRESH_INTERVAL_MS = 1000
+    MARGIN = 12
+    TOP_OFFSET = 40
+
+    def __init__(self, parent: QWidget):
+        super().__init__(parent)
+
+        self.setObjectName("metricsOverlay")
+        self.setStyleSheet("""
+            QFrame#metricsOverlay {
+                background: rgba(0, 0, 0, 190);
+                border-radius: 6px;
+            }
+            QLabel {
+                color: white;
+                background: transparent;
+            }
+        """)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+
+        self.label = QLabel(self)
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setPointSize(9)
+        self.label.setFont(font)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 8, 10, 8)
+        layout.addWidget(self.label)
+
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.setInterval(self.REFRESH_INTERVAL_MS)
+        self.refreshTimer.timeout.connect(self.refresh)
+
+        self.shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), parent)
+        self.shortcut.activated.connect(self.toggle)
+
+        parent.installEventFilter(self)
+        self.hide()
+
+    def toggle(self):
+        """Show or hide the panel"""
+        if self.isVisible():
+            self.refreshTimer.stop()
+            metrics.release()
+            self.hide()
+        else:
+            metrics.hold()
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.refreshTimer.start()
+
+    def refresh(self):
+        """Render the current metrics"""
+        lines = [f"{'span':<24}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}"]
+        for row in metrics.summary():
+            lines.append(
+                f"{row['name'][:24]:<24}{row['count']:>6}"
+                f"{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            )
+        for name, value in sorted(metrics.counterValues().items()):
+            lines.append(f"{name[:24]:<24}{value:>6}")
+        if len(lines) == 1:
+            lines.append("No samples yet")
+
+        self.label.setText("\n".join(lines))
+        self.adjustSize()
+        self._reposition()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Resize and self.isVisible():
+            self._reposition()
+        return super().eventFilter(watched, event)
+
+    def _reposition(self):
+        """Keep the panel in the top right corner of its window"""
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - self.MARGIN, self.TOP_OFFSET)
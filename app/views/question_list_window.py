@@ -1,18 +1,24 @@
 import sys
-from typing import List
+from array import array
+from typing import List, Optional
 from PyQt6.QtGui import QIcon, QColor
-from nanoko.models.question import Question
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTableWidgetItem
+from PyQt6.QtCore import (
+    Qt,
+    QTimer,
+    QRunnable,
+    QThreadPool,
+    QModelIndex,
+    pyqtSignal,
+)
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QHeaderView
 from qfluentwidgets import (
     InfoBar,
     BodyLabel,
+    TableView,
     PushButton,
-    FluentIcon,
-    TableWidget,
+    ProgressBar,
     isDarkTheme,
     StateToolTip,
-    IconInfoBadge,
     SubtitleLabel,
     SplitTitleBar,
     SearchLineEdit,
@@ -21,6 +27,12 @@ from qfluentwidgets import (
 )
 
 from app.utils import isWin11
+from app.metrics import metrics
+from app.views.metrics_overlay import MetricsOverlay
+from app.models.search_index import QuestionSearchIndex
+from app.models.question_summary import QuestionSummary
+from app.models.question_table_model import QuestionTableModel
+from app.views.question_table_delegate import StatusBadgeDelegate
 
 
 if isWin11():
@@ -29,25 +41,88 @@ else:
     from qframelesswindow import FramelessWindow as Window
 
 
+class SearchTask(QRunnable):
+    """Runs a search on the question index off the GUI thread"""
+
+    def __init__(
+        self,
+        window: "QuestionListWindow",
+        generation: int,
+        text: str,
+        sortField: Optional[str],
+        descending: bool,
+    ):
+        super().__init__()
+        self.window = window
+        self.generation = generation
+        self.text = text
+        self.sortField = sortField
+        self.descending = descending
+
+    def isCancelled(self) -> bool:
+        """Check if a later search superseded this one
+
+        Returns:
+            bool: True if the result would be dropped
+        """
+        return self.generation != self.window.searchGeneration
+
+    def run(self):
+        if self.isCancelled():
+            return
+
+        index = self.window.searchIndex
+        with metrics.span("search.query"):
+            # Questions appended from here on are matched when the result is shown
+            indexedCount = len(index)
+            rows = index.view(
+                self.text,
+                sortField=self.sortField,
+                descending=self.descending,
+                isCancelled=self.isCancelled,
+            )
+        if rows is None:
+            metrics.count("search.cancelled")
+            return
+        self.window.searchFinished.emit(self.generation, indexedCount, rows)
+
+
 class QuestionListWindow(Window):
     """Window to display a list of questions"""
 
     logoutRequested = pyqtSignal()
     editSubQuestionRequested = pyqtSignal(int, int)  # question_id, sub_question_index
     loadQuestionsRequested = pyqtSignal()  # Signal to request loading questions
+    bulkActionRequested = pyqtSignal(str, object)  # action, question_ids
+    bulkCancelRequested = pyqtSignal()
+    searchFinished = pyqtSignal(int, int, object)  # generation, indexed count, result
+    contentSearchRequested = pyqtSignal(int, str)  # generation, search text
+
+    SEARCH_DEBOUNCE_MS = 150
 
     def __init__(self, parent=None):
         super().__init__(parent=parent)
-        self.questions: List[Question] = []
-        self.filtered_questions: List[Question] = []
-
-        self.page_size = 20
-        self.current_page = 1
-        self.total_pages = 1
+        self.isLoadingQuestions = False
+
+        self.searchIndex = QuestionSearchIndex()
+        self.sortField: Optional[str] = None
+        self.sortDescending = False
+        self.searchGeneration = 0
+        # The rows matching the listed fields and the IDs of the questions whose
+        # sub-questions match, the content is searched by the controller
+        self.searchRows: Optional[array] = None
+        self.contentMatches: List[int] = []
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.searchTimer.timeout.connect(self._runSearch)
+        self.searchFinished.connect(self._onSearchFinished)
 
         self.stateTooltip = None
+        self.isRunningBulkAction = False
 
         self._setupUi()
+        self.metricsOverlay = MetricsOverlay(self)
 
         self.setWindowTitle("Audition Admin - Questions")
         self.setWindowIcon(QIcon("resources:icon.png"))
@@ -108,183 +183,391 @@ class QuestionListWindow(Window):
         self.questionListLayout.addLayout(self.headerLayout)
 
         # Question table
-        self.questionTable = TableWidget(self)
-        self.questionTable.setColumnCount(5)
-        self.questionTable.setHorizontalHeaderLabels(
-            ["ID", "Name", "Source", "Audited", "Deleted", "Sub-Questions"]
-        )
+        self.questionModel = QuestionTableModel(self)
+        self.questionTable = TableView(self)
+        self.questionTable.setModel(self.questionModel)
+        self.questionTable.setItemDelegate(StatusBadgeDelegate(self.questionTable))
         self.questionTable.horizontalHeader().setStretchLastSection(True)
-        self.questionTable.setEditTriggers(TableWidget.EditTrigger.NoEditTriggers)
-        self.questionTable.setSelectionBehavior(
-            TableWidget.SelectionBehavior.SelectRows
+        self.questionTable.verticalHeader().hide()
+        self.questionTable.verticalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Fixed
+        )
+        self.questionTable.verticalHeader().setDefaultSectionSize(40)
+        self.questionTable.setEditTriggers(TableView.EditTrigger.NoEditTriggers)
+        self.questionTable.setSelectionBehavior(TableView.SelectionBehavior.SelectRows)
+        self.questionTable.setSelectionMode(TableView.SelectionMode.ExtendedSelection)
+        self.questionTable.doubleClicked.connect(self._onQuestionDoubleClicked)
+        header = self.questionTable.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        header.sortIndicatorChanged.connect(self._onSortChanged)
+        self.questionTable.selectionModel().selectionChanged.connect(
+            self._updateBulkButtons
         )
-        self.questionTable.cellDoubleClicked.connect(self._onQuestionDoubleClicked)
 
         self.questionListLayout.addWidget(self.questionTable)
 
-        # Pagination controls
-        self.paginationLayout = QHBoxLayout()
+        # Footer controls
+        self.footerLayout = QHBoxLayout()
+
+        self.countLabel = BodyLabel("0 questions")
+        self.footerLayout.addWidget(self.countLabel)
 
-        # Page navigation
-        self.prevPageButton = PushButton("Previous")
-        self.prevPageButton.clicked.connect(self._onPrevPage)
-        self.paginationLayout.addWidget(self.prevPageButton)
+        self.footerLayout.addStretch()
 
-        self.pageLabel = BodyLabel("Page 1 of 1")
-        self.paginationLayout.addWidget(self.pageLabel)
+        # Bulk action progress
+        self.bulkProgressBar = ProgressBar(self)
+        self.bulkProgressBar.setFixedWidth(200)
+        self.bulkProgressBar.hide()
+        self.footerLayout.addWidget(self.bulkProgressBar)
 
-        self.nextPageButton = PushButton("Next")
-        self.nextPageButton.clicked.connect(self._onNextPage)
-        self.paginationLayout.addWidget(self.nextPageButton)
+        self.cancelBulkButton = PushButton("Cancel")
+        self.cancelBulkButton.clicked.connect(self._onCancelBulkClicked)
+        self.cancelBulkButton.hide()
+        self.footerLayout.addWidget(self.cancelBulkButton)
 
-        self.paginationLayout.addStretch()
+        # Bulk action buttons
+        self.approveSelectedButton = PushButton("Approve Selected")
+        self.approveSelectedButton.clicked.connect(self._onApproveSelectedClicked)
+        self.approveSelectedButton.setEnabled(False)
+        self.footerLayout.addWidget(self.approveSelectedButton)
+
+        self.deleteSelectedButton = PushButton("Delete Selected")
+        self.deleteSelectedButton.clicked.connect(self._onDeleteSelectedClicked)
+        self.deleteSelectedButton.setEnabled(False)
+        self.footerLayout.addWidget(self.deleteSelectedButton)
 
         # Refresh button
         self.refreshButton = PrimaryPushButton("Refresh")
         self.refreshButton.clicked.connect(self._onRefreshClicked)
-        self.paginationLayout.addWidget(self.refreshButton)
+        self.footerLayout.addWidget(self.refreshButton)
 
-        self.questionListLayout.addLayout(self.paginationLayout)
+        self.questionListLayout.addLayout(self.footerLayout)
         self.contentLayout.addWidget(self.questionListPage)
         self.mainLayout.addWidget(self.contentWidget)
 
-    def _updatePaginationControls(self):
-        """Update pagination controls state"""
-        self.prevPageButton.setEnabled(self.current_page > 1)
-        self.nextPageButton.setEnabled(self.current_page < self.total_pages)
-        self.pageLabel.setText(f"Page {self.current_page} of {self.total_pages}")
-
-    def _onPrevPage(self):
-        """Handle previous page button click"""
-        if self.current_page > 1:
-            self.current_page -= 1
-            self._updatePaginationControls()
-            self._displayCurrentPage()
-
-    def _onNextPage(self):
-        """Handle next page button click"""
-        if self.current_page < self.total_pages:
-            self.current_page += 1
-            self._updatePaginationControls()
-            self._displayCurrentPage()
-
-    def _updatePagination(self):
-        """Update pagination state"""
-        self.total_pages = max(
-            1, (len(self.filtered_questions) + self.page_size - 1) // self.page_size
-        )
-        self.current_page = min(self.current_page, self.total_pages)
-        self._updatePaginationControls()
-
-    def _displayCurrentPage(self):
-        """Display current page of questions"""
-        self.questionTable.setRowCount(0)
-
-        start_idx = (self.current_page - 1) * self.page_size
-        end_idx = min(start_idx + self.page_size, len(self.filtered_questions))
-
-        for question in self.filtered_questions[start_idx:end_idx]:
-            row = self.questionTable.rowCount()
-            self.questionTable.insertRow(row)
-
-            # ID
-            idItem = QTableWidgetItem(str(question.id))
-            self.questionTable.setItem(row, 0, idItem)
-
-            # Name
-            nameItem = QTableWidgetItem(question.name)
-            self.questionTable.setItem(row, 1, nameItem)
-
-            # Source
-            sourceItem = QTableWidgetItem(question.source)
-            self.questionTable.setItem(row, 2, sourceItem)
-
-            # Audited
-            statusItem = QTableWidgetItem()
-            statusWidget = QWidget()
-            statusLayout = QHBoxLayout(statusWidget)
-            statusLayout.setContentsMargins(0, 0, 0, 0)
-            statusLayout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-            statusIcon = (
-                IconInfoBadge.success(FluentIcon.ACCEPT_MEDIUM)
-                if question.is_audited
-                else IconInfoBadge.error(FluentIcon.CANCEL_MEDIUM)
-            )
-            statusIcon.setFixedSize(QSize(20, 20))
-            statusLayout.addWidget(statusIcon)
-
-            self.questionTable.setItem(row, 3, statusItem)
-            self.questionTable.setCellWidget(row, 3, statusWidget)
-
-            # Deleted
-            deletedItem = QTableWidgetItem()
-            deletedWidget = QWidget()
-            deletedLayout = QHBoxLayout(deletedWidget)
-            deletedLayout.setContentsMargins(0, 0, 0, 0)
-            deletedLayout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-            deletedIcon = (
-                IconInfoBadge.error(FluentIcon.DELETE)
-                if question.is_deleted
-                else IconInfoBadge.info(FluentIcon.ACCEPT_MEDIUM)
-            )
-            deletedIcon.setFixedSize(QSize(20, 20))
-            deletedLayout.addWidget(deletedIcon)
+    @property
+    def questions(self) -> List[QuestionSummary]:
+        """The loaded questions, in server order"""
+        return self.searchIndex.questions
+
+    def _updateCountLabel(self):
+        """Update the label showing the number of displayed questions"""
+        total = len(self.questions)
+        shown = self.questionModel.rowCount()
+        if shown == total:
+            text = f"{total} questions"
+        else:
+            text = f"{shown} of {total} questions"
 
-            self.questionTable.setItem(row, 4, deletedItem)
-            self.questionTable.setCellWidget(row, 4, deletedWidget)
+        if self.isLoadingQuestions:
+            text += " (loading...)"
+        self.countLabel.setText(text)
 
-            # Sub-question
-            subCount = len(question.sub_questions)
-            countItem = QTableWidgetItem(
-                f"{subCount} sub-questions" if subCount > 1 else "1 sub-question"
+    @metrics.timed("ui.list.display")
+    def _displayQuestions(self, rows: Optional[array] = None):
+        """Display a view of the questions in the table
+
+        Args:
+            rows (Optional[array]): The slots of the displayed questions in the
+                search index, in display order. Defaults to every question
+        """
+        if rows is None:
+            rows = self.searchIndex.view(
+                "", sortField=self.sortField, descending=self.sortDescending
             )
-            self.questionTable.setItem(row, 5, countItem)
+        self.questionModel.setQuestions(self.questions, rows)
+        self._updateCountLabel()
 
-    def populateQuestionTable(self, questions: List[Question]):
+    @metrics.timed("ui.list.populate")
+    def populateQuestionTable(self, questions: List[QuestionSummary]):
         """Populate the question table with data from API
 
         Args:
-            questions (List[Question]): The questions to populate the table with
+            questions (List[QuestionSummary]): The questions to populate the table with
+        """
+        self.searchIndex.rebuild(questions)
+        self._displayQuestions()
+        self.finishLoadingState()
+
+        if self.searchEdit.text():
+            self._runSearch()
+
+    def clear(self):
+        """Drop the displayed questions and the search, e.g. after a logout"""
+        self.searchTimer.stop()
+        self.searchGeneration += 1
+        self.searchRows = None
+        self.contentMatches = []
+        self.searchEdit.blockSignals(True)
+        self.searchEdit.clear()
+        self.searchEdit.blockSignals(False)
+
+        self.isLoadingQuestions = False
+        self.searchIndex.clear()
+        self.hideBulkProgress()
+        self._displayQuestions()
+        self.finishLoadingState()
+
+    @metrics.timed("ui.list.append")
+    def appendQuestions(self, questions: List[QuestionSummary], reset: bool = False):
+        """Append a chunk of questions while the list is still loading
+
+        Args:
+            questions (List[QuestionSummary]): The questions of the chunk
+            reset (bool): Whether to replace the questions currently displayed
         """
-        self.questions = questions
-        self.filtered_questions = questions
-        self._updatePagination()
-        self._displayCurrentPage()
+        self.isLoadingQuestions = True
+
+        if reset:
+            self.searchIndex.clear()
+            self.questionModel.setQuestions(self.questions)
+            self.finishLoadingState()
+
+        # Appended rows stay after the sorted ones until the list has loaded
+        text = self.searchEdit.text()
+        slots = self.searchIndex.add(questions)
+        self.questionModel.appendRows(
+            [slot for slot in slots if self.searchIndex.matches(slot, text)]
+        )
+        self._updateCountLabel()
+
+    def finishLoadingQuestions(self):
+        """Finish loading the questions chunk by chunk"""
+        self.isLoadingQuestions = False
+        self._updateCountLabel()
         self.finishLoadingState()
+        if self.sortField is not None:
+            self._runSearch()
+
+    def updateQuestion(self, question: QuestionSummary):
+        """Refresh a question after it changed
+
+        Args:
+            question (QuestionSummary): The changed question
+        """
+        self.updateQuestions([question])
+
+    @metrics.timed("ui.list.update")
+    def updateQuestions(self, questions: List[QuestionSummary]):
+        """Refresh questions in place after they changed
+
+        Args:
+            questions (List[QuestionSummary]): The changed questions
+        """
+        slots = [self.searchIndex.update(question) for question in questions]
+        self.questionModel.updateRows(slot for slot in slots if slot is not None)
+
+    def selectedQuestions(self) -> List[QuestionSummary]:
+        """Get the questions of the selected rows
+
+        Returns:
+            List[QuestionSummary]: The selected questions, in display order
+        """
+        rows = sorted(
+            index.row() for index in self.questionTable.selectionModel().selectedRows()
+        )
+        return [self.questionModel.questionAt(row) for row in rows]
+
+    def showBulkProgress(self, total: int):
+        """Show the progress of a bulk action
+
+        Args:
+            total (int): The number of questions of the bulk action
+        """
+        self.isRunningBulkAction = True
+        self.bulkProgressBar.setRange(0, total)
+        self.bulkProgressBar.setValue(0)
+        self.bulkProgressBar.show()
+        self.cancelBulkButton.setEnabled(True)
+        self.cancelBulkButton.show()
+        self._updateBulkButtons()
+
+    def updateBulkProgress(self, done: int):
+        """Update the progress of a bulk action
+
+        Args:
+            done (int): The number of processed questions
+        """
+        self.bulkProgressBar.setValue(done)
+
+    def hideBulkProgress(self):
+        """Hide the progress of a bulk action"""
+        self.isRunningBulkAction = False
+        self.bulkProgressBar.hide()
+        self.cancelBulkButton.hide()
+        self._updateBulkButtons()
+
+    def finishBulkAction(self, title: str, summary: dict):
+        """Hide the progress of a bulk action and report its outcome
+
+        Args:
+            title (str): The title of the report
+            summary (dict): The succeeded question IDs, the error message of every
+                failed question and whether the action was cancelled
+        """
+        self.hideBulkProgress()
+
+        succeeded = len(summary["succeeded"])
+        failed = summary["failed"]
+        content = f"{succeeded} succeeded"
+        if failed:
+            content += f", {len(failed)} failed"
+            content += "".join(
+                f"\n#{questionId}: {error}"
+                for questionId, error in list(failed.items())[:5]
+            )
+        if summary["cancelled"]:
+            content += " (cancelled)"
+
+        if failed:
+            InfoBar.warning(
+                title=title,
+                content=content,
+                parent=self,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+            )
+        else:
+            InfoBar.success(
+                title=title,
+                content=content,
+                parent=self,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+            )
+
+    def _updateBulkButtons(self):
+        """Enable the bulk action buttons when rows are selected and none is running"""
+        enabled = (
+            not self.isRunningBulkAction
+            and self.questionTable.selectionModel().hasSelection()
+        )
+        self.approveSelectedButton.setEnabled(enabled)
+        self.deleteSelectedButton.setEnabled(enabled)
 
     def _onSearchTextChanged(self, text):
-        """Filter questions based on search text
+        """Schedule filtering questions once typing pauses
 
         Args:
             text (str): The search text
         """
-        if not text:
-            self.filtered_questions = self.questions
-        else:
-            self.filtered_questions = [
-                q
-                for q in self.questions
-                if text.lower() in q.name.lower()
-                or text.lower() in q.source.lower()
-                or text in str(q.id)
-                or text in ("yes" if q.is_audited else "no")
-            ]
-
-        self.current_page = 1
-        self._updatePagination()
-        self._displayCurrentPage()
-
-    def _onQuestionDoubleClicked(self, row: int, column: int):
+        # A search still running for the previous text is given up
+        self.searchGeneration += 1
+        self.searchTimer.start()
+
+    def _runSearch(self):
+        """Filter questions based on the search text on a worker thread"""
+        self.searchTimer.stop()
+        self.searchGeneration += 1
+
+        self.searchRows = None
+        self.contentMatches = []
+        text = self.searchEdit.text()
+        if text:
+            self.contentSearchRequested.emit(self.searchGeneration, text)
+
+        # Only a cached view is shown right away, sorting runs off the GUI thread too
+        rows = self.searchIndex.cachedView(
+            text, sortField=self.sortField, descending=self.sortDescending
+        )
+        if rows is not None:
+            self._onSearchFinished(self.searchGeneration, len(self.questions), rows)
+            return
+
+        QThreadPool.globalInstance().start(
+            SearchTask(
+                self, self.searchGeneration, text, self.sortField, self.sortDescending
+            )
+        )
+
+    @metrics.timed("ui.list.searchResult")
+    def _onSearchFinished(self, generation: int, indexedCount: int, rows: array):
+        """Display the result of a search
+
+        Args:
+            generation (int): The generation of the search, stale results are dropped
+            indexedCount (int): The number of questions indexed when the search ran
+            rows (array): The slots of the matching questions, in display order
+        """
+        if generation != self.searchGeneration:
+            return
+
+        if indexedCount < len(self.questions):
+            # Questions appended while the search was running are matched here, the
+            # search may have seen some of them already
+            text = self.searchEdit.text()
+            rows = array("I", (slot for slot in rows if slot < indexedCount))
+            rows += array(
+                "I",
+                (
+                    slot
+                    for slot in range(indexedCount, len(self.questions))
+                    if self.searchIndex.matches(slot, text)
+                ),
+            )
+
+        self.searchRows = rows
+        self._displaySearchResult()
+        self.questionTable.scrollToTop()
+
+    def showContentMatches(self, generation: int, questionIds: List[int]):
+        """Add the questions whose sub-questions match the search to its result
+
+        Args:
+            generation (int): The generation of the search, stale results are dropped
+            questionIds (List[int]): The IDs of the matching questions, best first
+        """
+        if generation != self.searchGeneration or not questionIds:
+            return
+
+        self.contentMatches = questionIds
+        if self.searchRows is not None:
+            self._displaySearchResult()
+
+    def _displaySearchResult(self):
+        """Display the rows matching the listed fields, then the content matches"""
+        rows = self.searchRows
+        if self.contentMatches:
+            shown = set(rows)
+            slots = self.searchIndex.slots
+            matches = array(
+                "I",
+                (
+                    slots[questionId]
+                    for questionId in self.contentMatches
+                    if questionId in slots and slots[questionId] not in shown
+                ),
+            )
+            if matches and self.sortField is not None:
+                rows = self.searchIndex.sortSlots(
+                    rows + matches, self.sortField, self.sortDescending
+                )
+            else:
+                rows = rows + matches
+        self._displayQuestions(rows)
+
+    def _onSortChanged(self, column: int, order: Qt.SortOrder):
+        """Sort the displayed questions by a column
+
+        Args:
+            column (int): The sorted column
+            order (Qt.SortOrder): The sort order
+        """
+        if column < 0:
+            return
+        self.sortField = QuestionTableModel.SORT_FIELDS[column]
+        self.sortDescending = order == Qt.SortOrder.DescendingOrder
+        self._runSearch()
+
+    def _onQuestionDoubleClicked(self, index: QModelIndex):
         """Handle double click on question row"""
-        if row < len(self.filtered_questions):
-            question = self.filtered_questions[
-                (self.current_page - 1) * self.page_size + row
-            ]
+        question = self.questionModel.questionAt(index.row())
+        if question is not None:
             questionId = question.id
 
-            if question.sub_questions:
+            if question.sub_question_count:
                 self.editSubQuestionRequested.emit(questionId, 0)
 
     def showLoadingState(self):
@@ -333,6 +616,29 @@ class QuestionListWindow(Window):
         """Handle logout click"""
         self.logoutRequested.emit()
 
+    def _onApproveSelectedClicked(self):
+        """Handle approve selected button click"""
+        questionIds = [
+            question.id
+            for question in self.selectedQuestions()
+            if not question.is_audited
+        ]
+        self.bulkActionRequested.emit("approve", questionIds)
+
+    def _onDeleteSelectedClicked(self):
+        """Handle delete selected button click"""
+        questionIds = [
+            question.id
+            for question in self.selectedQuestions()
+            if not question.is_deleted
+        ]
+        self.bulkActionRequested.emit("delete", questionIds)
+
+    def _onCancelBulkClicked(self):
+        """Handle cancel bulk action button click"""
+        self.cancelBulkButton.setEnabled(False)
+        self.bulkCancelRequested.emit()
+
     def _onRefreshClicked(self):
         """Handle refresh button click"""
         self.loadQuestionsRequested.emit()
@@ -0,0 +1,74 @@
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QStyleOptionViewItem
+from PyQt6.QtCore import Qt, QRectF, QModelIndex
+from qfluentwidgets import (
+    Theme,
+    FluentIcon,
+    isDarkTheme,
+    TableItemDelegate,
+)
+
+from app.models.question_table_model import QuestionTableModel
+
+
+class StatusBadgeDelegate(TableItemDelegate):
+    """Table delegate painting the audited/deleted status badges of questions"""
+
+    BADGE_SIZE = 20
+    ICON_SIZE = 10
+
+    def paint(
+        self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex
+    ):
+        super().paint(painter, option, index)
+
+        if index.column() not in QuestionTableModel.STATUS_COLUMNS:
+            return
+
+        status = index.data(QuestionTableModel.StatusRole)
+        if status is None:
+            return
+
+        icon, color = self._badgeStyle(index.column(), status)
+
+        rect = option.rect
+        x = rect.x() + (rect.width() - self.BADGE_SIZE) / 2
+        y = rect.y() + (rect.height() - self.BADGE_SIZE) / 2
+        badgeRect = QRectF(x, y, self.BADGE_SIZE, self.BADGE_SIZE)
+
+        offset = (self.BADGE_SIZE - self.ICON_SIZE) / 2
+        iconRect = badgeRect.adjusted(offset, offset, -offset, -offset)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        painter.drawEllipse(badgeRect)
+        icon.render(painter, iconRect, Theme.DARK if not isDarkTheme() else Theme.LIGHT)
+        painter.restore()
+
+    def _badgeStyle(self, column: int, status: bool):
+        """Get the icon and background color of a badge
+
+        Args:
+            column (int): The status column of the badge
+            status (bool): The status of the question in this column
+
+        Returns:
+            Tuple[FluentIcon, QColor]: The icon and background color of the badge
+        """
+        isDark = isDarkTheme()
+        success = QColor(108, 203, 95) if isDark else QColor(15, 123, 15)
+        error = QColor(255, 153, 164) if isDark else QColor(196, 43, 28)
+        info = QColor(157, 157, 157) if isDark else QColor(138, 138, 138)
+
+        if column == QuestionTableModel.AUDITED_COLUMN:
+            return (
+                (FluentIcon.ACCEPT_MEDIUM, success)
+                if status
+                else (FluentIcon.CANCEL_MEDIUM, error)
+            )
+
+        return (
+            (FluentIcon.DELETE, error) if status else (FluentIcon.ACCEPT_MEDIUM, info)
+        )
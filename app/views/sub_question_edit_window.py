@@ -21,6 +21,7 @@ from qfluentwidgets import (
     FluentIcon,
     PushButton,
     ImageLabel,
+    CaptionLabel,
     isDarkTheme,
     StateToolTip,
     SplitTitleBar,
@@ -35,6 +36,9 @@ from qfluentwidgets import (
 
 
 from app.utils import isWin11
+from app.metrics import metrics
+from app.views.metrics_overlay import MetricsOverlay
+from app.models.sub_question_snapshot import SubQuestionSnapshot
 
 
 if isWin11():
@@ -62,9 +66,12 @@ class SubQuestionEditWindow(Window):
         self.subQuestionIndex = subQuestionIndex
         self.question = None
         self.subQuestion = None
+        self.snapshot = None
+        self.imageRemoved = False
         self.stateTooltip = None
 
         self._setupUi()
+        self.metricsOverlay = MetricsOverlay(self)
 
         setThemeColor("#000000")
 
@@ -313,6 +320,10 @@ class SubQuestionEditWindow(Window):
     def _setupFooter(self):
         self.footerLayout = QHBoxLayout()
 
+        # Edits waiting to be sent to the server
+        self.syncLabel = CaptionLabel("")
+        self.footerLayout.addWidget(self.syncLabel)
+
         # Push buttons to right
         self.footerLayout.addStretch(1)
 
@@ -328,6 +339,41 @@ class SubQuestionEditWindow(Window):
 
         self.mainLayout.addLayout(self.footerLayout)
 
+    def openQuestion(self, questionId, subQuestionIndex):
+        """Prepare the window to edit another question, reusing its widgets
+
+        The form is cleared until the question is set with ``setQuestionData``.
+
+        Args:
+            questionId (int): The ID of the question to edit
+            subQuestionIndex (int): The index of the sub-question to edit
+        """
+        if self.stateTooltip:
+            self.stateTooltip.close()
+            self.stateTooltip = None
+
+        self.questionId = questionId
+        self.subQuestionIndex = subQuestionIndex
+        self.question = None
+        self.subQuestion = None
+        self.snapshot = None
+        self.imageRemoved = False
+
+        for edit in (
+            self.nameEdit,
+            self.keywordsEdit,
+            self.descriptionEdit,
+            self.answerEdit,
+            self.optionsEdit,
+            self.imageDescription,
+        ):
+            edit.clear()
+        for label in (self.sourceLabel, self.questionIdLabel, self.idLabel):
+            label.setText("")
+        self.imagePreview.setPixmap(QPixmap())
+        self.titleLabel.setText("Edit Sub-Question")
+        self.scrollArea.verticalScrollBar().setValue(0)
+
     def showLoadingState(self):
         """Show loading state"""
         self._setFormEnabled(False)
@@ -360,26 +406,18 @@ class SubQuestionEditWindow(Window):
         except Exception:
             pass
 
-    def showSavingState(self):
-        """Show saving state"""
-        self._setFormEnabled(False)
-
-        self.stateTooltip = StateToolTip("Saving", "Please wait...", self)
-        self.stateTooltip.move(
-            self.width() // 2 - self.stateTooltip.width() // 2,
-            self.height() // 2 - self.stateTooltip.height() // 2,
-        )
-        self.stateTooltip.show()
-
     def onImageUploaded(self):
         """Handle successful image upload"""
         if self.subQuestion.image_id is not None:
+            self.snapshot = self.snapshot.withImage(self.subQuestion.image_id)
+            self.imageRemoved = False
             self.loadImageRequested.emit(self.subQuestion.image_id)
 
-            self.stateTooltip.setContent("Image uploaded successfully")
-            self.stateTooltip.setState(True)
+            if self.stateTooltip:
+                self.stateTooltip.setContent("Image uploaded successfully")
+                self.stateTooltip.setState(True)
 
-            QTimer.singleShot(3000, self._onStateTooltipDone)
+                QTimer.singleShot(3000, self._onStateTooltipDone)
 
     def onQuestionApproved(self):
         """Handle question approved completion"""
@@ -412,25 +450,49 @@ class SubQuestionEditWindow(Window):
             duration=3000,
         )
 
-    def onSaveSuccess(self, data):
+    def onSaveSuccess(self, result):
         """Handle successful save
 
+        Fields which fail to be sent later are reported by the controller.
+
         Args:
-            data (dict): Data of the saved sub-question
+            result (dict): Data of the saved sub-question and the saved fields
         """
+        data = result["data"]
+        saved = result["saved"]
+
+        if "question_name" in saved:
+            self.question.name = data["question_name"]
+
+        # Keep the stored question in sync with what was saved
+        fields = ("description", "answer", "concept", "process", "keywords", "options")
+        for field in fields:
+            if field in saved:
+                setattr(self.subQuestion, field, data[field])
+        if "image_id" in saved:
+            self.subQuestion.image_id = None
+            self.imageRemoved = False
+
+        imageDescription = self.snapshot.imageDescription
+        if "image_description" in saved:
+            imageDescription = data["image_description"]
+        self.snapshot = SubQuestionSnapshot.capture(
+            self.question, self.subQuestion, imageDescription
+        )
+
         if self.stateTooltip:
             self.stateTooltip.setContent("Saved successfully")
             self.stateTooltip.setState(True)
 
             QTimer.singleShot(3000, self._onStateTooltipDone)
 
-    def onSaveError(self, error):
-        """Handle save error
+    def setSyncStatus(self, text):
+        """Show the state of the edits waiting to be sent to the server
 
         Args:
-            error (str): Error message
+            text (str): The state, empty once every edit was sent
         """
-        self.showError("Save Failed", error)
+        self.syncLabel.setText(text)
 
     def _onStateTooltipDone(self):
         """Clean up state tooltip after completion"""
@@ -442,6 +504,7 @@ class SubQuestionEditWindow(Window):
                 pass
             self.stateTooltip = None
 
+    @metrics.timed("ui.edit.setQuestion")
     def setQuestionData(self, question: Question):
         """Set question data and update UI
 
@@ -464,21 +527,29 @@ class SubQuestionEditWindow(Window):
 
         self._setFormEnabled(True)
 
-    def setImage(self, image: bytes, description: str):
+    @metrics.timed("ui.edit.setImage")
+    def setImage(self, pixmap: QPixmap, description: str):
         """Set image to be displayed in the image preview
 
         Args:
-            image (bytes): Image data
+            pixmap (QPixmap): Decoded image, already scaled to the preview size
             description (str): Description of the image
         """
-        pixmap = QPixmap()
-        pixmap.loadFromData(image)
         self.imagePreview.setPixmap(pixmap)
         self.imageDescription.setPlainText(description)
         self.removeImageButton.setEnabled(True)
 
+        if self.snapshot is not None:
+            self.snapshot = self.snapshot.withImage(
+                self.subQuestion.image_id, description
+            )
+
+    @metrics.timed("ui.edit.populate")
     def _populateForm(self):
         """Populate form with sub-question data"""
+        self.snapshot = SubQuestionSnapshot.capture(self.question, self.subQuestion)
+        self.imageRemoved = False
+
         self.nameEdit.setText(self.question.name)
 
         self.sourceLabel.setText(self.question.source)
@@ -548,13 +619,11 @@ class SubQuestionEditWindow(Window):
             "keywords": keywords,
             "options": options,
             "image_id": (
-                self.subQuestion.image_id
-                if not self.imagePreview.pixmap().isNull()
-                else None
+                self.subQuestion.image_id if not self.imageRemoved else None
             ),  # If user removed the image, then image_id is None
             "image_description": (
                 self.imageDescription.toPlainText()
-                if not self.imagePreview.pixmap().isNull()
+                if self.subQuestion.image_id is not None and not self.imageRemoved
                 else None
             ),
         }
@@ -608,11 +677,6 @@ class SubQuestionEditWindow(Window):
         if self.subQuestionIndex > 0:
             self.subQuestionIndex -= 1
             self.subQuestion = self.question.sub_questions[self.subQuestionIndex]
-            if self.subQuestion.image_id is not None:
-                self.loadImageRequested.emit(self.subQuestion.image_id)
-            else:
-                self.imagePreview.setPixmap(QPixmap())
-                self.removeImageButton.setEnabled(False)
             self._populateForm()
 
     def _onNextSubQuestionClicked(self):
@@ -620,11 +684,6 @@ class SubQuestionEditWindow(Window):
         if self.subQuestionIndex < len(self.question.sub_questions) - 1:
             self.subQuestionIndex += 1
             self.subQuestion = self.question.sub_questions[self.subQuestionIndex]
-            if self.subQuestion.image_id is not None:
-                self.loadImageRequested.emit(self.subQuestion.image_id)
-            else:
-                self.imagePreview.setPixmap(QPixmap())
-                self.removeImageButton.setEnabled(False)
             self._populateForm()
 
     def _onUploadImageClicked(self):
@@ -656,6 +715,7 @@ class SubQuestionEditWindow(Window):
         """Handle remove image button click"""
         self.imagePreview.setPixmap(QPixmap())
         self.removeImageButton.setEnabled(False)
+        self.imageRemoved = True
 
     def _onQuestionApprovedClicked(self):
         """Handle question approved button click"""
@@ -668,5 +728,7 @@ class SubQuestionEditWindow(Window):
     def _onSaveClicked(self):
         """Handle save button click"""
         formData = self._getFormData()
+        formData["snapshot"] = self.snapshot
+        formData["changes"] = self.snapshot.diff(formData)
 
         self.saveRequested.emit(formData)
@@ -0,0 +1,215 @@
+"""
+Check the API error handling of the client against a faulty local stand-in server
+
+Runs API operations through the worker while the stand-in server injects server
+errors, dropped connections, stalled answers and a sustained outage of one endpoint,
+and checks that transient failures are retried away, requests which are not
+idempotent are never sent twice, an endpoint that keeps failing is short-circuited
+and recovers, and every failure is reported as a structured error. Exits with a
+non-zero status if a check fails.
+
+Usage:
+    python -m benchmarks.bench_faults [--operations 150] [--backend thread]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from nanoko import AsyncNanoko, Nanoko
+
+from app.metrics import metrics
+from app.models.image_cache import ImageCache
+from app.models.sub_question_snapshot import SubQuestionSnapshot
+from app.controllers.api_worker import ApiWorker
+from app.controllers.async_worker import AsyncApiWorker
+from app.controllers.executor import ApiJob
+from app.controllers.api_errors import ApiError, ErrorKind
+from app.controllers.retry_policy import RetryConfig, RetryPolicy
+from app.controllers.transport import (
+    TransportConfig,
+    createAsyncHttpClient,
+    createHttpClient,
+)
+from benchmarks.fake_server import FakeBank, FakeNanokoServer, FaultInjector
+
+
+RETRY_CONFIG = RetryConfig(
+    maxAttempts=5, baseDelay=0.01, maxDelay=0.1, failureThreshold=10, resetTimeout=0.5
+)
+TRANSPORT_CONFIG = TransportConfig(maxConnections=4, readTimeout=0.3)
+
+
+class Runner:
+    """Runs worker operations synchronously on either backend"""
+
+    def __init__(self, backend, baseUrl, imageDirectory):
+        self.backend = backend
+        self.policy = RetryPolicy(RETRY_CONFIG)
+        imageCache = ImageCache(imageDirectory)
+
+        if backend == "async":
+            self.loop = asyncio.new_event_loop()
+            client = AsyncNanoko(
+                base_url=baseUrl, client=createAsyncHttpClient(TRANSPORT_CONFIG)
+            )
+            self.worker = AsyncApiWorker(client, imageCache, retryPolicy=self.policy)
+        else:
+            client = Nanoko(base_url=baseUrl, client=createHttpClient(TRANSPORT_CONFIG))
+            self.worker = ApiWorker(client, imageCache, retryPolicy=self.policy)
+
+    def run(self, operation, **params):
+        """Run an operation
+
+        Args:
+            operation (str): The operation of the worker
+            **params: The parameters of the operation
+
+        Returns:
+            Tuple[bool, object]: Whether the operation succeeded, and its result or
+                its ApiError, like a job callback receives them
+        """
+        job = ApiJob(None, operation, params)
+        try:
+            if self.backend == "async":
+                result = self.loop.run_until_complete(self.worker.run(job))
+            else:
+                result = self.worker.run(job)
+        except Exception as e:
+            return False, ApiError.fromException(e, operation)
+        return True, result
+
+
+def mixedOperations(runner, count):
+    """Run a mix of reads, approvals and queued saves
+
+    Args:
+        runner (Runner): The runner
+        count (int): The number of operations
+
+    Returns:
+        Counter: The number of succeeded operations and of failures by error kind
+    """
+    outcomes = Counter()
+    for index in range(count):
+        questionId = index % 50 + 1
+        kind = index % 3
+
+        if kind == 0:
+            success, result = runner.run("load_question", questionId=questionId)
+        elif kind == 1:
+            success, result = runner.run("question_approved", questionId=questionId)
+        else:
+            success, question = runner.run("load_question", questionId=questionId)
+            if not success:
+                outcomes[question.kind.value] += 1
+                continue
+            snapshot = SubQuestionSnapshot.capture(question, question.sub_questions[0])
+            success, result = runner.run(
+                "flush_save",
+                snapshot=snapshot,
+                changes={"description": f"Edited {index}"},
+                verify=False,
+            )
+            # A queued edit reports its failures instead of raising them
+            if success and (result["retry"] or result["failed"] or result["conflict"]):
+                success, result = False, ApiError(result["error"] or "conflict")
+
+        outcomes["ok" if success else result.kind.value] += 1
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--operations", type=int, default=150)
+    parser.add_argument("--backend", choices=("thread", "async"), default="thread")
+    args = parser.parse_args()
+
+    dataDirectory = tempfile.mkdtemp(prefix="audition-faults-")
+    imagePath = os.path.join(dataDirectory, "upload.jpg")
+    with open(imagePath, "wb") as f:
+        f.write(b"\xff\xd8\xff" + os.urandom(2048))
+
+    bank = FakeBank(100)
+    server = FakeNanokoServer(bank).start()
+    runner = Runner(args.backend, server.baseUrl, os.path.join(dataDirectory, "cache"))
+    metrics.setEnabled(True)
+    assert runner.run("login", username="check", password="check")[0]
+
+    failures = []
+
+    def check(name, passed, details):
+        print(f"{'PASS' if passed else 'FAIL'}  {name:<40}{details}")
+        if not passed:
+            failures.append(name)
+
+    # Transient server errors and dropped connections are retried away
+    for name, faults in (
+        ("10% server errors", FaultInjector(0.1, seed=1)),
+        ("10% dropped connections", FaultInjector(0.1, resets=1.0, seed=2)),
+    ):
+        server.faults = faults
+        server.resetCounters()
+        metrics.reset()
+        start = time.perf_counter()
+        outcomes = mixedOperations(runner, args.operations)
+        elapsed = time.perf_counter() - start
+        check(
+            name,
+            outcomes["ok"] == args.operations,
+            f"{dict(outcomes)}, {server.faultCount} faults, "
+            f"{metrics.counterValues().get('api.retries', 0)} retries, "
+            f"{elapsed * 1000:.0f}ms",
+        )
+
+    # A stalled request which is not idempotent must not be sent twice
+    server.faults = FaultInjector(
+        1.0, stalls=1.0, stall=1.0, paths=["/api/v1/bank/image/add"]
+    )
+    server.resetCounters()
+    success, error = runner.run(
+        "upload_image", filePath=imagePath, imageId=-1, subQuestionId=1
+    )
+    sent = server.requestPaths.count("/api/v1/bank/image/add")
+    check(
+        "timed out image creation is not resent",
+        not success and error.kind == ErrorKind.TIMEOUT and sent == 1,
+        f"{'ok' if success else error.kind.value}, sent {sent} time(s)",
+    )
+
+    # An endpoint that keeps failing is short-circuited without affecting others
+    server.faults = FaultInjector(
+        1.0, statuses=[503], paths=["/api/v1/bank/question/approve"]
+    )
+    server.resetCounters()
+    kinds = Counter()
+    for questionId in range(1, 21):
+        success, error = runner.run("question_approved", questionId=questionId)
+        kinds["ok" if success else error.kind.value] += 1
+    sent = server.requestPaths.count("/api/v1/bank/question/approve")
+    otherOk, _ = runner.run("load_question", questionId=1)
+    check(
+        "outage opens the circuit",
+        sent == RETRY_CONFIG.failureThreshold
+        and kinds[ErrorKind.CIRCUIT_OPEN.value] > 0
+        and otherOk,
+        f"{dict(kinds)}, sent {sent} request(s), other endpoints "
+        f"{'up' if otherOk else 'down'}",
+    )
+
+    # Once the outage is over, a trial request closes the circuit again
+    server.faults = None
+    time.sleep(RETRY_CONFIG.resetTimeout)
+    success, _ = runner.run("question_approved", questionId=1)
+    state = runner.policy.breaker("approve_question").state
+    check("circuit closes after the outage", success and state == "closed", state)
+
+    server.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
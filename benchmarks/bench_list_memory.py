@@ -0,0 +1,169 @@
+"""
+Benchmark the memory held by the question list for large banks
+
+Loads a synthetic bank chunk by chunk, the way the list window receives it, and
+keeps it in the question store, the search index and the table model, either as
+full questions, which is what the list used to hold, or as question summaries.
+Every representation is measured in a fresh interpreter, reporting the resident
+memory the list adds.
+
+Usage:
+    python -m benchmarks.bench_list_memory [--questions 100000] [--sub-questions 3]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from typing import List
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPRESENTATIONS = ("full", "summary")
+CHUNK_SIZE = 1000
+
+
+def residentBytes():
+    """Get the resident memory of the process
+
+    Returns:
+        int: The resident set size in bytes
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def makeQuestionData(questionId, subQuestionCount):
+    """Create the JSON of a synthetic question, as the server sends it
+
+    Args:
+        questionId (int): The ID of the question
+        subQuestionCount (int): The number of sub-questions
+
+    Returns:
+        dict: The question
+    """
+    return {
+        "id": questionId,
+        "name": f"Question {questionId}",
+        "source": f"Paper {questionId % 40}",
+        "is_audited": questionId % 3 == 0,
+        "is_deleted": questionId % 11 == 0,
+        "sub_questions": [
+            {
+                "id": questionId * 10 + index,
+                "description": f"Work out part {index + 1} of question {questionId}, "
+                "showing every step of the working",
+                "answer": f"The answer to part {index + 1} is {questionId * index}",
+                "concept": (questionId + index) % 7,
+                "process": index % 3,
+                "keywords": ["fraction", "area"] if index % 2 else ["ratio"],
+                "options": None,
+                "image_id": questionId * 10 if index == 0 else None,
+            }
+            for index in range(subQuestionCount)
+        ],
+    }
+
+
+def measure(representation, questionCount, subQuestionCount):
+    """Load the list in this interpreter and measure it
+
+    Args:
+        representation (str): "full" or "summary"
+        questionCount (int): The number of questions of the bank
+        subQuestionCount (int): The number of sub-questions per question
+
+    Returns:
+        dict: The resident memory added by the list and the loading time
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from pydantic import TypeAdapter
+    from nanoko.models.question import Question
+
+    from app.models.question_store import QuestionStore
+    from app.models.search_index import QuestionSearchIndex
+    from app.models.question_summary import QuestionSummary
+    from app.models.question_table_model import QuestionTableModel
+
+    adapter = TypeAdapter(List[Question])
+    store = QuestionStore()
+    index = QuestionSearchIndex()
+    model = QuestionTableModel()
+    model.setQuestions(index.questions)
+    store.beginList()
+
+    before = residentBytes()
+    start = time.perf_counter()
+    for first in range(1, questionCount + 1, CHUNK_SIZE):
+        last = min(first + CHUNK_SIZE, questionCount + 1)
+        chunk = adapter.validate_python(
+            [makeQuestionData(i, subQuestionCount) for i in range(first, last)]
+        )
+        if representation == "summary":
+            chunk = [QuestionSummary.fromQuestion(question) for question in chunk]
+        else:
+            # The list used to keep every question it received in full
+            for question in chunk:
+                store.put(question)
+
+        store.extendList(chunk)
+        model.appendRows(index.add(chunk))
+    store.finishList()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "representation": representation,
+        "questions": questionCount,
+        "residentBytes": residentBytes() - before,
+        "peakResidentBytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "loadSeconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--sub-questions", type=int, default=3)
+    parser.add_argument("--representation", choices=REPRESENTATIONS)
+    args = parser.parse_args()
+
+    # Measure a single representation, in the interpreter started below
+    if args.representation:
+        result = measure(args.representation, args.questions, args.sub_questions)
+        print(json.dumps(result), flush=True)
+        return
+
+    print(f"{args.questions} questions, {args.sub_questions} sub-questions each")
+    print(f"{'representation':<16}{'resident':>12}{'peak':>12}{'load':>10}")
+    for representation in REPRESENTATIONS:
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_list_memory",
+                "--questions",
+                str(args.questions),
+                "--sub-questions",
+                str(args.sub_questions),
+                "--representation",
+                representation,
+            ],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        print(
+            f"{representation:<16}{result['residentBytes'] / 2**20:10.1f}MB"
+            f"{result['peakResidentBytes'] / 2**20:10.1f}MB"
+            f"{result['loadSeconds'] * 1000:8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
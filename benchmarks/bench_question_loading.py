@@ -0,0 +1,58 @@
+"""
+Benchmark loading the question bank from a local stand-in server
+
+Compares fetching the whole bank with a single get_questions() call against the
+chunked QuestionStreamLoader, reporting the time until the first chunk can be shown
+and the time until the whole bank has been received.
+
+Usage:
+    python -m benchmarks.bench_question_loading [--questions 1000 10000 50000]
+"""
+
+import time
+import argparse
+from nanoko import Nanoko
+
+from app.controllers.question_loader import QuestionStreamLoader
+from benchmarks.fake_server import FakeBank, FakeNanokoServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--questions", type=int, nargs="+", default=[1000, 10000, 50000]
+    )
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(
+        f"{'questions':>10}  {'full load':>10}  {'first chunk':>12}  {'streamed':>10}"
+    )
+    for count in args.questions:
+        server = FakeNanokoServer(FakeBank(count), latency=args.latency).start()
+        client = Nanoko(base_url=server.baseUrl)
+
+        start = time.perf_counter()
+        questions = client.bank.get_questions()
+        fullLoad = time.perf_counter() - start
+        assert len(questions) == count
+
+        start = time.perf_counter()
+        firstChunk = None
+        received = 0
+        for chunk in QuestionStreamLoader(client).iterChunks():
+            if firstChunk is None:
+                firstChunk = time.perf_counter() - start
+            received += len(chunk)
+        streamed = time.perf_counter() - start
+        assert received == count
+
+        print(
+            f"{count:>10}  {fullLoad * 1000:8.0f}ms  {firstChunk * 1000:10.0f}ms"
+            f"  {streamed * 1000:8.0f}ms"
+        )
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark the rendering time of the question table
+
+Compares filling a TableWidget with items and badge cell widgets, which is what the
+question list used to do, against the virtualized QuestionTableModel.
+
+Usage:
+    python -m benchmarks.bench_question_table [--rows 1000 10000 100000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtWidgets import QApplication, QWidget, QHBoxLayout, QTableWidgetItem
+from nanoko.models.question import Question, SubQuestion, ConceptType, ProcessType
+from qfluentwidgets import TableView, TableWidget, FluentIcon, IconInfoBadge
+
+from app.models.question_summary import QuestionSummary
+from app.models.question_table_model import QuestionTableModel
+from app.views.question_table_delegate import StatusBadgeDelegate
+
+
+LEGACY_MAX_ROWS = 1000
+
+
+def makeQuestions(count):
+    """Create synthetic questions
+
+    Args:
+        count (int): The number of questions to create
+
+    Returns:
+        List[Question]: The created questions
+    """
+    subQuestion = SubQuestion(
+        id=1,
+        description="Description",
+        answer="Answer",
+        concept=ConceptType.MEASUREMENT,
+        process=ProcessType.APPLY,
+    )
+    return [
+        Question(
+            id=i,
+            name=f"Question {i}",
+            source=f"Source {i % 50}",
+            is_audited=i % 2 == 0,
+            is_deleted=i % 7 == 0,
+            sub_questions=[subQuestion],
+        )
+        for i in range(count)
+    ]
+
+
+def badgeWidget(badge):
+    """Wrap a badge in a centered cell widget, as the legacy table did"""
+    widget = QWidget()
+    layout = QHBoxLayout(widget)
+    layout.setContentsMargins(0, 0, 0, 0)
+    layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+    badge.setFixedSize(QSize(20, 20))
+    layout.addWidget(badge)
+    return widget
+
+
+def renderLegacy(app, questions):
+    """Fill a TableWidget row by row and paint it once"""
+    table = TableWidget()
+    table.setColumnCount(6)
+    table.resize(900, 600)
+    table.show()
+
+    start = time.perf_counter()
+    for question in questions:
+        row = table.rowCount()
+        table.insertRow(row)
+        table.setItem(row, 0, QTableWidgetItem(str(question.id)))
+        table.setItem(row, 1, QTableWidgetItem(question.name))
+        table.setItem(row, 2, QTableWidgetItem(question.source))
+        table.setCellWidget(
+            row,
+            3,
+            badgeWidget(
+                IconInfoBadge.success(FluentIcon.ACCEPT_MEDIUM)
+                if question.is_audited
+                else IconInfoBadge.error(FluentIcon.CANCEL_MEDIUM)
+            ),
+        )
+        table.setCellWidget(
+            row,
+            4,
+            badgeWidget(
+                IconInfoBadge.error(FluentIcon.DELETE)
+                if question.is_deleted
+                else IconInfoBadge.info(FluentIcon.ACCEPT_MEDIUM)
+            ),
+        )
+        table.setItem(row, 5, QTableWidgetItem("1 sub-question"))
+    table.viewport().repaint()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    table.deleteLater()
+    return elapsed
+
+
+def renderModel(app, questions):
+    """Set the questions on a QuestionTableModel and paint the view once"""
+    # The model lists summaries, as the list window keeps them
+    summaries = [QuestionSummary.fromQuestion(question) for question in questions]
+    model = QuestionTableModel()
+    table = TableView()
+    table.setModel(model)
+    table.setItemDelegate(StatusBadgeDelegate(table))
+    table.verticalHeader().setDefaultSectionSize(40)
+    table.resize(900, 600)
+    table.show()
+
+    start = time.perf_counter()
+    model.setQuestions(summaries)
+    table.viewport().repaint()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    table.deleteLater()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    print(f"{'rows':>8}  {'TableWidget':>12}  {'TableModel':>12}")
+    for count in args.rows:
+        questions = makeQuestions(count)
+
+        legacy = (
+            f"{renderLegacy(app, questions) * 1000:10.1f}ms"
+            if count <= LEGACY_MAX_ROWS
+            else f"{'skipped':>12}"
+        )
+        model = f"{renderModel(app, questions) * 1000:10.1f}ms"
+
+        print(f"{count:>8}  {legacy}  {model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+Benchmark the user-facing scenarios of the client against a local stand-in server
+
+Drives the controller and its windows headless through login, the first paint of
+the question list, search keystrokes, page flips, sub-question navigation, saving,
+image upload and going back and forth between the list and the editor, and reports the wall time, the number of requests and the peak
+memory of every scenario. Results can be appended to a JSON lines file to track
+regressions over time.
+
+Usage:
+    python -m benchmarks.bench_scenarios [--questions 1000 10000] [--latency 0.02]
+        [--image-size 1600x1200] [--backend thread] [--json results.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QColor, QImage, QPainter
+from PyQt6.QtCore import QBuffer, QCoreApplication, QEventLoop, QSettings
+
+from app.controllers.main_controller import MainController
+from benchmarks.fake_server import FakeBank, FakeNanokoServer
+
+
+SEARCH_TEXT = "question 12"
+PAGE_FLIPS = 50
+NAVIGATION_STEPS = 10
+ROUND_TRIPS = 10
+
+
+def makeImage(width, height, quality=85):
+    """Encode a synthetic picture the client can decode
+
+    Args:
+        width (int): The width of the picture
+        height (int): The height of the picture
+        quality (int): The JPEG quality
+
+    Returns:
+        bytes: The JPEG encoded picture
+    """
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(240, 244, 249))
+
+    painter = QPainter(image)
+    generator = random.Random(width * height)
+    for _ in range(200):
+        color = QColor(*(generator.randrange(256) for _ in range(3)))
+        painter.fillRect(
+            generator.randrange(width),
+            generator.randrange(height),
+            generator.randrange(1, width // 4),
+            generator.randrange(1, height // 4),
+            color,
+        )
+    painter.end()
+
+    buffer = QBuffer()
+    buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+    image.save(buffer, "JPG", quality)
+    return bytes(buffer.data())
+
+
+def resetPeakMemory():
+    """Reset the peak resident memory of the process, where the system allows it"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peakMemory():
+    """Get the peak resident memory of the process
+
+    Returns:
+        float: The peak resident memory in MB, 0 if it is not available
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def waitUntil(condition, timeout=120.0):
+    """Process events until a condition holds
+
+    Args:
+        condition (Callable[[], bool]): The condition to wait for
+        timeout (float): The maximum time to wait, in seconds
+
+    Raises:
+        TimeoutError: If the condition does not hold in time
+    """
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Scenario did not finish in time")
+        QCoreApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 10)
+        time.sleep(0.0005)
+
+
+def measure(server, scenario, run):
+    """Run a scenario and measure it
+
+    Args:
+        server (FakeNanokoServer): The server answering the client
+        scenario (str): The name of the scenario
+        run (Callable[[], None]): Performs the scenario and waits for it to finish
+
+    Returns:
+        dict: The wall time, requests and peak memory of the scenario
+    """
+    server.resetCounters()
+    resetPeakMemory()
+
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": scenario,
+        "ms": elapsed * 1000,
+        "requests": server.requestCount,
+        "peakMb": peakMemory(),
+    }
+
+
+def isShowing(window, questionId):
+    """Check if the edit window shows a question with its image loaded
+
+    Args:
+        window (SubQuestionEditWindow): The edit window
+        questionId (int): The ID of the question
+
+    Returns:
+        bool: True if the question and the image of its sub-question are shown
+    """
+    snapshot = window.snapshot
+    return (
+        window.question is not None
+        and window.question.id == questionId
+        and snapshot is not None
+        and (snapshot.imageId is None or snapshot.imageDescription is not None)
+    )
+
+
+def runScenarios(controller, server, count, imagePath):
+    """Drive the client through every scenario
+
+    Args:
+        controller (MainController): The controller of the client
+        server (FakeNanokoServer): The server answering the client
+        count (int): The number of questions in the bank
+        imagePath (str): The picture uploaded by the upload scenario
+
+    Returns:
+        List[dict]: The measurements of the scenarios
+    """
+    results = []
+
+    def login():
+        controller.performLogin("bench", "bench")
+        waitUntil(lambda: controller.questionListWindow is not None)
+
+    def firstPaint():
+        window = controller.questionListWindow
+        waitUntil(lambda: window.questionModel.rowCount() > 0)
+        window.questionTable.viewport().repaint()
+
+    def fullList():
+        window = controller.questionListWindow
+        waitUntil(
+            lambda: (
+                window.questionModel.rowCount() == count
+                and not window.isLoadingQuestions
+            )
+        )
+
+    results.append(measure(server, "login", login))
+    results.append(measure(server, "first list paint", firstPaint))
+    results.append(measure(server, "full list", fullList))
+
+    window = controller.questionListWindow
+    finished = []
+    window.searchFinished.connect(lambda generation, *_: finished.append(generation))
+
+    def search():
+        for end in range(1, len(SEARCH_TEXT) + 1):
+            window.searchEdit.setText(SEARCH_TEXT[:end])
+            QCoreApplication.processEvents()
+        waitUntil(
+            lambda: (
+                not window.searchTimer.isActive()
+                and finished
+                and finished[-1] == window.searchGeneration
+            )
+        )
+        window.questionTable.viewport().repaint()
+
+    results.append(measure(server, "search keystrokes", search))
+    window.searchEdit.setText("")
+    waitUntil(lambda: window.questionModel.rowCount() == count)
+
+    def pageFlips():
+        scrollBar = window.questionTable.verticalScrollBar()
+        for _ in range(PAGE_FLIPS):
+            scrollBar.setValue(scrollBar.value() + scrollBar.pageStep())
+            window.questionTable.viewport().repaint()
+
+    results.append(measure(server, f"{PAGE_FLIPS} page flips", pageFlips))
+
+    def navigation():
+        controller.showSubQuestionEditWindow(1, 0)
+        editWindow = controller.subQuestionEditWindow
+        waitUntil(lambda: isShowing(editWindow, 1))
+
+        for step in range(NAVIGATION_STEPS):
+            while editWindow.nextSubQuestionButton.isEnabled():
+                editWindow._onNextSubQuestionClicked()
+            editWindow._onNextQuestionClicked()
+            waitUntil(lambda step=step: isShowing(editWindow, step + 2))
+
+    results.append(
+        measure(server, f"{NAVIGATION_STEPS} question navigation", navigation)
+    )
+    editWindow = controller.subQuestionEditWindow
+
+    def save():
+        text = f"Edited at {time.time()}"
+        editWindow.descriptionEdit.setPlainText(text)
+        editWindow.answerEdit.setPlainText(text)
+        editWindow._onSaveClicked()
+        waitUntil(lambda: editWindow.snapshot.description == text)
+
+    results.append(measure(server, "save", save))
+    # Saves are sent in the background, time how long they take to reach the server
+    results.append(
+        measure(
+            server,
+            "save sync",
+            lambda: waitUntil(lambda: len(controller.saveQueue) == 0),
+        )
+    )
+
+    def upload():
+        subQuestion = editWindow.subQuestion
+        editWindow.uploadImageRequested.emit(
+            imagePath,
+            subQuestion.image_id if subQuestion.image_id is not None else -1,
+            subQuestion.id,
+            "Uploaded by the benchmark",
+        )
+        waitUntil(
+            lambda: (
+                not any(
+                    job.operation in ("upload_image", "load_image")
+                    for job in controller.executor.pendingJobs()
+                )
+                and editWindow.snapshot.imageDescription is not None
+            )
+        )
+
+    results.append(measure(server, "image upload", upload))
+
+    def roundTrips():
+        for step in range(ROUND_TRIPS):
+            controller.showSubQuestionEditWindow(step + 1, 0)
+            waitUntil(
+                lambda step=step: isShowing(controller.subQuestionEditWindow, step + 1)
+            )
+            controller.showQuestionListWindow()
+            controller.questionListWindow.questionTable.viewport().repaint()
+
+    results.append(measure(server, f"{ROUND_TRIPS} editor round trips", roundTrips))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--image-size", default="1600x1200")
+    parser.add_argument("--backend", choices=MainController.API_BACKENDS)
+    parser.add_argument("--json", help="Append the results to this JSON lines file")
+    args = parser.parse_args()
+
+    # Keep the settings and caches of the benchmark apart from the real ones
+    dataDirectory = tempfile.mkdtemp(prefix="audition-bench-")
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(dataDirectory, "config")
+
+    app = QApplication(sys.argv)
+    app.setApplicationName("Audition Admin Benchmark")
+
+    width, height = (int(size) for size in args.image_size.split("x"))
+    image = makeImage(width, height)
+    imagePath = os.path.join(dataDirectory, "upload.jpg")
+    with open(imagePath, "wb") as f:
+        f.write(image)
+
+    print(
+        f"latency {args.latency * 1000:.0f}ms, image {args.image_size} "
+        f"({len(image) // 1024}KB), backend {args.backend or 'default'}"
+    )
+    print(
+        f"{'questions':>10}  {'scenario':<24}{'wall':>10}{'requests':>10}{'peak':>10}"
+    )
+
+    for count in args.questions:
+        # Every bank size starts with cold caches and an empty mirror
+        os.environ["XDG_CACHE_HOME"] = os.path.join(dataDirectory, f"cache-{count}")
+        os.environ["XDG_DATA_HOME"] = os.path.join(dataDirectory, f"data-{count}")
+
+        server = FakeNanokoServer(
+            FakeBank(count, imagePayload=image), latency=args.latency
+        ).start()
+
+        settings = QSettings()
+        settings.setValue("api/baseUrl", server.baseUrl)
+        if args.backend:
+            settings.setValue("api/backend", args.backend)
+        settings.sync()
+
+        controller = MainController()
+        controller.start()
+        try:
+            results = runScenarios(controller, server, count, imagePath)
+        finally:
+            for window in (
+                controller.loginWindow,
+                controller.questionListWindow,
+                controller.subQuestionEditWindow,
+            ):
+                if window is not None:
+                    window.close()
+            controller.shutdown()
+            server.stop()
+
+        for result in results:
+            print(
+                f"{count:>10}  {result['scenario']:<24}{result['ms']:8.0f}ms"
+                f"{result['requests']:>10}{result['peakMb']:8.0f}MB"
+            )
+
+        if args.json:
+            with open(args.json, "a", encoding="utf-8") as f:
+                for result in results:
+                    record = {
+                        "timestamp": time.time(),
+                        "questions": count,
+                        "latency": args.latency,
+                        "imageSize": args.image_size,
+                        "backend": controller.apiBackend,
+                        **result,
+                    }
+                    f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
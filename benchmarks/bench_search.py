@@ -0,0 +1,168 @@
+"""
+Benchmark searching the question list
+
+Compares the linear scan the list window used to run on every keystroke against
+QuestionSearchIndex for a few typical queries, evaluated and then read back from
+the view cache as when a search is typed again, measures sorting the views, and
+typing a search one character at a time and deleting it again, with and without
+refining the matches of the previous query.
+
+Queries shorter than a trigram are measured apart: the first one scans every
+question, a pair typed after its first character only verifies the matches of
+that character, and once scanned they are answered by their short posting list,
+even after the questions changed.
+
+Usage:
+    python -m benchmarks.bench_search [--questions 100000]
+"""
+
+import time
+import argparse
+
+from app.models.search_index import QuestionSearchIndex
+from app.models.question_summary import QuestionSummary
+from app.models.question_table_model import QuestionTableModel
+
+
+QUERIES = ["q", "pa", "paper 3", "question 12", "4711", "yes", "nothing matches"]
+TYPED = ["question 1234", "paper 17"]
+SHORT = ["q", "7", "17", "er", "n"]
+
+
+def linearSearch(questions, text):
+    """The search the list window used to run on the GUI thread"""
+    return [
+        q
+        for q in questions
+        if text.lower() in q.name.lower()
+        or text.lower() in q.source.lower()
+        or text in str(q.id)
+        or text in ("yes" if q.is_audited else "no")
+    ]
+
+
+def typeAndDelete(index, word, refine):
+    """Search every prefix of a word as it is typed, then as it is deleted
+
+    Args:
+        index (QuestionSearchIndex): The index to search
+        word (str): The typed word
+        refine (bool): Whether to keep the previous views and short postings,
+            otherwise every search is evaluated from scratch
+
+    Returns:
+        Tuple[float, float]: The seconds spent typing and deleting the word
+    """
+    prefixes = [word[:length] for length in range(1, len(word) + 1)]
+    index.views.clear()
+    index.shortPostings.clear()
+
+    times = []
+    for queries in (prefixes, prefixes[-2::-1]):
+        start = time.perf_counter()
+        for query in queries:
+            if not refine:
+                index.views.clear()
+                index.shortPostings.clear()
+            index.view(query)
+        times.append(time.perf_counter() - start)
+    return tuple(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=100000)
+    args = parser.parse_args()
+
+    questions = [
+        QuestionSummary(i, f"Question {i}", f"Paper {i % 40}", i % 3 == 0, False, i % 4)
+        for i in range(1, args.questions + 1)
+    ]
+
+    index = QuestionSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(questions)
+    print(f"Indexed {len(questions)} questions in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':>16}  {'hits':>7}  {'linear':>9}  {'index':>9}  {'cached':>9}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        expected = linearSearch(questions, query)
+        linear = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = index.view(query)
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.view(query)
+        cached = time.perf_counter() - start
+
+        assert [questions[slot].id for slot in rows] == [q.id for q in expected], query
+        print(
+            f"{query!r:>16}  {len(rows):>7}  {linear * 1000:7.1f}ms"
+            f"  {indexed * 1000:7.1f}ms  {cached * 1000:7.3f}ms"
+        )
+
+    print(f"\n{'sort':>16}  {'first':>9}  {'other order':>11}  {'cached':>9}")
+    for field in QuestionTableModel.SORT_FIELDS:
+        start = time.perf_counter()
+        index.view("", sortField=field)
+        first = time.perf_counter() - start
+
+        # The ranks of the field are reused for the other order
+        start = time.perf_counter()
+        index.view("", sortField=field, descending=True)
+        other = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.view("", sortField=field)
+        cached = time.perf_counter() - start
+
+        print(
+            f"{field:>16}  {first * 1000:7.1f}ms  {other * 1000:9.1f}ms"
+            f"  {cached * 1000:7.3f}ms"
+        )
+
+    print(f"\n{'short':>16}  {'hits':>7}  {'scan':>9}  {'prefix':>9}  {'changed':>9}")
+    for query in SHORT:
+        index.views.clear()
+        index.shortPostings.clear()
+        start = time.perf_counter()
+        rows = index.view(query)
+        scanned = time.perf_counter() - start
+
+        # Typed after its first character, only the matches of that one are verified
+        prefix = None
+        if len(query) > 1:
+            index.views.clear()
+            index.shortPostings.clear()
+            index.view(query[0])
+            start = time.perf_counter()
+            index.view(query)
+            prefix = time.perf_counter() - start
+
+        # A changed question drops the views but keeps the short postings
+        index.update(questions[0])
+        start = time.perf_counter()
+        index.view(query)
+        changed = time.perf_counter() - start
+
+        prefixText = f"{prefix * 1000:7.1f}ms" if prefix is not None else f"{'-':>9}"
+        print(
+            f"{query!r:>16}  {len(rows):>7}  {scanned * 1000:7.1f}ms"
+            f"  {prefixText}  {changed * 1000:7.1f}ms"
+        )
+
+    print(f"\n{'typed':>16}  {'scratch':>17}  {'refined':>17}  (type / delete)")
+    for word in TYPED:
+        scratch = typeAndDelete(index, word, refine=False)
+        refined = typeAndDelete(index, word, refine=True)
+        print(
+            f"{word!r:>16}  {scratch[0] * 1000:7.1f}ms {scratch[1] * 1000:7.1f}ms"
+            f"  {refined[0] * 1000:7.1f}ms {refined[1] * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark the cold start of the client with ``python -X importtime``
+
+Starts the application headless in fresh interpreters and reports when the splash
+screen and the first frame of the login window are shown and when the API client
+is ready, together with the import time spent before the first frame and the
+slowest modules imported before it.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 10] [--json results.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_FRAME_MARKER = "bench_startup: first frame"
+
+# Runs the real entry point, recording when each stage is reached. Importing the
+# entry point itself must stay cheap, the rest is imported by ``main()``.
+PROBE = f"""
+import os, sys, json, time
+launchedAt = float(os.environ["BENCH_LAUNCHED_AT"])
+marks = {{}}
+
+def mark(name):
+    marks.setdefault(name, (time.time() - launchedAt) * 1000)
+
+from PyQt6.QtCore import QEvent, QEventLoop, QObject, QSettings
+from PyQt6.QtWidgets import QApplication, QSplashScreen, QWidget
+import main
+
+class FirstFrame(QObject):
+    def eventFilter(self, watched, event):
+        if (
+            "first frame" not in marks
+            and event.type() == QEvent.Type.Paint
+            and isinstance(watched, QWidget)
+            and watched.isWindow()
+            and not isinstance(watched, QSplashScreen)
+        ):
+            mark("first frame")
+            # A single write, the keyring thread may be importing at the same time
+            sys.stderr.write("\\n{FIRST_FRAME_MARKER}\\n")
+        return False
+
+firstFrame = FirstFrame()
+splashShow = QSplashScreen.show
+
+def showSplash(self):
+    splashShow(self)
+    mark("splash")
+    QSettings().setValue("metrics/enabled", True)
+    QApplication.instance().installEventFilter(firstFrame)
+
+def ready():
+    from app.metrics import metrics
+
+    return any(row["name"] == "startup.backend" for row in metrics.summary())
+
+def execute(*args):
+    while "first frame" not in marks or not ready():
+        QApplication.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 10)
+    mark("ready")
+    print(json.dumps(marks), flush=True)
+    return 0
+
+QSplashScreen.show = showSplash
+QApplication.exec = execute
+main.main()
+"""
+
+
+def parseImportTimes(stderr):
+    """Parse the import times printed by ``-X importtime``
+
+    Args:
+        stderr (str): The standard error of the interpreter
+
+    Returns:
+        Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]: The module names and
+            cumulative import times in microseconds of the top-level imports made
+            before and after the first frame
+    """
+    before, after = [], []
+    current = before
+    for line in stderr.splitlines():
+        if line.strip() == FIRST_FRAME_MARKER:
+            current = after
+            continue
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are included in the time of their importer
+        if not name.startswith("  "):
+            current.append((name.strip(), int(cumulative)))
+    return before, after
+
+
+def runOnce(dataDirectory):
+    """Start the application once in a fresh interpreter
+
+    Args:
+        dataDirectory (str): The directory for the settings and data of the run
+
+    Returns:
+        Tuple[dict, List, List]: The milliseconds from launch to every stage, and
+            the top-level imports before and after the first frame
+    """
+    environment = dict(os.environ)
+    environment.setdefault("QT_QPA_PLATFORM", "offscreen")
+    for name in ("XDG_CONFIG_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME"):
+        environment[name] = os.path.join(dataDirectory, name)
+    environment["BENCH_LAUNCHED_AT"] = repr(time.time())
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT,
+        env=environment,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{process.stderr[-2000:]}")
+
+    marks = json.loads(process.stdout.strip().splitlines()[-1])
+    return (marks, *parseImportTimes(process.stderr))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="Append the results to this JSON lines file")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        # Every run starts without settings, caches or a mirror
+        dataDirectory = tempfile.mkdtemp(prefix="audition-startup-")
+        runs.append(runOnce(dataDirectory))
+
+    stages = ("splash", "first frame", "ready")
+    print(f"{'stage':<14}{'median':>10}{'min':>10}{'max':>10}")
+    results = {}
+    for stage in stages:
+        values = [marks[stage] for marks, _, _ in runs]
+        results[stage] = statistics.median(values)
+        print(
+            f"{stage:<14}{results[stage]:8.0f}ms{min(values):8.0f}ms"
+            f"{max(values):8.0f}ms"
+        )
+
+    # Import times of the last run, the earlier ones warmed up the disk cache
+    _, before, after = runs[-1]
+    beforeMs = sum(cumulative for _, cumulative in before) / 1000
+    afterMs = sum(cumulative for _, cumulative in after) / 1000
+    print(f"\nimports before the first frame {beforeMs:.0f}ms, after {afterMs:.0f}ms")
+    for name, cumulative in sorted(before, key=lambda item: -item[1])[: args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    if args.json:
+        with open(args.json, "a") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "time": time.time(),
+                        "runs": args.runs,
+                        "stagesMs": results,
+                        "importsBeforeFirstFrameMs": beforeMs,
+                        "importsAfterFirstFrameMs": afterMs,
+                    }
+                )
+                + "\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
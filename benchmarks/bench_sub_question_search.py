@@ -0,0 +1,168 @@
+"""
+Benchmark searching the content of the sub-questions
+
+Mirrors a synthetic bank with a varied vocabulary, builds the full-text index of
+its sub-questions and compares a few typical queries, plain, by prefix and
+qualified by field, against a linear scan over the texts of the sub-questions.
+Also measures keeping the index up to date when a sub-question is saved.
+
+Usage:
+    python -m benchmarks.bench_sub_question_search [--sub-questions 100000]
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+from typing import List
+from pydantic import TypeAdapter
+from nanoko.models.question import Question
+
+from app.models.question_mirror import QuestionMirror
+
+
+SUB_QUESTIONS_PER_QUESTION = 3
+WORDS = (
+    "fraction ratio area perimeter angle triangle circle radius volume prism "
+    "probability dice coin mean median mode range graph gradient equation "
+    "inequality factor prime multiple percentage decimal speed distance time "
+    "money interest sequence pattern vector matrix symmetry reflection rotation "
+    "estimate round pounds metres litres grams chart table sample survey"
+).split()
+QUERIES = [
+    "417",
+    "417 metres",
+    "triangle",
+    "tri",
+    "circle radius",
+    "keyword:prob",
+    "concept:measure gradient",
+    "area keyword:fraction answer:metres",
+    "nothing",
+]
+
+
+def makeQuestionData(questionId, random):
+    """Create the JSON of a synthetic question with varied texts
+
+    Args:
+        questionId (int): The ID of the question
+        random (random.Random): The generator of the texts
+
+    Returns:
+        dict: The question
+    """
+
+    def sentence(length):
+        return " ".join(random.choice(WORDS) for _ in range(length))
+
+    return {
+        "id": questionId,
+        "name": f"Question {questionId}",
+        "source": f"Paper {questionId % 40}",
+        "is_audited": False,
+        "is_deleted": False,
+        "sub_questions": [
+            {
+                "id": questionId * 10 + index,
+                "description": f"Work out the {sentence(12)}",
+                "answer": f"{random.randint(1, 999)} {sentence(3)}",
+                "concept": random.randrange(7),
+                "process": random.randrange(3),
+                "keywords": random.sample(WORDS, 3),
+                "options": None,
+                "image_id": None,
+            }
+            for index in range(SUB_QUESTIONS_PER_QUESTION)
+        ],
+    }
+
+
+def linearSearch(questions: List[Question], text: str) -> List[int]:
+    """Scan the description, answer and keywords of every sub-question
+
+    Args:
+        questions (List[Question]): The questions to search
+        text (str): The words which must all be found
+
+    Returns:
+        List[int]: The IDs of the matching questions
+    """
+    words = text.lower().split()
+    matches = []
+    for question in questions:
+        for subQuestion in question.sub_questions:
+            content = " ".join(
+                [
+                    subQuestion.description,
+                    subQuestion.answer,
+                    *(subQuestion.keywords or []),
+                ]
+            ).lower()
+            if all(word in content for word in words):
+                matches.append(question.id)
+                break
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sub-questions", type=int, default=100000)
+    args = parser.parse_args()
+
+    generator = random.Random(42)
+    questionCount = args.sub_questions // SUB_QUESTIONS_PER_QUESTION
+    questions = TypeAdapter(List[Question]).validate_python(
+        [makeQuestionData(i, generator) for i in range(1, questionCount + 1)]
+    )
+
+    path = os.path.join(tempfile.mkdtemp(prefix="audition-search-"), "bank.sqlite3")
+    mirror = QuestionMirror(path)
+    start = time.perf_counter()
+    mirror.put(questions)
+    print(f"Mirrored {len(questions)} questions in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    mirror.indexText()
+    subQuestionCount = questionCount * SUB_QUESTIONS_PER_QUESTION
+    print(
+        f"Indexed {subQuestionCount} sub-questions in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+    print(f"\n{'query':>40}  {'hits':>6}  {'linear':>9}  {'index':>9}")
+    for query in QUERIES:
+        if ":" in query:
+            linear = None
+        else:
+            start = time.perf_counter()
+            linearSearch(questions, query)
+            linear = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = mirror.searchSubQuestions(query)
+        indexed = time.perf_counter() - start
+
+        linearText = f"{linear * 1000:7.1f}ms" if linear is not None else f"{'-':>9}"
+        print(f"{query!r:>40}  {len(hits):>6}  {linearText}  {indexed * 1000:7.1f}ms")
+
+    # Saving a sub-question replaces its terms in the index
+    saves = 200
+    start = time.perf_counter()
+    for index in range(saves):
+        question = questions[generator.randrange(len(questions))]
+        mirror.updateSubQuestion(
+            question.id,
+            question.sub_questions[0].id,
+            {"description": f"Edited {index}", "keywords": ["edited"]},
+        )
+    elapsed = time.perf_counter() - start
+    print(f"\nSaved {saves} sub-questions, {elapsed / saves * 1000:.2f}ms each")
+    assert mirror.searchSubQuestions("keyword:edited")
+
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
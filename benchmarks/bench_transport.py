@@ -0,0 +1,97 @@
+"""
+Benchmark the HTTP transport of the Nanoko client against a local stand-in server
+
+Sends concurrent single-question reads from several threads and downloads the whole
+bank, comparing a client that opens a connection per request, the default httpx
+client and the tuned pooled client, with and without response compression. The
+stand-in server adds a delay to every new connection to stand in for the round trips
+of a TCP/TLS handshake to a remote server.
+
+Usage:
+    python -m benchmarks.bench_transport [--threads 16] [--requests 400]
+"""
+
+import time
+import httpx
+import argparse
+from nanoko import Nanoko
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_server import FakeBank, FakeNanokoServer
+from app.controllers.transport import TransportConfig, createHttpClient
+
+
+def makeClients(threads):
+    """Create the clients to compare
+
+    Args:
+        threads (int): The number of threads sending requests
+
+    Returns:
+        dict: The HTTP clients by name
+    """
+    return {
+        "connection per request": httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=0)
+        ),
+        "default httpx client": httpx.Client(),
+        "tuned, no compression": createHttpClient(
+            TransportConfig(maxConnections=threads, compression=False)
+        ),
+        "tuned": createHttpClient(TransportConfig(maxConnections=threads)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeNanokoServer(
+        FakeBank(args.questions),
+        latency=args.latency,
+        connectLatency=args.connect_latency,
+    ).start()
+
+    print(
+        f"{'client':>24}  {'reads':>8}  {'per read':>9}  {'connections':>11}"
+        f"  {'full bank':>10}"
+    )
+    for name, httpClient in makeClients(args.threads).items():
+        client = Nanoko(base_url=server.baseUrl, client=httpClient)
+        questionIds = [i % args.questions + 1 for i in range(args.requests)]
+
+        server.resetCounters()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(
+                pool.map(
+                    lambda questionId, client=client: client.bank.get_questions(
+                        question_id=questionId
+                    ),
+                    questionIds,
+                )
+            )
+        reads = time.perf_counter() - start
+        connections = server.connectionCount
+
+        start = time.perf_counter()
+        questions = client.bank.get_questions()
+        fullBank = time.perf_counter() - start
+        assert len(questions) == args.questions
+
+        print(
+            f"{name:>24}  {reads * 1000:6.0f}ms  {reads / args.requests * 1000:7.2f}ms"
+            f"  {connections:>11}  {fullBank * 1000:8.0f}ms"
+        )
+        httpClient.close()
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
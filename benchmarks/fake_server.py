@@ -0,0 +1,415 @@
+"""
+Local stand-in for the Nanoko bank server
+
+Serves a synthetic question bank over the same endpoints as the real server, with
+configurable bank size, per-request and per-connection latency and gzip response
+compression, and counts the requests and connections it receives. Faults can be
+injected into a share of the requests to exercise the error handling of the client.
+
+Usage:
+    python -m benchmarks.fake_server [--questions 10000] [--latency 0.02]
+        [--connect-latency 0.02] [--port 25324] [--fault-rate 0.1]
+"""
+
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeBank:
+    """Synthetic question bank served by the fake server"""
+
+    def __init__(
+        self,
+        questionCount=1000,
+        subQuestionCount=3,
+        imageSize=64 * 1024,
+        imagePayload=None,
+    ):
+        self.lock = threading.Lock()
+        self.questions = {}
+        self.images = {}
+        self.imageSize = imageSize
+        self.imagePayload = imagePayload
+
+        for questionId in range(1, questionCount + 1):
+            self.questions[questionId] = self._makeQuestion(
+                questionId, subQuestionCount
+            )
+
+    def _makeQuestion(self, questionId, subQuestionCount):
+        subQuestions = []
+        for index in range(subQuestionCount):
+            subQuestionId = questionId * 10 + index
+            imageId = subQuestionId if index == 0 else None
+            if imageId is not None:
+                self.images[imageId] = {
+                    "description": f"Figure for sub-question {subQuestionId}",
+                    "hash": f"hash-{imageId}",
+                }
+            subQuestions.append(
+                {
+                    "id": subQuestionId,
+                    "description": f"Work out part {index + 1} of question {questionId}",
+                    "answer": f"The answer to part {index + 1} is {questionId * index}",
+                    "concept": (questionId + index) % 7,
+                    "process": index % 3,
+                    "keywords": ["fraction", "area"] if index % 2 else ["ratio"],
+                    "options": None,
+                    "image_id": imageId,
+                }
+            )
+
+        return {
+            "id": questionId,
+            "name": f"Question {questionId}",
+            "source": f"Paper {questionId % 40}",
+            "is_audited": questionId % 3 == 0,
+            "is_deleted": questionId % 11 == 0,
+            "sub_questions": subQuestions,
+        }
+
+    def imageBytes(self, imageId):
+        """Get the deterministic payload of an image
+
+        Every image is served with ``imagePayload`` when it is set, for example an
+        encoded picture the client can decode.
+
+        Args:
+            imageId (int): The id of the image
+
+        Returns:
+            bytes: The image payload
+        """
+        if self.imagePayload is not None:
+            return self.imagePayload
+        seed = imageId.to_bytes(4, "little")
+        return (seed * (self.imageSize // 4 + 1))[: self.imageSize]
+
+    def findSubQuestion(self, subQuestionId):
+        """Find a sub-question by id
+
+        Args:
+            subQuestionId (int): The id of the sub-question
+
+        Returns:
+            Optional[dict]: The sub-question, or None if it does not exist
+        """
+        question = self.questions.get(subQuestionId // 10)
+        if question is None:
+            return None
+        for subQuestion in question["sub_questions"]:
+            if subQuestion["id"] == subQuestionId:
+                return subQuestion
+        return None
+
+
+class FaultInjector:
+    """Picks the faults a FakeNanokoServer injects into the requests it receives
+
+    Each request matching one of the path prefixes fails with probability ``rate``
+    by answering one of ``statuses``, by closing the connection without an answer
+    (``resets``) or by stalling for ``stall`` seconds before answering (``stalls``).
+    The last two are chosen with their own probabilities among the failing requests.
+    """
+
+    def __init__(
+        self,
+        rate=0.0,
+        statuses=(500, 502, 503),
+        resets=0.0,
+        stalls=0.0,
+        stall=5.0,
+        paths=None,
+        seed=None,
+    ):
+        self.rate = rate
+        self.statuses = tuple(statuses)
+        self.resets = resets
+        self.stalls = stalls
+        self.stall = stall
+        self.paths = tuple(paths) if paths else None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def pick(self, path):
+        """Pick the fault of a request
+
+        Args:
+            path (str): The path of the request
+
+        Returns:
+            Union[None, int, str]: None to answer normally, the status code to answer
+                with, "reset" or "stall"
+        """
+        if self.paths is not None and not path.startswith(self.paths):
+            return None
+
+        with self.lock:
+            if self.random.random() >= self.rate:
+                return None
+            draw = self.random.random()
+            if draw < self.resets:
+                return "reset"
+            if draw < self.resets + self.stalls:
+                return "stall"
+            return self.random.choice(self.statuses)
+
+
+class FakeNanokoServer:
+    """Threaded HTTP server answering Nanoko API requests from a FakeBank"""
+
+    def __init__(
+        self,
+        bank: FakeBank,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        connectLatency=0.0,
+        compression=True,
+        faults=None,
+    ):
+        self.bank = bank
+        self.latency = latency
+        self.connectLatency = connectLatency
+        self.compression = compression
+        self.faults = faults
+        self.connectionCount = 0
+        self.requestCount = 0
+        self.faultCount = 0
+        self.requestPaths = []
+        self._countLock = threading.Lock()
+
+        self.httpServer = ThreadingHTTPServer((host, port), self._makeHandler())
+        self.httpServer.daemon_threads = True
+        self.httpServer.handle_error = lambda request, clientAddress: None
+        self.thread = None
+
+    @property
+    def baseUrl(self):
+        host, port = self.httpServer.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving on a background thread
+
+        Returns:
+            FakeNanokoServer: The server itself
+        """
+        self.thread = threading.Thread(
+            target=self.httpServer.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+
+    def resetCounters(self):
+        """Reset the request counters"""
+        with self._countLock:
+            self.requestCount = 0
+            self.requestPaths = []
+            self.connectionCount = 0
+            self.faultCount = 0
+
+    def _record(self, path):
+        with self._countLock:
+            self.requestCount += 1
+            self.requestPaths.append(path)
+
+    def _makeHandler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                # Stands in for the round trips of a TCP (and TLS) handshake
+                with server._countLock:
+                    server.connectionCount += 1
+                if server.connectLatency:
+                    time.sleep(server.connectLatency)
+                super().setup()
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def _dispatch(self, method):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                server._record(url.path)
+                if server.latency:
+                    time.sleep(server.latency)
+
+                fault = server.faults.pick(url.path) if server.faults else None
+                if fault is not None:
+                    with server._countLock:
+                        server.faultCount += 1
+                if fault == "reset":
+                    self.close_connection = True
+                    return
+                if fault == "stall":
+                    time.sleep(server.faults.stall)
+
+                try:
+                    if isinstance(fault, int):
+                        status, payload = fault, {"detail": "Injected fault"}
+                    else:
+                        status, payload = server.route(method, url.path, query, body)
+                except KeyError:
+                    status, payload = 404, {"detail": "Not found"}
+
+                if isinstance(payload, bytes):
+                    data, contentType = payload, "application/octet-stream"
+                else:
+                    data, contentType = json.dumps(payload).encode(), "application/json"
+
+                self.send_response(status)
+                self.send_header("Content-Type", contentType)
+                acceptEncoding = self.headers.get("Accept-Encoding") or ""
+                if server.compression and "gzip" in acceptEncoding and len(data) > 1024:
+                    data = gzip.compress(data, compresslevel=5)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                for start in range(0, len(data), 64 * 1024):
+                    self.wfile.write(data[start : start + 64 * 1024])
+
+        return Handler
+
+    def route(self, method, path, query, body):
+        """Answer a request
+
+        Args:
+            method (str): The HTTP method of the request
+            path (str): The path of the request
+            query (dict): The query parameters of the request
+            body (bytes): The body of the request
+
+        Returns:
+            Tuple[int, Union[dict, list, bytes]]: The status code and the payload
+        """
+        bank = self.bank
+        data = {}
+        if body and not path.endswith("/upload") and not path.endswith("/token"):
+            data = json.loads(body)
+
+        if path == "/api/v1/user/token":
+            return 200, {"access_token": "fake-token", "token_type": "bearer"}
+
+        if path == "/api/v1/bank/question/get":
+            with bank.lock:
+                if "question_id" in query:
+                    question = bank.questions.get(int(query["question_id"]))
+                    return 200, [question] if question else []
+                return 200, list(bank.questions.values())
+
+        if path == "/api/v1/bank/image/get":
+            imageId = int(query["image_id"])
+            if imageId not in bank.images:
+                return 404, {"detail": "Image not found"}
+            return 200, bank.imageBytes(imageId)
+
+        if path == "/api/v1/bank/image/get/description":
+            image = bank.images.get(int(query["image_id"]))
+            if image is None:
+                return 404, {"detail": "Image not found"}
+            return 200, {"description": image["description"]}
+
+        if path == "/api/v1/bank/image/upload":
+            return 200, {"hash": f"hash-{len(body)}"}
+
+        if path == "/api/v1/bank/image/add":
+            with bank.lock:
+                imageId = max(bank.images, default=0) + 1
+                bank.images[imageId] = {
+                    "description": data["description"],
+                    "hash": data["hash"],
+                }
+            return 200, {"image_id": imageId}
+
+        if path.startswith("/api/v1/bank/image/set/"):
+            field = path.rsplit("/", 1)[1]
+            with bank.lock:
+                bank.images[data["image_id"]][field] = data[field]
+            return 200, {"msg": "ok"}
+
+        if path == "/api/v1/bank/question/set/name":
+            with bank.lock:
+                bank.questions[data["question_id"]]["name"] = data["name"]
+            return 200, {"msg": "ok"}
+
+        if path in ("/api/v1/bank/question/approve", "/api/v1/bank/question/delete"):
+            questionId = int(data.get("question_id", query.get("question_id")))
+            field = "is_audited" if path.endswith("approve") else "is_deleted"
+            with bank.lock:
+                bank.questions[questionId][field] = True
+            return 200, {"msg": "ok"}
+
+        if path == "/api/v1/bank/sub-question/delete/image":
+            with bank.lock:
+                subQuestion = bank.findSubQuestion(int(query["sub_question_id"]))
+                subQuestion["image_id"] = None
+            return 200, {"msg": "ok"}
+
+        if path.startswith("/api/v1/bank/sub-question/set/"):
+            field = path.rsplit("/", 1)[1]
+            key = "image_id" if field == "image" else field
+            with bank.lock:
+                subQuestion = bank.findSubQuestion(data["sub_question_id"])
+                if subQuestion is None:
+                    return 404, {"detail": "Sub-question not found"}
+                subQuestion[key] = data[key]
+            return 200, {"msg": "ok"}
+
+        return 404, {"detail": "Not found"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=25324)
+    parser.add_argument(
+        "--fault-rate", type=float, default=0.0, help="Share of requests that fail"
+    )
+    args = parser.parse_args()
+
+    server = FakeNanokoServer(
+        FakeBank(args.questions),
+        port=args.port,
+        latency=args.latency,
+        connectLatency=args.connect_latency,
+        faults=FaultInjector(args.fault_rate, resets=0.2) if args.fault_rate else None,
+    )
+    print(f"Serving {args.questions} questions on {server.baseUrl}")
+    try:
+        server.httpServer.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,25 @@
 import sys
-from PyQt6.QtCore import QDir
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import QDir, Qt
+from PyQt6.QtWidgets import QApplication, QSplashScreen
 
-from app.controllers.main_controller import MainController
+
+def showSplash() -> QSplashScreen:
+    """Show the splash screen while the rest of the application is imported
+
+    Returns:
+        QSplashScreen: The splash screen, to finish once the login window is shown
+    """
+    pixmap = QPixmap("resources:icon.png").scaled(
+        160,
+        160,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+    splash = QSplashScreen(pixmap)
+    splash.show()
+    QApplication.processEvents()
+    return splash
 
 
 def main():
@@ -11,9 +28,15 @@ def main():
 
     app = QApplication(sys.argv)
     app.setApplicationName("Audition Admin")
+    splash = showSplash()
+
+    # Imported once the splash is shown, the widget toolkit is slow to import
+    from app.controllers.main_controller import MainController
 
     controller = MainController()
     controller.start()
+    splash.finish(controller.loginWindow)
+    app.aboutToQuit.connect(controller.shutdown)
 
     sys.exit(app.exec())
 